@@ -1,22 +1,29 @@
 import os
+import json
 import logging
 import argparse
 from typing import Dict, List
 
 from src.data_loader import load_risk_data, load_external_data
 from src.risk_analysis.categorization import categorize_risks, categorize_risks_multi_level, prioritize_risks
-from src.risk_analysis.interaction_analysis import analyze_risk_interactions, build_risk_network, identify_central_risks, detect_risk_clusters, analyze_risk_cascades
-from src.risk_analysis.scenario_analysis import simulate_scenario_impact, monte_carlo_simulation, llm_risk_assessment, analyze_scenario_sensitivity
-from src.risk_analysis.time_series_analysis import time_series_analysis, analyze_impact_trends, identify_critical_periods, forecast_cumulative_impact
+from src.risk_analysis.interaction_analysis import compute_risk_interactions, identify_central_risks, detect_risk_clusters, analyze_risk_cascades
+from src.risk_analysis.centrality import betweenness_error_bound
+from src.risk_analysis.network_store import load_risk_network_store
+from src.risk_analysis.scenario_analysis import (simulate_scenario_impact, monte_carlo_simulation, llm_risk_assessment, analyze_scenario_sensitivity,
+                                                  calculate_portfolio_aggregates)
+from src.risk_analysis.time_series_analysis import ArimaParameterCache, time_series_analysis, analyze_impact_trends, identify_critical_periods, forecast_cumulative_impact
 from src.risk_analysis.advanced_analysis import conduct_advanced_risk_analysis
 from src.visualization import generate_visualizations
 from src.reporting import generate_report
-from src.config import SCENARIOS, OUTPUT_DIR, setup_logging
+from src.config import SCENARIOS, OUTPUT_DIR, NUM_SIMULATIONS, CENTRALITY_CONFIDENCE, setup_logging
 from src.data_collection.nlp_extraction import extract_risk_statements_from_10k
 from src.risk_analysis.pestel_analysis import perform_pestel_analysis
 from src.risk_analysis.sasb_integration import integrate_sasb_materiality
 from src.risk_analysis.systemic_risk_analysis import analyze_systemic_risks, identify_trigger_points, assess_resilience
 from src.sensitivity_analysis.monte_carlo import perform_monte_carlo_simulations
+from src.sensitivity_analysis.simulation_store import load_simulation_results
+from src.llm_client import LLMClient, set_llm_client
+from src.llm_cache import LLMCache
 from src.reporting.stakeholder_reports import generate_stakeholder_reports
 from src.models import Risk, ExternalData, Scenario
 
@@ -26,7 +33,22 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument("--external_data", type=str, default="data/external_data.csv", help="Path to external data CSV file")
     parser.add_argument("--output_dir", type=str, default="output", help="Directory for output files")
     parser.add_argument("--log_level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], help="Logging level")
-    return parser.parse_args()
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for Monte Carlo simulations and ARIMA fitting")
+    parser.add_argument("--streaming", action="store_true", help="Keep streaming summaries of Monte Carlo runs instead of every sample")
+    parser.add_argument("--simulation_store", type=str, default=None, help="Directory for memory-mapped Monte Carlo distributions")
+    parser.add_argument("--shared_draws", action="store_true", help="Simulate every risk against the same world-state per draw and report portfolio aggregates")
+    parser.add_argument("--reuse_simulations", action="store_true", help="Load Monte Carlo distributions from --simulation_store instead of re-simulating")
+    parser.add_argument("--forecast_engine", type=str, default="arima", choices=["arima", "factor"], help="Per-risk ARIMA or shared external-factor forecasting")
+    parser.add_argument("--arima_cache", type=str, default=None, help="JSON file of fitted ARIMA parameters reused across runs")
+    parser.add_argument("--betweenness_samples", type=int, default=None, help="Estimate betweenness centrality from this many pivot risks instead of exactly")
+    parser.add_argument("--network_snapshot", type=str, default=None, help="JSON snapshot of the risk network, updated incrementally across runs")
+    parser.add_argument("--llm_cache", "--llm-cache", type=str, default=None, help="SQLite file for caching LLM responses across runs")
+    args = parser.parse_args()
+    if args.streaming and args.simulation_store:
+        parser.error("--streaming keeps only summaries and cannot be combined with --simulation_store")
+    if args.reuse_simulations and not args.simulation_store:
+        parser.error("--reuse_simulations needs --simulation_store")
+    return args
 
 def main(args: argparse.Namespace) -> None:
     setup_logging(args.log_level)
@@ -35,6 +57,10 @@ def main(args: argparse.Namespace) -> None:
 
     os.makedirs(args.output_dir, exist_ok=True)
 
+    llm_cache = LLMCache(args.llm_cache) if args.llm_cache else None
+    if llm_cache is not None:
+        set_llm_client(LLMClient(cache=llm_cache))
+
     try:
         # Data Collection and Preprocessing
         risk_statements = extract_risk_statements_from_10k('data/10k_filings')
@@ -49,10 +75,19 @@ def main(args: argparse.Namespace) -> None:
         pestel_analysis = perform_pestel_analysis(risks, external_data)
         
         # Risk Interaction Analysis
-        risk_interactions = analyze_risk_interactions(risks)
-        risk_network = build_risk_network(risks, risk_interactions)
-        central_risks = identify_central_risks(risk_network)
-        risk_clusters = detect_risk_clusters(risk_network)
+        interaction_store = compute_risk_interactions(risks)
+        risk_interactions = interaction_store.interactions
+        network_store = load_risk_network_store(args.network_snapshot, risks, risk_interactions,
+                                                args.betweenness_samples) if args.network_snapshot else None
+        risk_network = network_store.graph if network_store else interaction_store.graph
+        central_risks = identify_central_risks(risk_network, betweenness_samples=args.betweenness_samples,
+                                               centrality_measures=network_store.centrality() if network_store else None)
+        if args.betweenness_samples:
+            error_bound = network_store.betweenness_error_bound() if network_store else \
+                betweenness_error_bound(risk_network.number_of_nodes(), args.betweenness_samples)
+            logger.info(f"Sampled betweenness is within {error_bound:.3f} "
+                        f"of exact with {CENTRALITY_CONFIDENCE:.0%} confidence")
+        risk_clusters = network_store.clusters() if network_store else detect_risk_clusters(risk_network)
         risk_cascades = analyze_risk_cascades(risk_network, [r.id for r in risks if r.impact > 0.8])
         
         # Scenario Analysis
@@ -61,7 +96,21 @@ def main(args: argparse.Namespace) -> None:
             for scenario_name, scenario_params in SCENARIOS.items()
         }
         
-        simulation_results = monte_carlo_simulation(risks, external_data, SCENARIOS)
+        simulation_results = None
+        if args.reuse_simulations:
+            try:
+                simulation_results = load_simulation_results(args.simulation_store, [r.id for r in risks], list(SCENARIOS), NUM_SIMULATIONS,
+                                                             args.shared_draws)
+            except ValueError as e:
+                logger.warning(f"{e}; re-simulating")
+        if simulation_results is None:
+            simulation_results = monte_carlo_simulation(risks, external_data, SCENARIOS, workers=args.workers,
+                                                        shared_draws=args.shared_draws, streaming=args.streaming,
+                                                        store_dir=args.simulation_store)
+        if args.shared_draws:
+            portfolio_aggregates = calculate_portfolio_aggregates(simulation_results)
+            with open(os.path.join(args.output_dir, 'portfolio_aggregates.json'), 'w') as f:
+                json.dump(portfolio_aggregates, f, indent=2)
         
         # Sensitivity Analysis
         sensitivity_results = {
@@ -70,7 +119,9 @@ def main(args: argparse.Namespace) -> None:
         }
         
         # Time Series Analysis
-        time_series_results = time_series_analysis(risks, external_data)
+        arima_cache = ArimaParameterCache(args.arima_cache) if args.arima_cache else None
+        time_series_results = time_series_analysis(risks, external_data, workers=args.workers, parameter_cache=arima_cache,
+                                                   engine=args.forecast_engine)
         impact_trends = analyze_impact_trends(time_series_results)
         critical_periods = identify_critical_periods(time_series_results, threshold=0.7)
         cumulative_impact = forecast_cumulative_impact(time_series_results)
@@ -78,15 +129,20 @@ def main(args: argparse.Namespace) -> None:
         # Advanced LLM-based Analysis
         company_industry = "Energy"  # This should be dynamically determined or provided as input
         key_dependencies = ["Oil suppliers", "Renewable energy technology", "Grid infrastructure"]
-        advanced_analysis = conduct_advanced_risk_analysis(risks, SCENARIOS, company_industry, key_dependencies)
+        advanced_analysis = conduct_advanced_risk_analysis(risks, SCENARIOS, company_industry, key_dependencies,
+                                                           interaction_store=interaction_store)
         
         # Systemic Risk Analysis
         systemic_risks = analyze_systemic_risks(risks, company_industry, key_dependencies)
-        trigger_points = identify_trigger_points(risks, risk_network, external_data)
+        if network_store:
+            trigger_points = network_store.trigger_points(risks, external_data)
+            network_store.save(args.network_snapshot)
+        else:
+            trigger_points = identify_trigger_points(risks, risk_network, external_data, betweenness_samples=args.betweenness_samples)
         resilience_assessment = assess_resilience(risks, scenario_impacts, simulation_results)
         
         # Monte Carlo Simulations
-        monte_carlo_results = perform_monte_carlo_simulations(risks, SCENARIOS, num_simulations=10000)
+        monte_carlo_results = perform_monte_carlo_simulations(risks, SCENARIOS, num_simulations=10000, workers=args.workers, streaming=args.streaming)
         
         # Generate Visualizations
         generate_visualizations(risks, risk_interactions, simulation_results, 
@@ -111,6 +167,10 @@ def main(args: argparse.Namespace) -> None:
     except Exception as e:
         logger.error(f"An error occurred during the risk assessment process: {str(e)}")
         raise
+    finally:
+        if llm_cache is not None:
+            logger.info(f"LLM cache statistics: {llm_cache.stats()}")
+            llm_cache.close()
 
 if __name__ == "__main__":
     args = parse_arguments()
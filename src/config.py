@@ -123,9 +123,56 @@ SCENARIOS: Dict[str, Scenario] = {
 
 # Monte Carlo simulation parameters
 NUM_SIMULATIONS = 10000
+MONTE_CARLO_CHUNK_SIZE = 64  # Risks evaluated per vectorized block
+MONTE_CARLO_SHARD_SIZE = 1000  # Simulations per shard; fixed so results do not depend on the worker count
+STREAMING_HISTOGRAM_BINS = 1000  # Quantile sketch resolution for streaming simulation summaries
+
+# Interaction analysis parameters
+INTERACTION_CANDIDATES_PER_RISK = 10  # Most similar partners per risk sent to the LLM; None scores every pair
+INTERACTION_BATCH_SIZE = 10  # Partner risks scored per LLM request; 1 sends one request per pair
+INTERACTION_BLOCKING_WEIGHTS = {"category": 0.3, "subcategory": 0.2, "sasb_category": 0.1}  # Similarity bonus for shared fields
+
+# Risk propagation parameters
+PROPAGATION_STEPS = 10  # Interaction time steps per propagation
+PROPAGATION_STEP_SIZE = 0.1  # Weight of neighbour influence per step
+PROPAGATION_CHUNK_SIZE = 1024  # Simulation rows propagated per block
+PROPAGATION_TOLERANCE = 1e-6  # Max level change per step treated as converged in steady-state mode
+PROPAGATION_MAX_STEPS = 1000  # Iteration cap for the steady-state mode
+PROPAGATION_WEAK_LINK_THRESHOLD = 0.0  # Interactions below this score are dropped before propagation
+SPARSE_DENSITY_THRESHOLD = 0.1  # Interaction matrices with fewer non-zeros than this fraction propagate as CSR
+TIPPING_SWEEP_RESOLUTION = 100  # Impact levels swept per risk
+TIPPING_REFINEMENT_ROUNDS = 0  # Extra sweeps zooming into each detected tipping interval
+
+# Cascade parameters
+CASCADE_THRESHOLD = 0.5  # Weighted neighbour influence needed to activate a risk
+CASCADE_MAX_STEPS = 10  # Cascade steps simulated per seed
+CASCADE_INDEX_CHUNK_SIZE = 256  # Seeds cascaded per batch when building the reachability index
+CASCADE_INDEX_CACHE_SIZE = 8  # Reachability indexes kept in memory, keyed by graph fingerprint and parameters
+
+# Network spectral solvers (centrality and spectral clustering)
+DENSE_EIGEN_LIMIT = 100  # Below this many nodes a dense eigendecomposition is cheaper than ARPACK
+
+# Centrality parameters
+CENTRALITY_BETWEENNESS_SAMPLES = None  # Pivot sources for sampled betweenness; None computes it exactly
+CENTRALITY_CONFIDENCE = 0.95  # Confidence level of the sampled betweenness error bound
+CENTRALITY_SEED = 42  # Pivot sampling seed, so sampled centralities are reproducible per graph
+CENTRALITY_TOLERANCE = 1e-6  # Per-node convergence tolerance of the PageRank power iteration
+CENTRALITY_MAX_ITERATIONS = 1000  # Iteration cap for the PageRank and eigenvector solvers
+PAGERANK_ALPHA = 0.85
+CENTRALITY_CACHE_SIZE = 32  # Centrality measures kept in memory, keyed by graph fingerprint
+
+# Feedback loop parameters
+FEEDBACK_LOOP_MAX_LENGTH = 6  # Longest loop, in risks, that is enumerated
+FEEDBACK_LOOP_MIN_WEIGHT = 0.0  # Edges weaker than this never take part in a loop
+FEEDBACK_LOOP_MAX_LOOPS = 100  # Strongest loops returned
+FEEDBACK_LOOP_MAX_EXPANSIONS = 1000000  # Search budget in path extensions, so enumeration always terminates
 
 # Clustering parameters
 NUM_CLUSTERS = 3
+CLUSTERING_METHOD = "louvain"  # Risk network clustering: "louvain" modularity or "spectral"
+CLUSTERING_RESOLUTION = 1.0  # Louvain resolution; higher values give more, smaller clusters
+CLUSTERING_MAX_CLUSTERS = 20  # Upper bound for the spectral eigengap cluster-count selection
+CLUSTERING_SEED = 42
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -138,6 +185,14 @@ NER_MODEL = "dbmdz/bert-large-cased-finetuned-conll03-english"
 # LLM configuration
 LLM_MODEL = "gpt-3.5-turbo"  # Replace with the actual model you're using
 LLM_API_KEY = os.getenv("OPENAI_API_KEY")
+LLM_MAX_CONCURRENCY = 8  # Requests in flight at once
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 90000
+LLM_MAX_RETRIES = 5
+LLM_RETRY_BASE_DELAY = 1.0  # seconds, doubled per attempt
+LLM_RETRY_MAX_DELAY = 30.0  # seconds
+LLM_CACHE_MAX_ENTRIES = 50000
+LLM_CACHE_MAX_AGE_DAYS = 30
 
 if not LLM_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable is not set")
@@ -148,6 +203,8 @@ HEATMAP_CMAP = 'YlOrRd'
 
 # Time series analysis parameters
 TIME_SERIES_HORIZON = 10  # years
+ARIMA_ORDER = (1, 1, 1)
+TIME_SERIES_ENGINE = "arima"  # "arima" fits one model per risk; "factor" fits the shared external factors once
 
 # Sensitivity analysis parameters
 SENSITIVITY_VARIABLES = ['temp_increase', 'carbon_price', 'renewable_energy', 'policy_stringency', 'biodiversity_loss', 'ecosystem_degradation', 'financial_stability', 'supply_chain_disruption']
@@ -1,55 +1,121 @@
 import pandas as pd
-from typing import List, Dict
-from src.models import Risk, ExternalData
+import numpy as np
+import logging
+from typing import List, Dict, Optional, Tuple
+from src.models import Risk, ExternalData, RiskTable, ExternalDataTable, RowError, LoadReport
+
+RISK_REQUIRED_COLUMNS = ['id', 'description', 'category', 'likelihood', 'impact']
+RISK_OPTIONAL_COLUMNS = {'subcategory': '', 'tertiary_category': '', 'time_horizon': '', 'industry_specific': False, 'sasb_category': ''}
+EXTERNAL_REQUIRED_COLUMNS = ['year', 'gdp_growth', 'population', 'energy_demand']
+EXTERNAL_OPTIONAL_COLUMNS = {'carbon_price': 0.0, 'renewable_energy_share': 0.0, 'biodiversity_index': 0.0, 'deforestation_rate': 0.0}
+_TRUE_VALUES = {'true', '1', '1.0', 'yes', 'y', 'on'}
+_FALSE_VALUES = {'false', '0', '0.0', 'no', 'n', 'off', ''}
+
+logger = logging.getLogger(__name__)
 
 def load_risk_data(file_path: str) -> List[Risk]:
-    try:
-        df = pd.read_csv(file_path)
-        risks = []
-        for _, row in df.iterrows():
-            try:
-                risk = Risk(
-                    id=row['id'],
-                    description=row['description'],
-                    category=row['category'],
-                    subcategory=row.get('subcategory', ''),
-                    tertiary_category=row.get('tertiary_category', ''),
-                    likelihood=row['likelihood'],
-                    impact=row['impact'],
-                    time_horizon=row.get('time_horizon', ''),
-                    industry_specific=row.get('industry_specific', False),
-                    sasb_category=row.get('sasb_category', '')
-                )
-                risks.append(risk)
-            except ValueError as e:
-                print(f"Error processing row {row['id']}: {e}")
-        return risks
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Risk data file not found: {file_path}")
-    except pd.errors.EmptyDataError:
-        raise ValueError(f"Risk data file is empty: {file_path}")
+    # Compatibility wrapper for callers that need every Risk object up front, as the analysis pipeline does;
+    # use load_risk_table to keep the columnar table and the LoadReport
+    table, report = load_risk_table(file_path)
+    if report.errors:
+        logger.warning(f"Errors loading {file_path}:\n{report.summary()}")
+    return table.to_risks()
 
 def load_external_data(file_path: str) -> Dict[str, ExternalData]:
+    table, report = load_external_data_table(file_path)
+    if report.errors:
+        logger.warning(f"Errors loading {file_path}:\n{report.summary()}")
+    return table.to_dict()
+
+def load_risk_table(file_path: str) -> Tuple[RiskTable, LoadReport]:
+    # Validates the whole frame column by column; invalid rows are dropped and listed in the report
+    df = _read_csv(file_path, "Risk", RISK_REQUIRED_COLUMNS)
+    report = LoadReport(rows_read=len(df))
+    valid = np.ones(len(df), dtype=bool)
+
+    ids = _numeric_column(df, 'id', report, valid, integer=True)
+    likelihood = _numeric_column(df, 'likelihood', report, valid, bounds=(0, 1))
+    impact = _numeric_column(df, 'impact', report, valid, bounds=(0, 1))
+    text = {column: _text_column(df, column, report, valid, required=True) for column in ('description', 'category')}
+    text.update({column: _text_column(df, column, report, valid) for column, default in RISK_OPTIONAL_COLUMNS.items() if isinstance(default, str)})
+    industry_specific = _bool_column(df, 'industry_specific', report, valid)
+
+    report.errors.sort(key=lambda error: error.row)
+    table = RiskTable(
+        id=ids[valid].astype(np.int64),
+        likelihood=likelihood[valid],
+        impact=impact[valid],
+        industry_specific=industry_specific[valid],
+        **{column: values[valid] for column, values in text.items()}
+    )
+    return table, report
+
+def load_external_data_table(file_path: str) -> Tuple[ExternalDataTable, LoadReport]:
+    df = _read_csv(file_path, "External data", EXTERNAL_REQUIRED_COLUMNS)
+    report = LoadReport(rows_read=len(df))
+    valid = np.ones(len(df), dtype=bool)
+
+    columns = {
+        'year': _numeric_column(df, 'year', report, valid, integer=True),
+        'population': _numeric_column(df, 'population', report, valid, integer=True),
+        'gdp_growth': _numeric_column(df, 'gdp_growth', report, valid),
+        'energy_demand': _numeric_column(df, 'energy_demand', report, valid)
+    }
+    for column, default in EXTERNAL_OPTIONAL_COLUMNS.items():
+        columns[column] = _numeric_column(df, column, report, valid, default=default)
+
+    report.errors.sort(key=lambda error: error.row)
+    columns['year'] = columns['year'].astype(np.int64)
+    columns['population'] = columns['population'].astype(np.int64)
+    return ExternalDataTable(**{column: values[valid] for column, values in columns.items()}), report
+
+def _read_csv(file_path: str, label: str, required_columns: List[str]) -> pd.DataFrame:
     try:
         df = pd.read_csv(file_path)
-        external_data = {}
-        for _, row in df.iterrows():
-            try:
-                data = ExternalData(
-                    year=row['year'],
-                    gdp_growth=row['gdp_growth'],
-                    population=row['population'],
-                    energy_demand=row['energy_demand'],
-                    carbon_price=row.get('carbon_price', 0),
-                    renewable_energy_share=row.get('renewable_energy_share', 0),
-                    biodiversity_index=row.get('biodiversity_index', 0),
-                    deforestation_rate=row.get('deforestation_rate', 0)
-                )
-                external_data[str(row['year'])] = data
-            except ValueError as e:
-                print(f"Error processing row for year {row['year']}: {e}")
-        return external_data
     except FileNotFoundError:
-        raise FileNotFoundError(f"External data file not found: {file_path}")
+        raise FileNotFoundError(f"{label} file not found: {file_path}")
     except pd.errors.EmptyDataError:
-        raise ValueError(f"External data file is empty: {file_path}")
\ No newline at end of file
+        raise ValueError(f"{label} file is empty: {file_path}")
+    missing = [column for column in required_columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"{label} file {file_path} is missing required columns: {', '.join(missing)}")
+    return df
+
+def _numeric_column(df: pd.DataFrame, column: str, report: LoadReport, valid: np.ndarray, integer: bool = False,
+                    bounds: Optional[Tuple[float, float]] = None, default: Optional[float] = None) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=float)
+    raw = df[column]
+    values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+    if default is not None:
+        values = np.where(raw.isna().to_numpy(), default, values)
+
+    _reject(report, valid, raw.isna().to_numpy() & np.isnan(values), column, "missing value")
+    _reject(report, valid, raw.notna().to_numpy() & np.isnan(values), column, "not a number")
+    finite = ~np.isnan(values)
+    if integer:
+        _reject(report, valid, finite & (values != np.round(values)), column, "not an integer")
+    if bounds is not None:
+        low, high = bounds
+        _reject(report, valid, finite & ((values < low) | (values > high)), column, f"must be between {low} and {high}")
+    return values
+
+def _text_column(df: pd.DataFrame, column: str, report: LoadReport, valid: np.ndarray, required: bool = False) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), '', dtype=object)
+    raw = df[column]
+    if required:
+        _reject(report, valid, raw.isna().to_numpy(), column, "missing value")
+    return raw.fillna('').astype(str).to_numpy(dtype=object)
+
+def _bool_column(df: pd.DataFrame, column: str, report: LoadReport, valid: np.ndarray) -> np.ndarray:
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    normalized = df[column].fillna('').astype(str).str.strip().str.lower()
+    _reject(report, valid, (~normalized.isin(_TRUE_VALUES | _FALSE_VALUES)).to_numpy(), column, "not a boolean")
+    return normalized.isin(_TRUE_VALUES).to_numpy()
+
+def _reject(report: LoadReport, valid: np.ndarray, mask: np.ndarray, column: str, message: str) -> None:
+    rows = np.flatnonzero(mask)
+    report.errors.extend(RowError(row=int(row), field=column, message=message) for row in rows)
+    valid[rows] = False
@@ -0,0 +1,94 @@
+import os
+import time
+import json
+import hashlib
+import sqlite3
+from typing import Dict, Optional
+from src.config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_AGE_DAYS
+
+class LLMCache:
+    # Content-addressed store of LLM responses backed by SQLite. Entries are keyed by a hash of everything
+    # that determines the completion, so editing one risk or one template only invalidates the affected prompts.
+    def __init__(self, path: str, max_entries: int = LLM_CACHE_MAX_ENTRIES, max_age_days: float = LLM_CACHE_MAX_AGE_DAYS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        # The client may run a batch on a worker thread when called from inside an event loop; calls never overlap
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_accessed REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_accessed ON responses (last_accessed)")
+        self.connection.commit()
+        self.evict()
+        self.size = len(self)
+
+    @staticmethod
+    def make_key(model: str, template_version: str, prompt: str, temperature: float, max_tokens: int,
+                 response_format: Optional[str] = None) -> str:
+        payload = json.dumps([model, template_version, prompt, temperature, max_tokens, response_format])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self.connection.execute(
+            "SELECT response FROM responses WHERE key = ? AND created_at >= ?", (key, now - self.max_age_seconds)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE responses SET last_accessed = ? WHERE key = ?", (now, key))
+        self.connection.commit()
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        if self.connection.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is None:
+            self.size += 1
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+            (key, response, now, now)
+        )
+        if self.size > self.max_entries:
+            # Only the overflow goes, least recently used first, so a long run stays within the size limit
+            self.connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_accessed ASC LIMIT ?)",
+                (self.size - self.max_entries,)
+            )
+            self.size = self.max_entries
+        self.connection.commit()
+
+    def evict(self) -> int:
+        # Drop expired entries, then the least recently used ones beyond the size limit
+        before = len(self)
+        self.connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+        self.connection.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.connection.commit()
+        self.size = len(self)
+        return before - self.size
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self)
+        }
+
+    def close(self) -> None:
+        self.evict()
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Callable, Awaitable, Optional, Union
+import openai
+from src.llm_cache import LLMCache
+from src.config import (LLM_MODEL, LLM_API_KEY, LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE,
+                        LLM_TOKENS_PER_MINUTE, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY)
+
+openai.api_key = LLM_API_KEY
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    asyncio.TimeoutError,
+)
+
+@dataclass(frozen=True)
+class LLMRequest:
+    prompt: str
+    system_prompt: str
+    max_tokens: int
+    temperature: float = 0.7
+    model: str = LLM_MODEL
+    template_version: str = ""
+    response_format: Optional[str] = None  # "json_object" asks the API for a single valid JSON object
+
+    def cache_key(self) -> str:
+        # The system prompt is part of the rendered prompt the model sees, so it is hashed along with it
+        return LLMCache.make_key(self.model, self.template_version, self.system_prompt + "\n" + self.prompt,
+                                 self.temperature, self.max_tokens, self.response_format)
+
+    def estimated_tokens(self) -> int:
+        # Rough 4-characters-per-token estimate plus the completion budget
+        return (len(self.prompt) + len(self.system_prompt)) // 4 + self.max_tokens
+
+Transport = Callable[[LLMRequest], Awaitable[str]]
+
+async def openai_transport(request: LLMRequest) -> str:
+    options = {"response_format": {"type": request.response_format}} if request.response_format else {}
+    response = await openai.ChatCompletion.acreate(
+        model=request.model,
+        messages=[
+            {"role": "system", "content": request.system_prompt},
+            {"role": "user", "content": request.prompt}
+        ],
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        **options
+    )
+    return response.choices[0].message['content']
+
+class RateLimiter:
+    # Token buckets for requests and tokens per minute. Callers reserve capacity up front and the bucket may
+    # go negative, so concurrent callers queue behind each other without needing a lock.
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.request_rate = requests_per_minute / 60
+        self.token_rate = tokens_per_minute / 60
+        self.request_capacity = requests_per_minute
+        self.token_capacity = tokens_per_minute
+        self.available_requests = float(requests_per_minute)
+        self.available_tokens = float(tokens_per_minute)
+        self.clock = clock
+        self.last_refill = clock()
+
+    def reserve(self, tokens: int) -> float:
+        now = self.clock()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.available_requests = min(self.request_capacity, self.available_requests + elapsed * self.request_rate)
+        self.available_tokens = min(self.token_capacity, self.available_tokens + elapsed * self.token_rate)
+
+        self.available_requests -= 1
+        self.available_tokens -= min(tokens, self.token_capacity)
+        return max(0.0, -self.available_requests / self.request_rate, -self.available_tokens / self.token_rate)
+
+    async def acquire(self, tokens: int) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class LLMClient:
+    def __init__(self, transport: Transport = openai_transport, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE, tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 max_retries: int = LLM_MAX_RETRIES, retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+                 retry_max_delay: float = LLM_RETRY_MAX_DELAY, cache: Optional[LLMCache] = None):
+        self.transport = transport
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+    def retry_delay(self, attempt: int) -> float:
+        # Exponential backoff with jitter so retrying callers do not stampede together
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _complete(self, request: LLMRequest, semaphore: asyncio.Semaphore) -> str:
+        if self.cache is not None:
+            key = request.cache_key()
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            response = await self._request(request, semaphore)
+            self.cache.put(key, response)
+            return response
+        return await self._request(request, semaphore)
+
+    async def _request(self, request: LLMRequest, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire(request.estimated_tokens())
+                try:
+                    return await self.transport(request)
+                except RETRYABLE_ERRORS:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self.retry_delay(attempt))
+
+    async def acomplete_many(self, requests: List[LLMRequest], return_exceptions: bool = False) -> List[Union[str, Exception]]:
+        # The semaphore is created inside the running loop because each batch may run on a fresh event loop.
+        # Every request runs to completion, so one failure never discards (or skips caching) the others' responses.
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.cache is not None:
+            # Identical requests in one batch share a single cache lookup and API call
+            unique = {request.cache_key(): request for request in requests}
+            results = await asyncio.gather(*(self._complete(request, semaphore) for request in unique.values()), return_exceptions=True)
+            by_key = dict(zip(unique, results))
+            responses = [by_key[request.cache_key()] for request in requests]
+        else:
+            responses = await asyncio.gather(*(self._complete(request, semaphore) for request in requests), return_exceptions=True)
+        if not return_exceptions:
+            for response in responses:
+                if isinstance(response, BaseException):
+                    raise response
+        return responses
+
+    def complete_many(self, requests: List[LLMRequest], return_exceptions: bool = False) -> List[Union[str, Exception]]:
+        # With return_exceptions, requests that still fail after retries come back as their exception in place
+        if not requests:
+            return []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.acomplete_many(requests, return_exceptions))
+        # Called from inside an event loop (notebooks, async callers): run the batch on its own loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.acomplete_many(requests, return_exceptions)).result()
+
+    def complete(self, request: LLMRequest) -> str:
+        return self.complete_many([request])[0]
+
+def response_or_default(response: Union[str, Exception], default: str = "") -> str:
+    if isinstance(response, Exception):
+        logger.warning(f"LLM request failed after retries, using fallback: {response!r}")
+        return default
+    return response
+
+_default_client: Optional[LLMClient] = None
+
+def get_llm_client() -> LLMClient:
+    global _default_client
+    if _default_client is None:
+        _default_client = LLMClient()
+    return _default_client
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    global _default_client
+    _default_client = client
@@ -0,0 +1,91 @@
+import re
+import json
+from typing import Any, Dict, Optional
+from src.models import InteractionAssessment, RiskAssessment
+
+_CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*(.*?)\s*```$", re.DOTALL)
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+# Legacy text fallback: a score must follow its label on the same line instead of anywhere later in the response
+_LABELLED_SCORES = {
+    label: re.compile(rf"{label}[^\d\n]*?(\d+(?:\.\d+)?)", re.IGNORECASE)
+    for label in ("impact", "likelihood", "adaptability")
+}
+_INTERACTION_SCORE = re.compile(r"score[^\d\n]*?(\d+(?:\.\d+)?)", re.IGNORECASE)
+DEFAULT_SCORE = 0.5
+
+def parse_json_response(content: str) -> Optional[Any]:
+    # Fast path for well-formed JSON, then code-fenced JSON, then the outermost object embedded in prose
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+    content = content.strip()
+    fenced = _CODE_FENCE.match(content)
+    candidates = [fenced.group(1)] if fenced else []
+    embedded = _JSON_OBJECT.search(content)
+    if embedded:
+        candidates.append(embedded.group(0))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+def parse_interaction_response(content: str) -> InteractionAssessment:
+    data = parse_json_response(content)
+    if isinstance(data, dict):
+        # Valid JSON is authoritative: a missing or out-of-range score falls back to the default, never to the text
+        score = data.get("interaction_score")
+        if isinstance(score, dict):
+            score = score.get("score")
+        score = _as_score(score)
+        return InteractionAssessment(score=DEFAULT_SCORE if score is None else score,
+                                     explanation=str(data.get("interaction_explanation", "")), raw=content)
+
+    # Legacy free text: only a number labelled as the score counts, and only inside [0, 1]
+    match = _INTERACTION_SCORE.search(content)
+    score = _as_score(match.group(1)) if match else None
+    return InteractionAssessment(score=DEFAULT_SCORE if score is None else score, explanation=content, raw=content)
+
+def parse_risk_assessment(content: str) -> RiskAssessment:
+    data = parse_json_response(content)
+    if isinstance(data, dict):
+        scores = {label: _as_score(data.get(f"{label}_score")) for label in _LABELLED_SCORES}
+        scores = {label: DEFAULT_SCORE if score is None else score for label, score in scores.items()}
+        sections = {key: value if isinstance(value, str) else json.dumps(value)
+                    for key, value in data.items() if not key.endswith("_score")}
+        return RiskAssessment(sections=sections, raw=content, **scores)
+
+    return RiskAssessment(
+        impact=extract_labelled_score(content, "impact"),
+        likelihood=extract_labelled_score(content, "likelihood"),
+        adaptability=extract_labelled_score(content, "adaptability"),
+        sections=parse_sections(content),
+        raw=content
+    )
+
+def extract_labelled_score(content: str, label: str) -> float:
+    match = _LABELLED_SCORES[label].search(content)
+    score = _as_score(match.group(1)) if match else None
+    return DEFAULT_SCORE if score is None else score
+
+def parse_sections(content: str) -> Dict[str, str]:
+    # Splits "Title: text" paragraphs into a section dict; paragraphs without a title continue the previous section
+    parsed = {}
+    current_section = ""
+    for section in content.split('\n\n'):
+        if ':' in section:
+            title, text = section.split(':', 1)
+            current_section = title.strip().lower().replace(' ', '_')
+            parsed[current_section] = text.strip()
+        elif section.strip():
+            parsed[current_section] = (parsed.get(current_section, "") + '\n' + section.strip()).strip()
+    return parsed
+
+def _as_score(value: Any) -> Optional[float]:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return score if 0 <= score <= 1 else None
@@ -1,8 +1,9 @@
 from typing import List, Dict, Tuple
-from src.models import Risk
+from src.models import Risk, SimulationResult
+from src.sensitivity_analysis.streaming_stats import describe_simulation_result
 
 def suggest_mitigation_strategies(risks: List[Risk], scenario_impacts: Dict[str, List[Tuple[Risk, float]]],
-                                  simulation_results: Dict[str, Dict[int, List[float]]]) -> Dict[int, List[str]]:
+                                  simulation_results: Dict[str, Dict[int, SimulationResult]]) -> Dict[int, List[str]]:
     mitigation_strategies = {}
     
     for risk in risks:
@@ -20,7 +21,7 @@ def suggest_mitigation_strategies(risks: List[Risk], scenario_impacts: Dict[str,
         
         # Analyze Monte Carlo simulation results
         risk_simulation = {scenario: results[risk.id] for scenario, results in simulation_results.items()}
-        high_variability_scenarios = [scenario for scenario, results in risk_simulation.items() if np.std(results) > 0.5]
+        high_variability_scenarios = [scenario for scenario, results in risk_simulation.items() if describe_simulation_result(results)["std_impact"] > 0.5]
         
         if high_variability_scenarios:
             strategies.append(f"Develop flexible strategies to address high uncertainty in {', '.join(high_variability_scenarios)} scenarios")
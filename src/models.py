@@ -1,5 +1,6 @@
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Iterator, Optional, Tuple, Union
+import numpy as np
 from pydantic import BaseModel, Field, validator
 
 class Company(BaseModel):
@@ -45,13 +46,149 @@ class RiskInteraction:
     risk2_id: int
     interaction_score: float
     interaction_type: str
+    analysis: str = ""
+
+@dataclass
+class InteractionAssessment:
+    score: float
+    explanation: str
+    raw: str
+
+@dataclass
+class RiskAssessment:
+    impact: float
+    likelihood: float
+    adaptability: float
+    sections: Dict[str, str]
+    raw: str
 
 @dataclass
 class SimulationResult:
     risk_id: int
     scenario: str
-    impact_distribution: List[float]
-    likelihood_distribution: List[float]
+    impact_distribution: Union[List[float], np.ndarray]
+    likelihood_distribution: Union[List[float], np.ndarray]
+    shared_draws: bool = False  # every risk saw the same perturbed world-state in simulation k
+
+@dataclass
+class DistributionSummary:
+    count: int
+    mean: float
+    variance: float
+    histogram: np.ndarray  # Sample counts in equal-width bins over [0, 1]
+
+@dataclass
+class SimulationSummary:
+    risk_id: int
+    scenario: str
+    impact: DistributionSummary
+    likelihood: DistributionSummary
+    shared_draws: bool = False
+
+@dataclass
+class NetworkDelta:
+    upserted_risks: List[Risk] = field(default_factory=list)
+    removed_risk_ids: List[int] = field(default_factory=list)
+    upserted_interactions: List[RiskInteraction] = field(default_factory=list)
+    removed_interactions: List[Tuple[int, int]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.upserted_risks or self.removed_risk_ids or self.upserted_interactions or self.removed_interactions)
+
+@dataclass
+class RowError:
+    row: int  # Zero-based data row in the source file
+    field: str
+    message: str
+
+@dataclass
+class LoadReport:
+    rows_read: int
+    errors: List[RowError] = field(default_factory=list)
+
+    @property
+    def rows_rejected(self) -> int:
+        return len({error.row for error in self.errors})
+
+    def summary(self, max_errors: int = 20) -> str:
+        lines = [f"{self.rows_rejected} of {self.rows_read} rows rejected"]
+        lines += [f"  row {error.row}, {error.field}: {error.message}" for error in self.errors[:max_errors]]
+        if len(self.errors) > max_errors:
+            lines.append(f"  ... {len(self.errors) - max_errors} more")
+        return "\n".join(lines)
+
+@dataclass
+class RiskTable:
+    # Struct-of-arrays register, one entry per validated risk. Risk objects are only built on access, with
+    # Risk.construct since every column was already validated in bulk.
+    id: np.ndarray
+    description: np.ndarray
+    category: np.ndarray
+    subcategory: np.ndarray
+    tertiary_category: np.ndarray
+    likelihood: np.ndarray
+    impact: np.ndarray
+    time_horizon: np.ndarray
+    industry_specific: np.ndarray
+    sasb_category: np.ndarray
+    _risks: List[Optional[Risk]] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self._risks = [None] * len(self.id)
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def __getitem__(self, i: int) -> Risk:
+        if self._risks[i] is None:
+            self._risks[i] = Risk.construct(
+                id=int(self.id[i]),
+                description=str(self.description[i]),
+                category=str(self.category[i]),
+                subcategory=str(self.subcategory[i]),
+                tertiary_category=str(self.tertiary_category[i]),
+                likelihood=float(self.likelihood[i]),
+                impact=float(self.impact[i]),
+                time_horizon=str(self.time_horizon[i]),
+                industry_specific=bool(self.industry_specific[i]),
+                sasb_category=str(self.sasb_category[i])
+            )
+        return self._risks[i]
+
+    def __iter__(self) -> Iterator[Risk]:
+        return (self[i] for i in range(len(self)))
+
+    def to_risks(self) -> List[Risk]:
+        return list(self)
+
+@dataclass
+class ExternalDataTable:
+    year: np.ndarray
+    gdp_growth: np.ndarray
+    population: np.ndarray
+    energy_demand: np.ndarray
+    carbon_price: np.ndarray
+    renewable_energy_share: np.ndarray
+    biodiversity_index: np.ndarray
+    deforestation_rate: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    def record(self, i: int) -> ExternalData:
+        return ExternalData.construct(
+            year=int(self.year[i]),
+            gdp_growth=float(self.gdp_growth[i]),
+            population=int(self.population[i]),
+            energy_demand=float(self.energy_demand[i]),
+            carbon_price=float(self.carbon_price[i]),
+            renewable_energy_share=float(self.renewable_energy_share[i]),
+            biodiversity_index=float(self.biodiversity_index[i]),
+            deforestation_rate=float(self.deforestation_rate[i])
+        )
+
+    def to_dict(self) -> Dict[str, ExternalData]:
+        return {str(int(year)): self.record(i) for i, year in enumerate(self.year)}
 
 class PESTELAnalysis(BaseModel):
     political: List[Dict[str, str]]
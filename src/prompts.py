@@ -2,6 +2,19 @@
 
 from src.config import COMPANY_INFO
 
+# Bump a template's version whenever its wording changes so cached LLM responses for it are not reused
+PROMPT_TEMPLATE_VERSIONS = {
+    "risk_assessment": "2",
+    "risk_narrative": "1",
+    "executive_insights": "1",
+    "interaction_analysis": "2",
+    "batch_interaction_analysis": "2",
+    "interaction_summary": "1",
+    "systemic_risk": "1",
+    "mitigation_strategy": "1",
+    "scenario_narrative": "1",
+}
+
 RISK_ASSESSMENT_PROMPT = """
 <instruction>
 As an expert in climate risk assessment for the {industry} sector, analyze the following risk statement for {company_name}:
@@ -253,6 +266,51 @@ Structure your response in JSON format as follows:
 </output_format>
 """
 
+BATCH_INTERACTION_ANALYSIS_PROMPT = """
+<instruction>
+As an expert in climate risk assessment, analyze the potential interaction between the primary risk below and each of the partner risks for {company_name}:
+
+<company_context>
+Company: {company_name}
+Industry: {industry}
+Region: {company_region}
+Key Products: {key_products}
+</company_context>
+
+<primary_risk>
+<description>{risk_description}</description>
+<category>{risk_category}</category>
+<subcategory>{risk_subcategory}</subcategory>
+</primary_risk>
+
+<partner_risks>
+{partner_risks}
+</partner_risks>
+
+For every partner risk, briefly explain how it might interact with the primary risk in {company_name}'s specific context, considering compounding effects and mitigating factors, and give an interaction score on a scale of 0 (no interaction) to 1 (strong interaction).
+
+Return exactly one entry per partner risk, using the partner's id. Structure your response in JSON format as follows:
+</instruction>
+
+<output_format>
+{{
+  "interactions": [
+    {{
+      "risk_id": integer,
+      "interaction_explanation": "string",
+      "interaction_score": float
+    }}
+  ]
+}}
+</output_format>
+"""
+
+BATCH_INTERACTION_PARTNER_TEMPLATE = """<risk id="{risk_id}">
+<description>{risk_description}</description>
+<category>{risk_category}</category>
+<subcategory>{risk_subcategory}</subcategory>
+</risk>"""
+
 SYSTEMIC_RISK_PROMPT = """
 <instruction>
 As an expert in systemic risk analysis, evaluate the following risk in the context of broader systems, specifically for {company_name}:
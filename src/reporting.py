@@ -5,6 +5,7 @@ import pandas as pd
 import os
 from src.models import Risk, RiskInteraction, SimulationResult, Scenario
 from src.config import OUTPUT_DIR
+from src.sensitivity_analysis.streaming_stats import describe_simulation_result
 
 def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]], 
                     risk_interactions: List[RiskInteraction], scenario_impacts: Dict[str, List[Tuple[Risk, float]]],
@@ -32,19 +33,16 @@ def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]],
                     {"risk_id": risk.id, "impact": impact} 
                     for risk, impact in sorted(impacts, key=lambda x: x[1], reverse=True)
                 ],
-                "llm_analysis": advanced_analysis["comprehensive_analysis"][scenario]
+                "llm_analysis": {
+                    risk_id: analysis.__dict__
+                    for risk_id, analysis in advanced_analysis["comprehensive_analysis"].get(scenario, {}).items()
+                }
             } for scenario, impacts in scenario_impacts.items()
         },
         "monte_carlo_results": {
             scenario: {
-                risk_id: {
-                    "mean_impact": np.mean(results.impact_distribution),
-                    "std_impact": np.std(results.impact_distribution),
-                    "5th_percentile_impact": np.percentile(results.impact_distribution, 5),
-                    "95th_percentile_impact": np.percentile(results.impact_distribution, 95),
-                    "mean_likelihood": np.mean(results.likelihood_distribution),
-                    "std_likelihood": np.std(results.likelihood_distribution)
-                } for risk_id, results in scenario_results.items()
+                risk_id: describe_simulation_result(results)
+                for risk_id, results in scenario_results.items()
             } for scenario, scenario_results in simulation_results.items()
         },
         "risk_clusters": clustered_risks,
@@ -57,7 +55,7 @@ def generate_report(risks: List[Risk], categorized_risks: Dict[str, List[Risk]],
         "systemic_risks": systemic_risks,
         "trigger_points": trigger_points,
         "resilience_assessment": resilience_assessment,
-        "aggregate_impact": aggregate_impact,
+        "aggregate_impact": {key: value for key, value in aggregate_impact.items() if key != "distribution"},
         "tipping_points": tipping_points
     }
     
@@ -149,13 +147,14 @@ def summarize_monte_carlo_results(simulation_results: Dict[str, Dict[int, Simula
     scenario_summaries = []
     
     for scenario, results in simulation_results.items():
-        max_impact_risk = max(results.items(), key=lambda x: np.mean(x[1].impact_distribution))
-        max_likelihood_risk = max(results.items(), key=lambda x: np.mean(x[1].likelihood_distribution))
+        descriptions = {risk_id: describe_simulation_result(result) for risk_id, result in results.items()}
+        max_impact_risk = max(descriptions.items(), key=lambda x: x[1]["mean_impact"])
+        max_likelihood_risk = max(descriptions.items(), key=lambda x: x[1]["mean_likelihood"])
         
         scenario_summary = f"""
         {scenario} Scenario:
-        - Highest impact risk: Risk {max_impact_risk[0]} (Mean impact: {np.mean(max_impact_risk[1].impact_distribution):.2f})
-        - Highest likelihood risk: Risk {max_likelihood_risk[0]} (Mean likelihood: {np.mean(max_likelihood_risk[1].likelihood_distribution):.2f})
+        - Highest impact risk: Risk {max_impact_risk[0]} (Mean impact: {max_impact_risk[1]["mean_impact"]:.2f})
+        - Highest likelihood risk: Risk {max_likelihood_risk[0]} (Mean likelihood: {max_likelihood_risk[1]["mean_likelihood"]:.2f})
         """
         scenario_summaries.append(scenario_summary)
     
@@ -180,7 +179,7 @@ def generate_mitigation_strategies(risks: List[Risk], scenario_impacts: Dict[str
         
         # Analyze Monte Carlo simulation results
         risk_simulation = {scenario: results[risk.id] for scenario, results in simulation_results.items() if risk.id in results}
-        high_variability_scenarios = [scenario for scenario, results in risk_simulation.items() if np.std(results.impact_distribution) > 0.5]
+        high_variability_scenarios = [scenario for scenario, results in risk_simulation.items() if describe_simulation_result(results)["std_impact"] > 0.5]
         
         if high_variability_scenarios:
             strategies.append(f"Develop flexible strategies to address high uncertainty in {', '.join(high_variability_scenarios)} scenarios")
@@ -319,7 +318,7 @@ def generate_html_report(report: Dict) -> None:
         
         <h2>Trigger Points</h2>
         <ul>
-            {' '.join(f'<li>Risk {risk_id}: {trigger_info["description"]} (Centrality: {trigger_info["centrality"]:.2f}, Connected Risks: {", ".join(map(str, trigger_info["connected_risks"]))})</li>' for risk_id, trigger_info in report['trigger_points'].items())}
+            {' '.join(f'<li>Risk {risk_id}: {trigger_info["description"]} (Centrality: {trigger_info["centrality"]:.2f}, Connected Risks: {", ".join(map(str, trigger_info["connected_risks"]))}, Cascade Reach: {len(trigger_info.get("cascade_risks", []))})</li>' for risk_id, trigger_info in report['trigger_points'].items())}
         </ul>
         
         <h2>Resilience Assessment</h2>
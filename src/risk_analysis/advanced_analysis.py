@@ -1,32 +1,37 @@
-from typing import List, Dict, Any
-from src.models import Risk, Scenario, PESTELAnalysis, SystemicRisk
-from src.config import LLM_MODEL, LLM_API_KEY, SCENARIOS, COMPANY_INFO
+from typing import List, Dict, Any, Optional
+from src.models import Risk, Scenario, PESTELAnalysis, SystemicRisk, RiskAssessment
+from src.config import (SCENARIOS, COMPANY_INFO, PROPAGATION_STEPS, PROPAGATION_CHUNK_SIZE, TIPPING_SWEEP_RESOLUTION,
+                        TIPPING_REFINEMENT_ROUNDS)
 from src.prompts import (RISK_NARRATIVE_PROMPT, EXECUTIVE_INSIGHTS_PROMPT, 
                          SYSTEMIC_RISK_PROMPT, MITIGATION_STRATEGY_PROMPT, 
-                         PESTEL_ANALYSIS_PROMPT)
-import openai
+                         PESTEL_ANALYSIS_PROMPT, PROMPT_TEMPLATE_VERSIONS)
+from src.llm_client import LLMRequest, get_llm_client, response_or_default
+from src.llm_parsing import parse_risk_assessment, parse_sections, extract_labelled_score
 import numpy as np
 import re
 from src.risk_analysis.pestel_analysis import perform_pestel_analysis
 from src.risk_analysis.sasb_integration import integrate_sasb_materiality
 from src.risk_analysis.systemic_risk_analysis import analyze_systemic_risks, identify_trigger_points, assess_resilience
-from src.risk_analysis.interaction_analysis import analyze_risk_interactions, build_risk_network, create_risk_interaction_matrix, simulate_risk_interactions
+from src.risk_analysis.propagation import InteractionMatrix, simulate_aggregate_impacts, sweep_risk_levels
+from src.risk_analysis.interaction_analysis import InteractionStore, compute_risk_interactions, simulate_risk_interactions
 
-openai.api_key = LLM_API_KEY
-
-def conduct_advanced_risk_analysis(risks: List[Risk], scenarios: Dict[str, Scenario], key_dependencies: List[str], external_data: Dict) -> Dict:
-    comprehensive_analysis = {}
-    for scenario_name, scenario in scenarios.items():
-        scenario_analysis = {}
-        for risk in risks:
-            scenario_analysis[risk.id] = llm_risk_assessment(risk, scenario, COMPANY_INFO)
-        comprehensive_analysis[scenario_name] = scenario_analysis
+def conduct_advanced_risk_analysis(risks: List[Risk], scenarios: Dict[str, Scenario], key_dependencies: List[str], external_data: Dict,
+                                   interaction_store: Optional[InteractionStore] = None) -> Dict:
+    # Every (scenario, risk) assessment is independent, so they are submitted as one concurrent batch
+    keys = [(scenario_name, risk) for scenario_name in scenarios for risk in risks]
+    responses = get_llm_client().complete_many([build_risk_assessment_request(risk, scenarios[scenario_name], COMPANY_INFO) for scenario_name, risk in keys],
+                                               return_exceptions=True)
+    comprehensive_analysis = {scenario_name: {} for scenario_name in scenarios}
+    for (scenario_name, risk), content in zip(keys, responses):
+        # A failed assessment falls back to the parser's default scores
+        comprehensive_analysis[scenario_name][risk.id] = parse_risk_assessment(response_or_default(content))
     
     risk_narratives = generate_risk_narratives(risks, comprehensive_analysis)
     executive_insights = generate_executive_insights(comprehensive_analysis, risks)
     systemic_risks = analyze_systemic_risks(risks, COMPANY_INFO.industry, key_dependencies)
-    risk_interactions = analyze_risk_interactions(risks)
-    risk_network = build_risk_network(risks, risk_interactions)
+    if interaction_store is None:
+        interaction_store = compute_risk_interactions(risks)
+    risk_network = interaction_store.graph
     cross_scenario_results = perform_cross_scenario_analysis(comprehensive_analysis)
     key_uncertainties = identify_key_uncertainties(cross_scenario_results)
     mitigation_strategies = generate_mitigation_strategies(risks, comprehensive_analysis)
@@ -51,7 +56,10 @@ def conduct_advanced_risk_analysis(risks: List[Risk], scenarios: Dict[str, Scena
         "resilience_assessment": resilience_assessment
     }
 
-def llm_risk_assessment(risk: Risk, scenario: Scenario, company_info: Any) -> Dict[str, Any]:
+def llm_risk_assessment(risk: Risk, scenario: Scenario, company_info: Any) -> RiskAssessment:
+    return parse_risk_assessment(get_llm_client().complete(build_risk_assessment_request(risk, scenario, company_info)))
+
+def build_risk_assessment_request(risk: Risk, scenario: Scenario, company_info: Any) -> LLMRequest:
     prompt = f"""
     As an expert in climate risk assessment for the {company_info.industry} industry, analyze the following risk under the given scenario for {company_info.name}:
 
@@ -83,152 +91,136 @@ def llm_risk_assessment(risk: Risk, scenario: Scenario, company_info: Any) -> Di
     4. What additional challenges might arise from this risk in this specific context, considering {company_info.name}'s supply chain and operations?
     5. Suggest 2-3 possible mitigation strategies tailored to this scenario and {company_info.name}'s sustainability goals.
 
-    Structure your response with clear headings for each point.
+    Respond with a single JSON object with these keys: "likelihood_and_impact_changes", "financial_implications",
+    "emerging_opportunities", "additional_challenges" and "mitigation_strategies" (strings), plus "impact_score",
+    "likelihood_score" and "adaptability_score" (numbers between 0 and 1 rating the risk's impact, likelihood and
+    {company_info.name}'s ability to adapt under this scenario).
     """
 
-    response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are an expert in climate risk assessment."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=1000
+    return LLMRequest(
+        prompt=prompt,
+        system_prompt="You are an expert in climate risk assessment.",
+        max_tokens=1000,
+        template_version=PROMPT_TEMPLATE_VERSIONS["risk_assessment"],
+        response_format="json_object"
     )
 
-    return parse_llm_response(response.choices[0].message['content'])
-
 def parse_llm_response(content: str) -> Dict[str, Any]:
-    sections = content.split('\n\n')
-    parsed_response = {}
-    current_section = ""
-    for section in sections:
-        if ':' in section:
-            title, text = section.split(':', 1)
-            current_section = title.strip().lower().replace(' ', '_')
-            parsed_response[current_section] = text.strip()
-        else:
-            parsed_response[current_section] += '\n' + section.strip()
-    return parsed_response
+    return parse_sections(content)
 
-def assess_aggregate_impact(risks: List[Risk], interaction_matrix: np.ndarray, num_simulations: int = 1000) -> Dict[str, float]:
-    n = len(risks)
+def assess_aggregate_impact(risks: List[Risk], interaction_matrix: InteractionMatrix, num_simulations: int = 1000, seed: Optional[int] = None,
+                            dtype: np.dtype = np.float64, chunk_size: int = PROPAGATION_CHUNK_SIZE, num_steps: int = PROPAGATION_STEPS,
+                            tolerance: Optional[float] = None) -> Dict[str, Any]:
+    # With a tolerance, levels are propagated to steady state and num_steps only caps the iterations
     base_impacts = np.array([risk.impact for risk in risks])
-    
-    aggregate_impacts = []
-    for _ in range(num_simulations):
-        risk_levels = np.random.beta(2, 2, n) * base_impacts
-        for _ in range(10):  # Simulate interactions for 10 time steps
-            influence = interaction_matrix @ risk_levels
-            risk_levels = np.clip(risk_levels + 0.1 * influence, 0, 1)
-        aggregate_impacts.append(np.sum(risk_levels))
+    aggregate_impacts, iterations = simulate_aggregate_impacts(base_impacts, interaction_matrix, num_simulations,
+                                                               np.random.default_rng(seed), dtype=dtype, chunk_size=chunk_size,
+                                                               num_steps=num_steps, tolerance=tolerance)
     
     return {
-        "mean": np.mean(aggregate_impacts),
-        "median": np.median(aggregate_impacts),
-        "95th_percentile": np.percentile(aggregate_impacts, 95),
-        "max": np.max(aggregate_impacts)
+        "mean": float(np.mean(aggregate_impacts)),
+        "median": float(np.median(aggregate_impacts)),
+        "95th_percentile": float(np.percentile(aggregate_impacts, 95)),
+        "max": float(np.max(aggregate_impacts)),
+        "propagation_iterations": iterations,
+        "distribution": aggregate_impacts
     }
 
-def identify_tipping_points(risks: List[Risk], interaction_matrix: np.ndarray) -> List[Dict[str, Any]]:
+def identify_tipping_points(risks: List[Risk], interaction_matrix: InteractionMatrix, resolution: int = TIPPING_SWEEP_RESOLUTION,
+                            num_steps: int = PROPAGATION_STEPS, refinement_rounds: int = TIPPING_REFINEMENT_ROUNDS,
+                            chunk_size: int = PROPAGATION_CHUNK_SIZE, tolerance: Optional[float] = None) -> List[Dict[str, Any]]:
     n = len(risks)
     base_impacts = np.array([risk.impact for risk in risks])
-    tipping_points = []
-
-    for i in range(n):
-        impact_levels = np.linspace(0, 1, 100)
-        aggregate_impacts = []
-        for level in impact_levels:
-            risk_levels = base_impacts.copy()
-            risk_levels[i] = level
-            for _ in range(10):  # Simulate interactions for 10 time steps
-                influence = interaction_matrix @ risk_levels
-                risk_levels = np.clip(risk_levels + 0.1 * influence, 0, 1)
-            aggregate_impacts.append(np.sum(risk_levels))
-        
-        # Detect sudden changes in the rate of change
-        rate_of_change = np.diff(aggregate_impacts)
-        threshold = np.mean(rate_of_change) + 2 * np.std(rate_of_change)
-        tipping_point_indices = np.where(rate_of_change > threshold)[0]
-        
-        if len(tipping_point_indices) > 0:
-            tipping_points.append({
-                "risk_id": risks[i].id,
-                "risk_description": risks[i].description,
-                "tipping_point_level": impact_levels[tipping_point_indices[0]],
-                "aggregate_impact": aggregate_impacts[tipping_point_indices[0]]
-            })
+    risk_indices = np.arange(n)
+    impact_levels = np.tile(np.linspace(0, 1, resolution), (n, 1))
+    aggregate_impacts, iterations = sweep_risk_levels(base_impacts, interaction_matrix, risk_indices, impact_levels, num_steps,
+                                                      chunk_size=chunk_size, tolerance=tolerance)
+    
+    # Detect sudden changes in the rate of change
+    rate_of_change = np.diff(aggregate_impacts, axis=1)
+    threshold = rate_of_change.mean(axis=1, keepdims=True) + 2 * rate_of_change.std(axis=1, keepdims=True)
+    above = rate_of_change > threshold
+    detected = np.flatnonzero(above.any(axis=1))
+    first_jump = above[detected].argmax(axis=1)
+    tipping_levels = impact_levels[detected, first_jump]
+    tipping_aggregates = aggregate_impacts[detected, first_jump]
+    
+    # Adaptive refinement: re-sweep only the interval containing each detected jump and follow its steepest step
+    lower, upper = tipping_levels, impact_levels[detected, first_jump + 1]
+    for _ in range(refinement_rounds):
+        if len(detected) == 0:
+            break
+        grid = np.linspace(lower, upper, resolution, axis=1)
+        refined, used = sweep_risk_levels(base_impacts, interaction_matrix, detected, grid, num_steps, chunk_size=chunk_size, tolerance=tolerance)
+        iterations = max(iterations, used)
+        steepest = np.diff(refined, axis=1).argmax(axis=1)
+        rows = np.arange(len(detected))
+        lower, upper = grid[rows, steepest], grid[rows, steepest + 1]
+        tipping_levels, tipping_aggregates = lower, refined[rows, steepest]
     
-    return tipping_points
+    return [{
+        "risk_id": risks[i].id,
+        "risk_description": risks[i].description,
+        "tipping_point_level": float(level),
+        "aggregate_impact": float(aggregate),
+        "propagation_iterations": iterations
+    } for i, level, aggregate in zip(detected, tipping_levels, tipping_aggregates)]
 
-def generate_risk_narratives(risks: List[Risk], comprehensive_analysis: Dict[str, Dict[int, str]]) -> Dict[int, str]:
-    risk_narratives = {}
+def generate_risk_narratives(risks: List[Risk], comprehensive_analysis: Dict[str, Dict[int, RiskAssessment]]) -> Dict[int, str]:
+    requests = []
     for risk in risks:
         scenario_analyses = {scenario: analyses[risk.id] for scenario, analyses in comprehensive_analysis.items()}
         prompt = RISK_NARRATIVE_PROMPT.format(
             company_name=COMPANY_INFO.name,
             industry=COMPANY_INFO.industry,
-            company_region=COMPANY_INFO.region,
+            company_region=', '.join(COMPANY_INFO.region),
             key_products=', '.join(COMPANY_INFO.key_products),
             risk_description=risk.description,
             risk_category=risk.category,
             risk_subcategory=risk.subcategory,
             risk_likelihood=risk.likelihood,
             risk_impact=risk.impact,
-            scenario_analyses="\n".join([f"{scenario}: {analysis}" for scenario, analysis in scenario_analyses.items()])
+            risk_time_horizon=risk.time_horizon,
+            scenario_analyses="\n".join([f"{scenario}: {analysis.raw}" for scenario, analysis in scenario_analyses.items()])
         )
+        requests.append(LLMRequest(
+            prompt=prompt,
+            system_prompt="You are an expert in climate risk assessment and scenario analysis.",
+            max_tokens=500,
+            template_version=PROMPT_TEMPLATE_VERSIONS["risk_narrative"]
+        ))
 
-        response = openai.ChatCompletion.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert in climate risk assessment and scenario analysis."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
+    narratives = get_llm_client().complete_many(requests, return_exceptions=True)
+    return {risk.id: response_or_default(narrative) for risk, narrative in zip(risks, narratives)}
 
-        risk_narratives[risk.id] = response.choices[0].message['content']
-    
-    return risk_narratives
-
-def generate_executive_insights(comprehensive_analysis: Dict[str, Dict[int, str]], risks: List[Risk]) -> str:
-    all_analyses = "\n\n".join([f"Risk: {risk.description}\n" + "\n".join([f"{scenario}: {analysis}" for scenario, analyses in comprehensive_analysis.items() for r_id, analysis in analyses.items() if r_id == risk.id]) for risk in risks])
+def generate_executive_insights(comprehensive_analysis: Dict[str, Dict[int, RiskAssessment]], risks: List[Risk]) -> str:
+    all_analyses = "\n\n".join([f"Risk: {risk.description}\n" + "\n".join([f"{scenario}: {analysis.raw}" for scenario, analyses in comprehensive_analysis.items() for r_id, analysis in analyses.items() if r_id == risk.id]) for risk in risks])
 
     prompt = EXECUTIVE_INSIGHTS_PROMPT.format(
         company_name=COMPANY_INFO.name,
         industry=COMPANY_INFO.industry,
-        company_region=COMPANY_INFO.region,
+        company_region=', '.join(COMPANY_INFO.region),
         key_products=', '.join(COMPANY_INFO.key_products),
         all_analyses=all_analyses
     )
 
-    response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a senior climate risk analyst providing insights to top executives."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=800
-    )
-
-    return response.choices[0].message['content']
+    return get_llm_client().complete(LLMRequest(
+        prompt=prompt,
+        system_prompt="You are a senior climate risk analyst providing insights to top executives.",
+        max_tokens=800,
+        template_version=PROMPT_TEMPLATE_VERSIONS["executive_insights"]
+    ))
 
-def perform_cross_scenario_analysis(comprehensive_analysis: Dict[str, Dict[int, str]]) -> Dict[int, Dict[str, Dict[str, float]]]:
+def perform_cross_scenario_analysis(comprehensive_analysis: Dict[str, Dict[int, RiskAssessment]]) -> Dict[int, Dict[str, Dict[str, float]]]:
     cross_scenario_results = {}
     for risk_id in comprehensive_analysis[next(iter(comprehensive_analysis))].keys():
         risk_results = {}
         for scenario, analyses in comprehensive_analysis.items():
             analysis = analyses[risk_id]
-            impact_score = extract_impact_score(analysis)
-            likelihood_score = extract_likelihood_score(analysis)
-            adaptability_score = extract_adaptability_score(analysis)
-            
             risk_results[scenario] = {
-                "impact": impact_score,
-                "likelihood": likelihood_score,
-                "adaptability": adaptability_score
+                "impact": analysis.impact,
+                "likelihood": analysis.likelihood,
+                "adaptability": analysis.adaptability
             }
         cross_scenario_results[risk_id] = risk_results
     return cross_scenario_results
@@ -242,45 +234,37 @@ def identify_key_uncertainties(cross_scenario_results: Dict[int, Dict[str, Dict[
             uncertainties.append(risk_id)
     return uncertainties
 
-def generate_mitigation_strategies(risks: List[Risk], comprehensive_analysis: Dict[str, Dict[int, str]]) -> Dict[int, List[str]]:
-    mitigation_strategies = {}
+def generate_mitigation_strategies(risks: List[Risk], comprehensive_analysis: Dict[str, Dict[int, RiskAssessment]]) -> Dict[int, List[str]]:
+    requests = []
     for risk in risks:
         prompt = MITIGATION_STRATEGY_PROMPT.format(
+            company_name=COMPANY_INFO.name,
+            industry=COMPANY_INFO.industry,
+            company_region=', '.join(COMPANY_INFO.region),
+            key_products=', '.join(COMPANY_INFO.key_products),
             risk_description=risk.description,
             risk_category=risk.category,
             risk_subcategory=risk.subcategory,
-            scenario_analyses="\n".join([f"Scenario: {scenario}\nAnalysis: {analyses[risk.id]}" for scenario, analyses in comprehensive_analysis.items()])
-        )
-        
-        response = openai.ChatCompletion.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert in climate risk mitigation and adaptation strategies."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=600
+            scenario_analyses="\n".join([f"Scenario: {scenario}\nAnalysis: {analyses[risk.id].raw}" for scenario, analyses in comprehensive_analysis.items()])
         )
-        
-        strategies = parse_mitigation_strategies(response.choices[0].message['content'])
-        mitigation_strategies[risk.id] = strategies
-    
-    return mitigation_strategies
+        requests.append(LLMRequest(
+            prompt=prompt,
+            system_prompt="You are an expert in climate risk mitigation and adaptation strategies.",
+            max_tokens=600,
+            template_version=PROMPT_TEMPLATE_VERSIONS["mitigation_strategy"]
+        ))
+
+    responses = get_llm_client().complete_many(requests, return_exceptions=True)
+    return {risk.id: parse_mitigation_strategies(response_or_default(content)) for risk, content in zip(risks, responses)}
 
 def extract_impact_score(analysis: str) -> float:
-    impact_pattern = r"impact.*?(\d+(?:\.\d+)?)"
-    match = re.search(impact_pattern, analysis, re.IGNORECASE)
-    return float(match.group(1)) if match else 0.5
+    return extract_labelled_score(analysis, "impact")
 
 def extract_likelihood_score(analysis: str) -> float:
-    likelihood_pattern = r"likelihood.*?(\d+(?:\.\d+)?)"
-    match = re.search(likelihood_pattern, analysis, re.IGNORECASE)
-    return float(match.group(1)) if match else 0.5
+    return extract_labelled_score(analysis, "likelihood")
 
 def extract_adaptability_score(analysis: str) -> float:
-    adaptability_pattern = r"adaptability.*?(\d+(?:\.\d+)?)"
-    match = re.search(adaptability_pattern, analysis, re.IGNORECASE)
-    return float(match.group(1)) if match else 0.5
+    return extract_labelled_score(analysis, "adaptability")
 
 def parse_mitigation_strategies(content: str) -> List[str]:
     strategies = re.findall(r'\d+\.\s*(.*?)(?=\n\d+\.|\Z)', content, re.DOTALL)
@@ -0,0 +1,156 @@
+from typing import Dict, Hashable, List, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from src.config import CASCADE_THRESHOLD, CASCADE_MAX_STEPS, CASCADE_INDEX_CHUNK_SIZE, CASCADE_INDEX_CACHE_SIZE
+from src.risk_analysis.network_utils import graph_adjacency, graph_fingerprint, node_index, seed_mask
+
+@dataclass
+class CascadeResult:
+    # Batched threshold-cascade outcome, one row per seed set. A node keeps the influence it was activated with
+    # (seeds start at 1.0) from activation_index onwards, so the full (n x steps) progression never has to be
+    # stored while the cascade runs.
+    nodelist: List[Hashable]
+    seed_sets: List[List[Hashable]]
+    seeds: np.ndarray  # (batch, n) bool
+    values: np.ndarray  # (batch, n) activation level, 0.0 when never activated
+    activation_index: np.ndarray  # (batch, n) first progression index holding the activation, -1 when never activated
+    steps_run: np.ndarray  # (batch,) steps that activated at least one node
+
+    @property
+    def active(self) -> np.ndarray:
+        return self.activation_index >= 0
+
+    def progression(self, row: int) -> np.ndarray:
+        # (n, steps_run + 1) levels of every node over time for one seed set
+        time = np.arange(self.steps_run[row] + 1)
+        started = (self.activation_index[row][:, None] <= time) & self.active[row][:, None]
+        return np.where(started, self.values[row][:, None], 0.0)
+
+    def to_dict(self, row: int) -> Dict[Hashable, List[float]]:
+        # Same shape as the legacy per-node lists: seeds first in the order given, then activations by step
+        progression = self.progression(row)
+        length = progression.shape[1]
+        cascade = {seed: [1.0] * length for seed in self.seed_sets[row]}
+        activated = np.flatnonzero(self.active[row] & ~self.seeds[row])
+        for position in activated[np.argsort(self.activation_index[row, activated], kind='stable')]:
+            cascade[self.nodelist[position]] = progression[position].tolist()
+        return cascade
+
+def simulate_cascades(adjacency: sparse.csr_matrix, seeds: np.ndarray, threshold: float = 0.5,
+                      max_steps: int = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Synchronous threshold cascade for a batch of seed masks: each step, every inactive node whose weighted
+    # sum of neighbour levels exceeds threshold activates at that level. A seed set stops at its first step
+    # without new activations. Returns the (batch, n) activation levels and indices and the steps each set ran.
+    seeds = np.atleast_2d(seeds)
+    batch = seeds.shape[0]
+    values = seeds.astype(float)
+    activation_index = np.where(seeds, 0, -1)
+    steps_run = np.zeros(batch, dtype=int)
+    running = np.ones(batch, dtype=bool)
+
+    for step in range(max_steps):
+        influence = np.asarray(adjacency @ values.T).T
+        new = (activation_index < 0) & (influence > threshold) & running[:, None]
+        running &= new.any(axis=1)
+        if not running.any():
+            break
+        values[new] = influence[new]
+        activation_index[new] = step
+        steps_run += running
+
+    return values, activation_index, steps_run
+
+def run_cascades(G: nx.Graph, seed_sets: List[List[Hashable]], threshold: float = 0.5, max_steps: int = 10) -> CascadeResult:
+    adjacency, nodelist = graph_adjacency(G)
+    seeds = seed_mask(seed_sets, nodelist)
+    values, activation_index, steps_run = simulate_cascades(adjacency, seeds, threshold, max_steps)
+    return CascadeResult(nodelist=nodelist, seed_sets=[list(dict.fromkeys(seed_set)) for seed_set in seed_sets], seeds=seeds,
+                         values=values, activation_index=activation_index, steps_run=steps_run)
+
+def cascade_each_risk(G: nx.Graph, risk_ids: List[Hashable], threshold: float = 0.5, max_steps: int = 10) -> Dict[Hashable, Dict[Hashable, List[float]]]:
+    # Cascade test of every risk on its own, evaluated as one batch
+    result = run_cascades(G, [[risk_id] for risk_id in risk_ids], threshold, max_steps)
+    return {risk_id: result.to_dict(row) for row, risk_id in enumerate(risk_ids)}
+
+@dataclass
+class CascadeIndex:
+    # Outcome of cascading every node of a network on its own. Row i of the CSR matrix lists the risks seed i
+    # activated, the seed included, with activation step + 1 as the value (1 for the seed), so storage grows with
+    # the number of activations rather than n^2. The fingerprint ties the index to the exact edges and weights it
+    # was built from.
+    nodelist: List[Hashable]
+    threshold: float
+    max_steps: int
+    fingerprint: str
+    activations: sparse.csr_matrix  # (n, n) activation step + 1, sorted column indices
+
+    def __post_init__(self):
+        self.index = node_index(self.nodelist)
+
+    def _row(self, seed: Hashable) -> Tuple[np.ndarray, np.ndarray]:
+        i = self.index[seed]
+        row = slice(self.activations.indptr[i], self.activations.indptr[i + 1])
+        return self.activations.indices[row], self.activations.data[row]
+
+    def activation_step(self, seed: Hashable, target: Hashable) -> int:
+        # 0 for the seed itself, -1 if the seed's cascade never reaches the target
+        columns, steps = self._row(seed)
+        j = self.index[target]
+        position = np.searchsorted(columns, j)
+        return int(steps[position]) - 1 if position < len(columns) and columns[position] == j else -1
+
+    def activates(self, seed: Hashable, target: Hashable) -> bool:
+        return self.activation_step(seed, target) >= 0
+
+    def cascade_reach(self, seed: Hashable) -> int:
+        # Risks activated by the seed, excluding the seed
+        return len(self._row(seed)[0]) - 1
+
+    def activated(self, seed: Hashable) -> List[Hashable]:
+        # Risks activated by the seed, in activation order
+        columns, steps = self._row(seed)
+        later = steps > 1
+        order = np.argsort(steps[later], kind='stable')
+        return [self.nodelist[position] for position in columns[later][order]]
+
+    def is_current(self, G: nx.Graph) -> bool:
+        return graph_fingerprint(G) == self.fingerprint
+
+def build_cascade_index(G: nx.Graph, threshold: float = CASCADE_THRESHOLD, max_steps: int = CASCADE_MAX_STEPS,
+                        chunk_size: int = CASCADE_INDEX_CHUNK_SIZE) -> CascadeIndex:
+    # All single-node seeds are cascaded chunk_size at a time through the batch engine; only the activated
+    # (seed, target, step) triples are kept, never the per-seed activation levels
+    adjacency, nodelist = graph_adjacency(G)
+    n = len(nodelist)
+    step_dtype = np.int8 if max_steps + 1 < np.iinfo(np.int8).max else np.int16
+    chunks = []
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        seeds = np.zeros((stop - start, n), dtype=bool)
+        seeds[np.arange(stop - start), np.arange(start, stop)] = True
+        _, activation_index, _ = simulate_cascades(adjacency, seeds, threshold, max_steps)
+        rows, columns = np.nonzero(activation_index >= 0)
+        # activation_index counts from the seed's own slot, so step k of the cascade is index k - 1, stored as k + 1
+        steps = np.where(seeds[rows, columns], 1, activation_index[rows, columns] + 2).astype(step_dtype)
+        chunks.append(sparse.csr_matrix((steps, (rows, columns)), shape=(stop - start, n)))
+    activations = sparse.vstack(chunks, format='csr') if chunks else sparse.csr_matrix((0, 0), dtype=step_dtype)
+    activations.sort_indices()
+    return CascadeIndex(nodelist=nodelist, threshold=threshold, max_steps=max_steps, fingerprint=graph_fingerprint(G),
+                        activations=activations)
+
+_cascade_indexes: Dict[Tuple[str, float, int], CascadeIndex] = OrderedDict()
+
+def get_cascade_index(G: nx.Graph, threshold: float = CASCADE_THRESHOLD, max_steps: int = CASCADE_MAX_STEPS) -> CascadeIndex:
+    # Reuses the index for an unchanged network; any edge or weight change alters the fingerprint and forces a rebuild
+    key = (graph_fingerprint(G), threshold, max_steps)
+    if key in _cascade_indexes:
+        _cascade_indexes.move_to_end(key)
+        return _cascade_indexes[key]
+    cascade_index = build_cascade_index(G, threshold, max_steps)
+    _cascade_indexes[key] = cascade_index
+    while len(_cascade_indexes) > CASCADE_INDEX_CACHE_SIZE:
+        _cascade_indexes.popitem(last=False)
+    return cascade_index
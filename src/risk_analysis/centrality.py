@@ -0,0 +1,137 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
+import heapq
+import itertools
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import eigs, eigsh
+from src.config import (CENTRALITY_BETWEENNESS_SAMPLES, CENTRALITY_CONFIDENCE, CENTRALITY_SEED, CENTRALITY_TOLERANCE,
+                        CENTRALITY_MAX_ITERATIONS, PAGERANK_ALPHA, CENTRALITY_CACHE_SIZE, DENSE_EIGEN_LIMIT)
+from src.risk_analysis.network_utils import graph_adjacency, graph_fingerprint
+
+CENTRALITY_MEASURES = ("degree", "betweenness", "eigenvector", "pagerank")
+
+def eigenvector_centrality(G: nx.Graph, weight: str = 'weight') -> Dict[Hashable, float]:
+    # Principal eigenvector of the weighted adjacency (of A^T for directed graphs, matching networkx), unit
+    # Euclidean norm and non-negative sign
+    adjacency, nodelist = graph_adjacency(G, weight=weight)
+    n = len(nodelist)
+    if n == 0:
+        return {}
+    matrix = adjacency.T if G.is_directed() else adjacency
+    if n <= DENSE_EIGEN_LIMIT:
+        dense = matrix.toarray()
+        if G.is_directed():
+            eigenvalues, eigenvectors = np.linalg.eig(dense)
+        else:
+            eigenvalues, eigenvectors = np.linalg.eigh(dense)
+        vector = eigenvectors[:, np.argmax(eigenvalues.real)].real
+    elif G.is_directed():
+        vector = eigs(matrix.astype(float), k=1, which='LR', maxiter=CENTRALITY_MAX_ITERATIONS * n)[1][:, 0].real
+    else:
+        vector = eigsh(matrix.astype(float), k=1, which='LA', maxiter=CENTRALITY_MAX_ITERATIONS * n)[1][:, 0]
+    vector = vector * np.sign(vector.sum() or 1)
+    vector = vector / (np.linalg.norm(vector) or 1)
+    return dict(zip(nodelist, vector.tolist()))
+
+def pagerank(G: nx.Graph, alpha: float = PAGERANK_ALPHA, tolerance: float = CENTRALITY_TOLERANCE,
+             max_iterations: int = CENTRALITY_MAX_ITERATIONS, weight: str = 'weight') -> Dict[Hashable, float]:
+    # Power iteration over the sparse row-stochastic matrix; dangling nodes redistribute uniformly as in networkx
+    adjacency, nodelist = graph_adjacency(G, weight=weight)
+    n = len(nodelist)
+    if n == 0:
+        return {}
+    out_strength = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_strength == 0
+    inverse_strength = np.divide(1.0, out_strength, out=np.zeros(n), where=~dangling)
+    transition_t = (sparse.diags(inverse_strength) @ adjacency).T.tocsr()
+
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        previous = ranks
+        ranks = alpha * (transition_t @ previous) + (alpha * previous[dangling].sum() + 1 - alpha) / n
+        if np.abs(ranks - previous).sum() < n * tolerance:
+            return dict(zip(nodelist, ranks.tolist()))
+    raise nx.PowerIterationFailedConvergence(max_iterations)
+
+def betweenness_centrality(G: nx.Graph, samples: Optional[int] = None, seed: int = CENTRALITY_SEED,
+                           weight: str = 'weight') -> Dict[Hashable, float]:
+    # Exact Brandes betweenness, or the k-pivot estimate from `samples` source nodes (see betweenness_error_bound)
+    if samples is None or samples >= G.number_of_nodes():
+        return nx.betweenness_centrality(G, weight=weight)
+    return nx.betweenness_centrality(G, k=samples, weight=weight, seed=seed)
+
+def source_dependencies(G: nx.Graph, source: Hashable, weight: str = 'weight') -> Dict[Hashable, float]:
+    # Brandes' single-source dependency delta_s(v) = sum_t sigma_st(v) / sigma_st over weighted shortest paths.
+    # Exact betweenness is the sum over every source (halved when undirected), so a source's term can be swapped
+    # out alone when an edit only changes its shortest paths.
+    order, predecessors, sigma, settled = [], {source: []}, {source: 1.0}, set()
+    seen = {source: 0}
+    counter = itertools.count()
+    heap = [(0, next(counter), source, source)]
+    while heap:
+        dist, _, pred, v = heapq.heappop(heap)
+        if v in settled:
+            continue
+        if v != source:
+            sigma[v] += sigma[pred]
+        order.append(v)
+        settled.add(v)
+        for w, data in G[v].items():
+            vw_dist = dist + data.get(weight, 1)
+            if w not in settled and (w not in seen or vw_dist < seen[w]):
+                seen[w] = vw_dist
+                heapq.heappush(heap, (vw_dist, next(counter), v, w))
+                sigma[w] = 0.0
+                predecessors[w] = [v]
+            elif vw_dist == seen[w]:
+                sigma[w] += sigma[v]
+                predecessors[w].append(v)
+
+    delta = dict.fromkeys(order, 0.0)
+    for w in reversed(order):
+        coefficient = (1 + delta[w]) / sigma[w]
+        for v in predecessors[w]:
+            delta[v] += sigma[v] * coefficient
+    del delta[source]
+    return delta
+
+def betweenness_error_bound(num_nodes: int, samples: Optional[int], confidence: float = CENTRALITY_CONFIDENCE) -> float:
+    # Each pivot contributes n * dependency / ((n-1)(n-2)), which lies in [0, n/(n-1)]. Hoeffding plus a union bound
+    # over nodes gives the distance every sampled normalized betweenness stays within with probability >= confidence.
+    if samples is None or samples >= num_nodes or num_nodes <= 2:
+        return 0.0
+    value_range = num_nodes / (num_nodes - 1)
+    return float(value_range * np.sqrt(np.log(2 * num_nodes / (1 - confidence)) / (2 * samples)))
+
+_centrality_cache: Dict[Tuple, Dict[Hashable, float]] = OrderedDict()
+
+def compute_centrality(G: nx.Graph, measure: str, betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES,
+                       seed: int = CENTRALITY_SEED) -> Dict[Hashable, float]:
+    if measure == "degree":
+        return nx.degree_centrality(G)
+    if measure == "betweenness":
+        return betweenness_centrality(G, betweenness_samples, seed)
+    if measure == "eigenvector":
+        return eigenvector_centrality(G)
+    if measure == "pagerank":
+        return pagerank(G)
+    raise ValueError(f"Unknown centrality measure: {measure}")
+
+def get_centrality(G: nx.Graph, measures: List[str] = CENTRALITY_MEASURES, betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES,
+                   seed: int = CENTRALITY_SEED) -> Dict[str, Dict[Hashable, float]]:
+    # Every consumer shares one computation of each measure per graph version; the fingerprint changes with any
+    # node, edge or weight change
+    fingerprint = graph_fingerprint(G)
+    results = {}
+    for measure in measures:
+        key = (fingerprint, measure) + ((betweenness_samples, seed) if measure == "betweenness" else ())
+        if key in _centrality_cache:
+            _centrality_cache.move_to_end(key)
+        else:
+            _centrality_cache[key] = compute_centrality(G, measure, betweenness_samples, seed)
+            while len(_centrality_cache) > CENTRALITY_CACHE_SIZE:
+                _centrality_cache.popitem(last=False)
+        results[measure] = _centrality_cache[key]
+    return results
@@ -0,0 +1,67 @@
+from typing import Dict, Hashable, List, Optional, Set
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import eigsh
+from sklearn.cluster import KMeans
+from src.config import CLUSTERING_METHOD, CLUSTERING_RESOLUTION, CLUSTERING_MAX_CLUSTERS, CLUSTERING_SEED, DENSE_EIGEN_LIMIT
+from src.risk_analysis.network_utils import graph_adjacency
+
+def cluster_risk_network(G: nx.Graph, method: str = CLUSTERING_METHOD, num_clusters: Optional[int] = None,
+                         seed: int = CLUSTERING_SEED) -> Dict[Hashable, int]:
+    if method == "louvain":
+        return louvain_clusters(G, seed=seed)
+    if method == "spectral":
+        return spectral_clusters(G, num_clusters, seed=seed)
+    raise ValueError(f"Unknown clustering method: {method}")
+
+def louvain_clusters(G: nx.Graph, resolution: float = CLUSTERING_RESOLUTION, seed: int = CLUSTERING_SEED) -> Dict[Hashable, int]:
+    # Modularity optimisation picks the number of clusters itself
+    communities = nx.community.louvain_communities(G, weight='weight', resolution=resolution, seed=seed)
+    return labels_from_communities(G, communities)
+
+def spectral_clusters(G: nx.Graph, num_clusters: Optional[int] = None, max_clusters: int = CLUSTERING_MAX_CLUSTERS,
+                      seed: int = CLUSTERING_SEED) -> Dict[Hashable, int]:
+    # Normalized spectral clustering on the CSR adjacency: KMeans runs on the n x k eigenvector embedding rather
+    # than on n x n adjacency rows. Without num_clusters, k is chosen at the largest gap between consecutive
+    # eigenvalues of the normalized adjacency (equivalently of the normalized Laplacian).
+    adjacency, nodelist = graph_adjacency(G)
+    n = len(nodelist)
+    if n == 0:
+        return {}
+    if n <= 2:
+        return labels_from_communities(G, list(nx.connected_components(G.to_undirected())))
+
+    adjacency = abs(adjacency + adjacency.T) / 2
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    inverse_sqrt = np.divide(1.0, np.sqrt(degree), out=np.zeros(n), where=degree > 0)
+    normalized = sparse.diags(inverse_sqrt) @ adjacency @ sparse.diags(inverse_sqrt)
+
+    num_eigenvectors = min(num_clusters or max_clusters, n - 2) + 1
+    if n <= DENSE_EIGEN_LIMIT:
+        eigenvalues, eigenvectors = np.linalg.eigh(normalized.toarray())
+        eigenvalues, eigenvectors = eigenvalues[-num_eigenvectors:], eigenvectors[:, -num_eigenvectors:]
+    else:
+        eigenvalues, eigenvectors = eigsh(normalized.tocsr(), k=num_eigenvectors, which='LA')
+    order = np.argsort(eigenvalues)[::-1]
+    eigenvalues, eigenvectors = eigenvalues[order], eigenvectors[:, order]
+
+    if num_clusters is None:
+        num_clusters = int(np.argmax(-np.diff(eigenvalues))) + 1
+    num_clusters = min(num_clusters, n)
+    embedding = eigenvectors[:, :num_clusters]
+    norms = np.linalg.norm(embedding, axis=1, keepdims=True)
+    embedding = np.divide(embedding, norms, out=np.zeros_like(embedding), where=norms > 0)
+    labels = KMeans(n_clusters=num_clusters, n_init=10, random_state=seed).fit_predict(embedding)
+
+    communities = [set() for _ in range(num_clusters)]
+    for node, label in zip(nodelist, labels):
+        communities[label].add(node)
+    return labels_from_communities(G, [community for community in communities if community])
+
+def labels_from_communities(G: nx.Graph, communities: List[Set[Hashable]]) -> Dict[Hashable, int]:
+    # Largest cluster gets label 0, ties broken by first node in graph order, so labels are stable across methods
+    position = {node: i for i, node in enumerate(G.nodes())}
+    ordered = sorted(communities, key=lambda community: (-len(community), min(position[node] for node in community)))
+    labels = {node: label for label, community in enumerate(ordered) for node in community}
+    return {node: labels[node] for node in G.nodes()}
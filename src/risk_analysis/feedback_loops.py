@@ -0,0 +1,70 @@
+from typing import Hashable, Iterator, List, Optional, Tuple
+import heapq
+import itertools
+import logging
+import networkx as nx
+from src.config import FEEDBACK_LOOP_MAX_LENGTH, FEEDBACK_LOOP_MIN_WEIGHT, FEEDBACK_LOOP_MAX_LOOPS, FEEDBACK_LOOP_MAX_EXPANSIONS
+
+logger = logging.getLogger(__name__)
+
+def iter_feedback_loops(G: nx.Graph, max_length: int = FEEDBACK_LOOP_MAX_LENGTH, min_weight: float = FEEDBACK_LOOP_MIN_WEIGHT,
+                        min_length: int = 3, max_expansions: Optional[int] = FEEDBACK_LOOP_MAX_EXPANSIONS) -> Iterator[Tuple[List[Hashable], float]]:
+    # Best-first search over simple paths, yielding (loop, product of edge weights) strongest first. Neighbours are
+    # sorted by weight once, and a heap entry is a path plus a cursor into its last node's neighbours: popping it
+    # extends the path by that one neighbour and re-queues the path at the next cursor. Each pop adds at most three
+    # entries, so memory grows with the number of expansions, not expansions times degree. An entry's priority is
+    # an upper bound on any loop completing it, so a closed loop popped from the heap beats everything still queued.
+    # Each loop is rooted at its first node in graph order and, when undirected, reported in one direction only.
+    position = {node: i for i, node in enumerate(G.nodes())}
+    neighbors = {node: sorted(((neighbor, data.get('weight', 1)) for neighbor, data in G.adj[node].items()
+                               if neighbor != node and data.get('weight', 1) >= min_weight), key=lambda item: -item[1])
+                 for node in G.nodes()}
+    closing = {node: dict(edges) for node, edges in neighbors.items()}
+    max_weight = max((edges[0][1] for edges in neighbors.values() if edges), default=1)
+
+    def remaining_factor(path_length: int) -> float:
+        # Largest product the edges still missing from a loop through a path of path_length nodes can contribute:
+        # as few edges as possible when weights are at most 1, as many as allowed otherwise
+        if max_weight <= 1:
+            return max_weight ** max(1, min_length - path_length + 1)
+        return max_weight ** (max_length - path_length + 1)
+
+    counter = itertools.count()
+    heap = []
+
+    def push_cursor(path: Tuple, product: float, cursor: int) -> None:
+        edges = neighbors[path[-1]]
+        if cursor < len(edges):
+            bound = product * edges[cursor][1] * remaining_factor(len(path) + 1)
+            # Ties prefer closed loops, then longer paths, so equal-weight graphs are explored depth first
+            heapq.heappush(heap, (-bound, 1, -len(path), next(counter), path, product, cursor))
+
+    def push_path(path: Tuple, product: float) -> None:
+        start, last = path[0], path[-1]
+        weight = closing[last].get(start)
+        if weight is not None and len(path) >= min_length and (G.is_directed() or position[path[1]] < position[last]):
+            heapq.heappush(heap, (-product * weight, 0, 0, next(counter), path, product * weight, None))
+        if len(path) < max_length:
+            push_cursor(path, product, 0)
+
+    for node in G.nodes():
+        push_cursor((node,), 1.0, 0)
+    expansions = 0
+    while heap:
+        _, _, _, _, path, product, cursor = heapq.heappop(heap)
+        if cursor is None:
+            yield list(path), product
+            continue
+        if max_expansions is not None and expansions >= max_expansions:
+            logger.warning(f"Feedback loop search stopped after {max_expansions} expansions; weaker loops were not enumerated")
+            return
+        expansions += 1
+
+        push_cursor(path, product, cursor + 1)
+        neighbor, weight = neighbors[path[-1]][cursor]
+        if position[neighbor] > position[path[0]] and neighbor not in path:
+            push_path(path + (neighbor,), product * weight)
+
+def strongest_feedback_loops(G: nx.Graph, top_k: int = FEEDBACK_LOOP_MAX_LOOPS, max_length: int = FEEDBACK_LOOP_MAX_LENGTH,
+                             min_weight: float = FEEDBACK_LOOP_MIN_WEIGHT) -> List[Tuple[List[Hashable], float]]:
+    return list(itertools.islice(iter_feedback_loops(G, max_length, min_weight), top_k))
@@ -1,49 +1,204 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
+from dataclasses import dataclass
+from functools import cached_property
 from src.models import Risk, RiskInteraction
-from src.config import LLM_MODEL, LLM_API_KEY
-from src.prompts import INTERACTION_ANALYSIS_PROMPT
-import openai
+from src.config import (COMPANY_INFO, INTERACTION_CANDIDATES_PER_RISK, INTERACTION_BATCH_SIZE, PROPAGATION_STEPS,
+                        CENTRALITY_BETWEENNESS_SAMPLES, CLUSTERING_METHOD, FEEDBACK_LOOP_MAX_LENGTH, FEEDBACK_LOOP_MIN_WEIGHT,
+                        FEEDBACK_LOOP_MAX_LOOPS, CASCADE_THRESHOLD, CASCADE_MAX_STEPS)
+from src.prompts import (INTERACTION_ANALYSIS_PROMPT, BATCH_INTERACTION_ANALYSIS_PROMPT, BATCH_INTERACTION_PARTNER_TEMPLATE,
+                         PROMPT_TEMPLATE_VERSIONS)
+from src.llm_client import LLMRequest, get_llm_client, response_or_default
+from src.llm_parsing import parse_json_response, parse_interaction_response
+from src.risk_analysis.interaction_candidates import select_candidate_pairs, candidate_recall_report
+from src.risk_analysis.propagation import InteractionMatrix, prepare_interaction_matrix, propagation_step, propagate_to_steady_state
+from src.risk_analysis.cascade_engine import run_cascades
+from src.risk_analysis.centrality import get_centrality
+from src.risk_analysis.feedback_loops import strongest_feedback_loops
+from src.risk_analysis.clustering import cluster_risk_network
 import networkx as nx
 import numpy as np
+from scipy import sparse
 from scipy.stats import pearsonr
-from sklearn.cluster import KMeans
 
-openai.api_key = LLM_API_KEY
+@dataclass
+class InteractionStore:
+    # Canonical result of the interaction stage: every consumer reads the list, matrix or graph view from here
+    # instead of re-running the pairwise LLM analysis.
+    risks: List[Risk]
+    interactions: List[RiskInteraction]
+    csr: sparse.csr_matrix
+    graph: nx.Graph
+
+    @cached_property
+    def matrix(self) -> np.ndarray:
+        # Dense view for reporting and visualization; propagation should use propagation_matrix()
+        return self.csr.toarray()
+
+    def sparse_matrix(self) -> sparse.csr_matrix:
+        return self.csr
+
+    def propagation_matrix(self) -> InteractionMatrix:
+        return prepare_interaction_matrix(self.csr)
+
+def compute_risk_interactions(risks: List[Risk], max_candidates_per_risk: Optional[int] = INTERACTION_CANDIDATES_PER_RISK) -> InteractionStore:
+    interactions = analyze_risk_interactions(risks, max_candidates_per_risk)
+    return InteractionStore(
+        risks=risks,
+        interactions=interactions,
+        csr=sparse_interaction_matrix(risks, interactions),
+        graph=build_risk_network(risks, interactions)
+    )
+
+def interaction_matrix_from_interactions(risks: List[Risk], interactions: List[RiskInteraction]) -> np.ndarray:
+    index = {risk.id: i for i, risk in enumerate(risks)}
+    matrix = np.zeros((len(risks), len(risks)))
+    for interaction in interactions:
+        i, j = index[interaction.risk1_id], index[interaction.risk2_id]
+        matrix[i, j] = matrix[j, i] = interaction.interaction_score
+    return matrix
+
+def sparse_interaction_matrix(risks: List[Risk], interactions: List[RiskInteraction]) -> sparse.csr_matrix:
+    # Built straight from the symmetric edge list so large networks never materialize an n x n array
+    index = {risk.id: i for i, risk in enumerate(risks)}
+    rows = np.array([index[interaction.risk1_id] for interaction in interactions], dtype=np.int64)
+    cols = np.array([index[interaction.risk2_id] for interaction in interactions], dtype=np.int64)
+    scores = np.array([interaction.interaction_score for interaction in interactions], dtype=float)
+    matrix = sparse.coo_matrix((np.concatenate([scores, scores]), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+                               shape=(len(risks), len(risks))).tocsr()
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    return matrix
+
+def analyze_risk_interactions(risks: List[Risk], max_candidates_per_risk: Optional[int] = INTERACTION_CANDIDATES_PER_RISK,
+                              batch_size: int = INTERACTION_BATCH_SIZE) -> List[RiskInteraction]:
+    # Only the most similar partners of each risk are sent to the LLM. Pruned pairs get no interaction at all, so the
+    # list, matrix and graph stay as sparse as the candidate set.
+    candidates = sorted(select_candidate_pairs(risks, max_candidates_per_risk))
+    scored = score_interaction_pairs(risks, candidates, batch_size)
 
-def analyze_risk_interactions(risks: List[Risk]) -> List[RiskInteraction]:
     interactions = []
-    for i, risk1 in enumerate(risks):
-        for j, risk2 in enumerate(risks[i+1:], start=i+1):
-            prompt = INTERACTION_ANALYSIS_PROMPT.format(
-                risk1_description=risk1.description,
-                risk1_category=risk1.category,
-                risk1_subcategory=risk1.subcategory,
-                risk2_description=risk2.description,
-                risk2_category=risk2.category,
-                risk2_subcategory=risk2.subcategory
-            )
-
-            response = openai.ChatCompletion.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are an expert in climate risk assessment and risk interactions."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=400
-            )
-
-            analysis = response.choices[0].message['content']
-            interaction_score = extract_interaction_score(analysis)
+    for i, j in candidates:
+        if (i, j) in scored:
+            interaction_score, analysis = scored[(i, j)]
             interaction_type = determine_interaction_type(interaction_score)
-            interactions.append(RiskInteraction(risk1.id, risk2.id, interaction_score, interaction_type, analysis))
+            interactions.append(RiskInteraction(risks[i].id, risks[j].id, interaction_score, interaction_type, analysis))
 
     return interactions
 
+def score_interaction_pairs(risks: List[Risk], pairs: List[Tuple[int, int]], batch_size: int = INTERACTION_BATCH_SIZE) -> Dict[Tuple[int, int], Tuple[float, str]]:
+    client = get_llm_client()
+    if batch_size <= 1:
+        # Pairs whose request still fails after retries are left unscored
+        analyses = client.complete_many([build_interaction_request(risks[i], risks[j]) for i, j in pairs], return_exceptions=True)
+        return {pair: (extract_interaction_score(analysis), analysis) for pair, analysis in zip(pairs, analyses)
+                if not isinstance(analysis, Exception)}
+
+    # One request scores a risk against a block of its partners, so the shared context is sent once per block
+    partners: Dict[int, List[int]] = {}
+    for i, j in pairs:
+        partners.setdefault(i, []).append(j)
+    blocks = [(i, js[k:k+batch_size]) for i, js in partners.items() for k in range(0, len(js), batch_size)]
+    responses = client.complete_many([build_batch_interaction_request(risks[i], [risks[j] for j in block]) for i, block in blocks],
+                                     return_exceptions=True)
+
+    scored = {}
+    for (i, block), content in zip(blocks, responses):
+        parsed = parse_batch_interaction_response(response_or_default(content), [risks[j].id for j in block])
+        for j in block:
+            if risks[j].id in parsed:
+                scored[(i, j)] = parsed[risks[j].id]
+
+    # Only pairs the batch response left out or got wrong are retried one request per pair
+    missing = [pair for pair in pairs if pair not in scored]
+    if missing:
+        scored.update(score_interaction_pairs(risks, missing, batch_size=1))
+    return scored
+
+def evaluate_candidate_recall(risks: List[Risk], max_candidates_per_risk: int = INTERACTION_CANDIDATES_PER_RISK,
+                              sample_size: int = 30, seed: int = 42) -> Dict[str, float]:
+    # Scores every pair of a random sample exhaustively and reports how much the pruning would have missed
+    rng = np.random.default_rng(seed)
+    sample_indices = np.sort(rng.choice(len(risks), size=min(sample_size, len(risks)), replace=False))
+    sample = [risks[i] for i in sample_indices]
+    exhaustive = analyze_risk_interactions(sample, max_candidates_per_risk=None)
+
+    # Candidates are selected over the full register, as in a real run, then restricted to the sample
+    position = {risk_index: k for k, risk_index in enumerate(sample_indices.tolist())}
+    candidates = {(position[i], position[j]) for i, j in select_candidate_pairs(risks, max_candidates_per_risk)
+                  if i in position and j in position}
+    # A pruned pair has no edge, so its effective score is zero
+    return candidate_recall_report(sample, exhaustive, candidates, default_score=0.0)
+
+def build_interaction_request(risk1: Risk, risk2: Risk) -> LLMRequest:
+    prompt = INTERACTION_ANALYSIS_PROMPT.format(
+        company_name=COMPANY_INFO.name,
+        industry=COMPANY_INFO.industry,
+        company_region=', '.join(COMPANY_INFO.region),
+        key_products=', '.join(COMPANY_INFO.key_products),
+        risk1_description=risk1.description,
+        risk1_category=risk1.category,
+        risk1_subcategory=risk1.subcategory,
+        risk2_description=risk2.description,
+        risk2_category=risk2.category,
+        risk2_subcategory=risk2.subcategory
+    )
+    return LLMRequest(
+        prompt=prompt,
+        system_prompt="You are an expert in climate risk assessment and risk interactions.",
+        max_tokens=400,
+        template_version=PROMPT_TEMPLATE_VERSIONS["interaction_analysis"],
+        response_format="json_object"
+    )
+
+def build_batch_interaction_request(risk: Risk, partners: List[Risk]) -> LLMRequest:
+    partner_risks = "\n".join(BATCH_INTERACTION_PARTNER_TEMPLATE.format(
+        risk_id=partner.id,
+        risk_description=partner.description,
+        risk_category=partner.category,
+        risk_subcategory=partner.subcategory
+    ) for partner in partners)
+    prompt = BATCH_INTERACTION_ANALYSIS_PROMPT.format(
+        company_name=COMPANY_INFO.name,
+        industry=COMPANY_INFO.industry,
+        company_region=', '.join(COMPANY_INFO.region),
+        key_products=', '.join(COMPANY_INFO.key_products),
+        risk_description=risk.description,
+        risk_category=risk.category,
+        risk_subcategory=risk.subcategory,
+        partner_risks=partner_risks
+    )
+    return LLMRequest(
+        prompt=prompt,
+        system_prompt="You are an expert in climate risk assessment and risk interactions.",
+        max_tokens=150 * len(partners) + 50,
+        template_version=PROMPT_TEMPLATE_VERSIONS["batch_interaction_analysis"],
+        response_format="json_object"
+    )
+
+def parse_batch_interaction_response(content: str, partner_ids: List[int]) -> Dict[int, Tuple[float, str]]:
+    # Maps partner risk id to (score, explanation); malformed, unknown, duplicate or out-of-range entries are dropped
+    data = parse_json_response(content)
+    entries = data.get("interactions") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}
+
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        score = entry.get("interaction_score")
+        if isinstance(score, dict):
+            score = score.get("score")
+        try:
+            risk_id, score = int(entry.get("risk_id")), float(score)
+        except (TypeError, ValueError):
+            continue
+        if risk_id in partner_ids and risk_id not in parsed and 0 <= score <= 1:
+            parsed[risk_id] = (score, str(entry.get("interaction_explanation", "")))
+    return parsed
+
 def extract_interaction_score(analysis: str) -> float:
-    import re
-    numbers = re.findall(r"[-+]?\d*\.\d+|\d+", analysis)
-    return float(numbers[-1]) if numbers else 0.5
+    return parse_interaction_response(analysis).score
 
 def determine_interaction_type(score: float) -> str:
     if score < 0.3:
@@ -63,13 +218,10 @@ def build_risk_network(risks: List[Risk], interactions: List[RiskInteraction]) -
                    type=interaction.interaction_type)
     return G
 
-def identify_central_risks(G: nx.Graph) -> Dict[int, float]:
-    centrality_measures = {
-        "degree": nx.degree_centrality(G),
-        "betweenness": nx.betweenness_centrality(G, weight='weight'),
-        "eigenvector": nx.eigenvector_centrality(G, weight='weight'),
-        "pagerank": nx.pagerank(G, weight='weight')
-    }
+def identify_central_risks(G: nx.Graph, betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES,
+                           centrality_measures: Optional[Dict[str, Dict[int, float]]] = None) -> Dict[int, float]:
+    if centrality_measures is None:
+        centrality_measures = get_centrality(G, betweenness_samples=betweenness_samples)
     
     combined_centrality = {}
     for node in G.nodes():
@@ -77,37 +229,13 @@ def identify_central_risks(G: nx.Graph) -> Dict[int, float]:
     
     return combined_centrality
 
-def detect_risk_clusters(G: nx.Graph, num_clusters: int = 3) -> Dict[int, int]:
-    # Convert graph to a matrix representation
-    adj_matrix = nx.to_numpy_array(G)
-    
-    # Perform K-means clustering
-    kmeans = KMeans(n_clusters=num_clusters, random_state=42)
-    cluster_labels = kmeans.fit_predict(adj_matrix)
-    
-    return {node: label for node, label in zip(G.nodes(), cluster_labels)}
-
-def analyze_risk_cascades(G: nx.Graph, initial_risks: List[int], threshold: float = 0.5, max_steps: int = 10) -> Dict[int, List[float]]:
-    cascade_progression = {risk: [1.0] for risk in initial_risks}
-    for _ in range(max_steps):
-        new_activations = {}
-        for node in G.nodes():
-            if node not in cascade_progression:
-                neighbor_influence = sum(cascade_progression.get(neighbor, [0])[-1] * G[node][neighbor]['weight']
-                                         for neighbor in G.neighbors(node))
-                if neighbor_influence > threshold:
-                    new_activations[node] = neighbor_influence
-        
-        if not new_activations:
-            break
-        
-        for node, activation in new_activations.items():
-            cascade_progression[node] = [0.0] * (len(next(iter(cascade_progression.values()))) - 1) + [activation]
-        
-        for progression in cascade_progression.values():
-            progression.append(progression[-1])
-    
-    return cascade_progression
+def detect_risk_clusters(G: nx.Graph, num_clusters: Optional[int] = None, method: str = CLUSTERING_METHOD) -> Dict[int, int]:
+    # The cluster count is selected automatically unless num_clusters is given, which only spectral clustering can honour
+    return cluster_risk_network(G, "spectral" if num_clusters is not None else method, num_clusters)
+
+def analyze_risk_cascades(G: nx.Graph, initial_risks: List[int], threshold: float = CASCADE_THRESHOLD,
+                          max_steps: int = CASCADE_MAX_STEPS) -> Dict[int, List[float]]:
+    return run_cascades(G, [initial_risks], threshold, max_steps).to_dict(0)
 
 def calculate_risk_correlations(risks: List[Risk], simulation_results: Dict[str, Dict[int, List[float]]]) -> Dict[Tuple[int, int], float]:
     correlations = {}
@@ -118,9 +246,10 @@ def calculate_risk_correlations(risks: List[Risk], simulation_results: Dict[str,
             correlations[(risk1_id, risk2_id)] = correlation
     return correlations
 
-def identify_risk_feedback_loops(G: nx.Graph) -> List[List[int]]:
-    feedback_loops = list(nx.simple_cycles(G))
-    return [loop for loop in feedback_loops if len(loop) > 2]
+def identify_risk_feedback_loops(G: nx.Graph, max_length: int = FEEDBACK_LOOP_MAX_LENGTH, min_weight: float = FEEDBACK_LOOP_MIN_WEIGHT,
+                                 max_loops: int = FEEDBACK_LOOP_MAX_LOOPS) -> List[List[int]]:
+    # Strongest loops first by product of edge weights, bounded in length and count
+    return [loop for loop, _ in strongest_feedback_loops(G, max_loops, max_length, min_weight)]
 
 def analyze_network_resilience(G: nx.Graph) -> Dict[str, float]:
     resilience_metrics = {
@@ -151,63 +280,40 @@ def generate_risk_interaction_summary(interactions: List[RiskInteraction], centr
     4. Recommendations for risk management based on these findings
     """
 
-    response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are an expert in climate risk assessment and network analysis."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=800
-    )
+    return get_llm_client().complete(LLMRequest(
+        prompt=prompt,
+        system_prompt="You are an expert in climate risk assessment and network analysis.",
+        max_tokens=800,
+        template_version=PROMPT_TEMPLATE_VERSIONS["interaction_summary"]
+    ))
 
-    return response.choices[0].message['content']
-
-def create_risk_interaction_matrix(risks: List[Risk]) -> np.ndarray:
-    n = len(risks)
-    matrix = np.zeros((n, n))
-    for i, risk1 in enumerate(risks):
-        for j, risk2 in enumerate(risks[i+1:], start=i+1):
-            interaction = analyze_single_interaction(risk1, risk2)
-            matrix[i, j] = matrix[j, i] = interaction.interaction_score
-    return matrix
+def create_risk_interaction_matrix(risks: List[Risk], interactions: Optional[List[RiskInteraction]] = None) -> np.ndarray:
+    # Pass the interactions from compute_risk_interactions to avoid analysing every pair a second time
+    if interactions is None:
+        interactions = analyze_risk_interactions(risks)
+    return interaction_matrix_from_interactions(risks, interactions)
 
 def analyze_single_interaction(risk1: Risk, risk2: Risk) -> RiskInteraction:
-    prompt = INTERACTION_ANALYSIS_PROMPT.format(
-        risk1_description=risk1.description,
-        risk1_category=risk1.category,
-        risk1_subcategory=risk1.subcategory,
-        risk2_description=risk2.description,
-        risk2_category=risk2.category,
-        risk2_subcategory=risk2.subcategory
-    )
-
-    response = openai.ChatCompletion.create(
-        model=LLM_MODEL,
-        messages=[
-            {"role": "system", "content": "You are an expert in climate risk assessment and risk interactions."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=400
-    )
-
-    analysis = response.choices[0].message['content']
+    analysis = get_llm_client().complete(build_interaction_request(risk1, risk2))
     interaction_score = extract_interaction_score(analysis)
     interaction_type = determine_interaction_type(interaction_score)
-    return RiskInteraction(risk1.id, risk2.id, interaction_score, interaction_type)
-
-def simulate_risk_interactions(risks: List[Risk], interaction_matrix: np.ndarray, num_steps: int = 10) -> Dict[int, List[float]]:
-    n = len(risks)
-    risk_levels = np.array([risk.impact for risk in risks])
-    risk_progression = {risk.id: [risk.impact] for risk in risks}
-
-    for _ in range(num_steps):
-        influence = interaction_matrix @ risk_levels
-        risk_levels = np.clip(risk_levels + 0.1 * influence, 0, 1)
-        for i, risk in enumerate(risks):
-            risk_progression[risk.id].append(risk_levels[i])
+    return RiskInteraction(risk1.id, risk2.id, interaction_score, interaction_type, analysis)
+
+def simulate_risk_interactions(risks: List[Risk], interaction_matrix: InteractionMatrix, num_steps: int = PROPAGATION_STEPS,
+                               tolerance: Optional[float] = None) -> Dict[int, List[float]]:
+    # Without a tolerance: num_steps fixed steps. With one: the shared steady-state solver, num_steps as its cap, so
+    # the progression holds the solver's iterates and its length reports the steps used.
+    risk_levels = np.array([risk.impact for risk in risks], dtype=float)
+    trajectory = [risk_levels]
+    if tolerance is None:
+        step = propagation_step(interaction_matrix, risk_levels.dtype)
+        for _ in range(num_steps):
+            trajectory.append(step(trajectory[-1]))
+    else:
+        propagate_to_steady_state(risk_levels, interaction_matrix, tolerance=tolerance, max_steps=num_steps, trajectory=trajectory)
 
+    states = np.stack(trajectory)
+    risk_progression = {risk.id: states[:, i].tolist() for i, risk in enumerate(risks)}
     return risk_progression
 
 
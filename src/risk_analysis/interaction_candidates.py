@@ -0,0 +1,62 @@
+from typing import List, Dict, Set, Tuple, Optional
+from src.models import Risk, RiskInteraction
+from src.config import INTERACTION_CANDIDATES_PER_RISK, INTERACTION_BLOCKING_WEIGHTS
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+def compute_risk_similarity(risks: List[Risk], blocking_weights: Dict[str, float] = INTERACTION_BLOCKING_WEIGHTS) -> np.ndarray:
+    # TF-IDF cosine similarity of descriptions plus a bonus for every shared categorical field
+    try:
+        tfidf = TfidfVectorizer(stop_words='english').fit_transform([risk.description for risk in risks])
+        similarity = (tfidf @ tfidf.T).toarray()
+    except ValueError:  # Empty vocabulary, e.g. blank descriptions
+        similarity = np.zeros((len(risks), len(risks)))
+
+    for field, weight in blocking_weights.items():
+        values = np.array([getattr(risk, field) for risk in risks], dtype=object)
+        shared = (values[:, None] == values[None, :]) & (values[:, None] != "")
+        similarity += weight * shared
+
+    np.fill_diagonal(similarity, -np.inf)
+    return similarity
+
+def select_candidate_pairs(risks: List[Risk], max_candidates_per_risk: Optional[int] = INTERACTION_CANDIDATES_PER_RISK,
+                           similarity: Optional[np.ndarray] = None) -> Set[Tuple[int, int]]:
+    # Union of each risk's top-k most similar partners, as (i, j) index pairs with i < j
+    n = len(risks)
+    if max_candidates_per_risk is None or max_candidates_per_risk >= n - 1:
+        return {(i, j) for i in range(n) for j in range(i+1, n)}
+    if max_candidates_per_risk <= 0:
+        return set()
+
+    if similarity is None:
+        similarity = compute_risk_similarity(risks)
+    top_k = np.argpartition(-similarity, max_candidates_per_risk - 1, axis=1)[:, :max_candidates_per_risk]
+    rows = np.repeat(np.arange(n), max_candidates_per_risk)
+    cols = top_k.ravel()
+    return set(zip(np.minimum(rows, cols).tolist(), np.maximum(rows, cols).tolist()))
+
+def candidate_recall_report(risks: List[Risk], exhaustive_interactions: List[RiskInteraction], candidate_pairs: Set[Tuple[int, int]],
+                            default_score: float, strong_threshold: float = 0.7) -> Dict[str, float]:
+    # Compares a pruned run against exhaustive LLM scores: how many strong interactions survive pruning,
+    # and how far the default score is from the true score of the pairs that were dropped
+    index = {risk.id: i for i, risk in enumerate(risks)}
+    strong, strong_kept, pruned_errors = 0, 0, []
+    for interaction in exhaustive_interactions:
+        i, j = sorted((index[interaction.risk1_id], index[interaction.risk2_id]))
+        kept = (i, j) in candidate_pairs
+        if interaction.interaction_score >= strong_threshold:
+            strong += 1
+            strong_kept += kept
+        if not kept:
+            pruned_errors.append(abs(interaction.interaction_score - default_score))
+
+    total_pairs = len(exhaustive_interactions)
+    return {
+        "total_pairs": total_pairs,
+        "candidate_pairs": len(candidate_pairs),
+        "pruned_fraction": 1 - len(candidate_pairs) / total_pairs if total_pairs else 0.0,
+        "strong_interactions": strong,
+        "strong_recall": strong_kept / strong if strong else 1.0,
+        "pruned_mean_abs_error": float(np.mean(pruned_errors)) if pruned_errors else 0.0
+    }
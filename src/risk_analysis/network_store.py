@@ -0,0 +1,304 @@
+from typing import List, Dict, Optional, Set
+import os
+import json
+import random
+import networkx as nx
+from src.models import Risk, RiskInteraction, ExternalData, NetworkDelta
+from src.config import (CLUSTERING_RESOLUTION, CLUSTERING_SEED, CENTRALITY_BETWEENNESS_SAMPLES, CENTRALITY_SEED, CASCADE_THRESHOLD,
+                        CASCADE_MAX_STEPS)
+from src.risk_analysis.centrality import eigenvector_centrality, pagerank, source_dependencies, betweenness_error_bound
+from src.risk_analysis.clustering import labels_from_communities
+from src.risk_analysis.cascade_engine import run_cascades
+from src.risk_analysis.systemic_risk_analysis import identify_trigger_points
+
+# Relative slack when testing whether an edge lies on a shortest path; erring wide only recomputes extra sources
+SHORTEST_PATH_TOLERANCE = 1e-9
+
+class RiskNetworkStore:
+    # Risk network maintained by deltas instead of rebuilt per run. Nodes are bare risk ids and edges carry only
+    # weight and type, which is all the metrics read. Structural changes mark the touched nodes dirty, record the
+    # changed edges and bump the topology version; metrics are refreshed lazily. Betweenness is kept as a sum of
+    # per-source Brandes dependencies (over every node, or over `betweenness_samples` pivots), and a refresh only
+    # recomputes the sources whose shortest paths used a changed edge before or after the edit. Louvain is rerun
+    # only on the communities around dirty nodes. Trigger points reuse each risk's cached single-seed cascade
+    # until an edit touches a risk that cascade activated.
+    def __init__(self, graph: Optional[nx.Graph] = None, betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES,
+                 seed: int = CENTRALITY_SEED):
+        self.graph = graph if graph is not None else nx.Graph()
+        self.betweenness_samples = betweenness_samples
+        self.seed = seed
+        self.topology_version = 0
+        self.dirty_nodes: Set[int] = set(self.graph.nodes())
+        self._changed_edges: Set[frozenset] = set()
+        self._baseline = nx.Graph()  # graph as of the last refresh
+        self._sources: Optional[Set[int]] = None  # None until betweenness is first computed
+        self._sampled = False
+        self._dependency_sum: Dict[int, float] = {}
+        self._communities: List[Set[int]] = []
+        self._spectral: Dict[str, Dict[int, float]] = {}
+        self._cascades: Dict[int, List[int]] = {}  # seed -> risks its cascade activates, in order
+        self._metrics_version = -1
+
+    @classmethod
+    def build(cls, risks: List[Risk], interactions: List[RiskInteraction],
+              betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES, seed: int = CENTRALITY_SEED) -> "RiskNetworkStore":
+        store = cls(betweenness_samples=betweenness_samples, seed=seed)
+        store.apply_delta(NetworkDelta(upserted_risks=risks, upserted_interactions=interactions))
+        return store
+
+    def apply_delta(self, delta: NetworkDelta) -> None:
+        for risk_id in delta.removed_risk_ids:
+            self.remove_risk(risk_id)
+        for risk1_id, risk2_id in delta.removed_interactions:
+            self.remove_interaction(risk1_id, risk2_id)
+        for risk in delta.upserted_risks:
+            self.upsert_risk(risk)
+        for interaction in delta.upserted_interactions:
+            self.upsert_interaction(interaction)
+
+    def upsert_risk(self, risk: Risk) -> None:
+        # Only a new risk changes the network; edits to its description or scores are not stored here
+        if risk.id not in self.graph:
+            self._mark_dirty([risk.id])
+            self.graph.add_node(risk.id)
+
+    def remove_risk(self, risk_id: int) -> None:
+        if risk_id in self.graph:
+            neighbors = list(self.graph.neighbors(risk_id))
+            self._changed_edges.update(frozenset((risk_id, neighbor)) for neighbor in neighbors)
+            self._mark_dirty(neighbors + [risk_id])
+            self.graph.remove_node(risk_id)
+
+    def upsert_interaction(self, interaction: RiskInteraction) -> None:
+        u, v = interaction.risk1_id, interaction.risk2_id
+        current = self.graph.get_edge_data(u, v)
+        if current is None or current.get('weight') != interaction.interaction_score:
+            self._changed_edges.add(frozenset((u, v)))
+            self._mark_dirty([u, v])
+        self.graph.add_edge(u, v, weight=interaction.interaction_score, type=interaction.interaction_type)
+
+    def remove_interaction(self, risk1_id: int, risk2_id: int) -> None:
+        if self.graph.has_edge(risk1_id, risk2_id):
+            self._changed_edges.add(frozenset((risk1_id, risk2_id)))
+            self._mark_dirty([risk1_id, risk2_id])
+            self.graph.remove_edge(risk1_id, risk2_id)
+
+    def sync(self, risks: List[Risk], interactions: List[RiskInteraction]) -> NetworkDelta:
+        # Diffs a freshly loaded register against the stored network and applies only the differences
+        risk_ids = {risk.id for risk in risks}
+        edges = {frozenset((interaction.risk1_id, interaction.risk2_id)) for interaction in interactions}
+        delta = NetworkDelta(
+            upserted_risks=[risk for risk in risks if risk.id not in self.graph],
+            removed_risk_ids=[node for node in self.graph.nodes() if node not in risk_ids],
+            upserted_interactions=[interaction for interaction in interactions
+                                   if self.graph.get_edge_data(interaction.risk1_id, interaction.risk2_id) !=
+                                   {'weight': interaction.interaction_score, 'type': interaction.interaction_type}],
+            removed_interactions=[(u, v) for u, v in self.graph.edges() if frozenset((u, v)) not in edges]
+        )
+        self.apply_delta(delta)
+        return delta
+
+    def centrality(self) -> Dict[str, Dict[int, float]]:
+        self.refresh()
+        n = self.graph.number_of_nodes()
+        # networkx's normalization of undirected betweenness, scaled up by n/k when summed over k pivots
+        scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+        if self._sampled and self._sources:
+            scale *= n / len(self._sources)
+        return {
+            "degree": nx.degree_centrality(self.graph),
+            "betweenness": {node: self._dependency_sum.get(node, 0.0) * scale for node in self.graph.nodes()},
+            "eigenvector": self._spectral["eigenvector"],
+            "pagerank": self._spectral["pagerank"]
+        }
+
+    def betweenness_error_bound(self) -> float:
+        self.refresh()
+        return betweenness_error_bound(self.graph.number_of_nodes(), len(self._sources) if self._sampled else None)
+
+    def clusters(self) -> Dict[int, int]:
+        self.refresh()
+        return labels_from_communities(self.graph, self._communities)
+
+    def trigger_points(self, risks: List[Risk], external_data: Dict[str, ExternalData]) -> Dict[int, Dict]:
+        centrality = self.centrality()["betweenness"]
+        return identify_trigger_points(risks, self.graph, external_data, centrality=centrality,
+                                       cascades=self.cascades([risk.id for risk in risks]))
+
+    def cascades(self, seeds: List[int]) -> Dict[int, List[int]]:
+        # Only seeds without a current cached cascade are simulated, together in one batch
+        self.refresh()
+        missing = [seed for seed in dict.fromkeys(seeds) if seed not in self._cascades]
+        if missing:
+            result = run_cascades(self.graph, [[seed] for seed in missing], CASCADE_THRESHOLD, CASCADE_MAX_STEPS)
+            for row, seed in enumerate(missing):
+                self._cascades[seed] = [node for node in result.to_dict(row) if node != seed]
+        return {seed: self._cascades[seed] for seed in seeds}
+
+    def refresh(self) -> None:
+        if self._metrics_version == self.topology_version:
+            return
+        # Each changed edge costs up to four shortest-path trees, so past that many edits a full pass is cheaper
+        if self._sources is None or 4 * len(self._changed_edges) >= max(len(self._sources), 1):
+            self._recompute_betweenness()
+            self._recompute_communities()
+        else:
+            self._update_betweenness()
+            self._update_communities()
+
+        self._invalidate_cascades()
+
+        # Eigenvector and PageRank couple every node, but the sparse solvers make a global refresh cheap
+        self._spectral = {"eigenvector": eigenvector_centrality(self.graph), "pagerank": pagerank(self.graph)}
+        self._baseline = self.graph.copy()
+        self._changed_edges = set()
+        self.dirty_nodes = set()
+        self._metrics_version = self.topology_version
+
+    def _recompute_betweenness(self) -> None:
+        nodes = list(self.graph.nodes())
+        if self._sources is None:
+            self._sampled = self.betweenness_samples is not None and self.betweenness_samples < len(nodes)
+        if self._sampled:
+            # Pivots persist across refreshes so that each refresh updates the same estimator
+            kept = [node for node in (self._sources or ()) if node in self.graph]
+            self._sources = set(kept) if kept else set(random.Random(self.seed).sample(nodes, self.betweenness_samples))
+        else:
+            self._sources = set(nodes)
+        self._dependency_sum = dict.fromkeys(nodes, 0.0)
+        for source in self._sources:
+            self._add_dependencies(self.graph, source, 1)
+
+    def _recompute_communities(self) -> None:
+        self._communities = nx.community.louvain_communities(self.graph, weight='weight', resolution=CLUSTERING_RESOLUTION,
+                                                              seed=CLUSTERING_SEED) if self.graph else []
+
+    def _update_betweenness(self) -> None:
+        removed = {node for node in self._baseline if node not in self.graph}
+        added = {node for node in self.graph if node not in self._baseline}
+        old_sources = set(self._sources)
+        if not self._sampled:
+            self._sources = (self._sources - removed) | added
+        else:
+            self._sources -= removed
+        affected = (self._affected_sources() | removed | added) & (old_sources | self._sources)
+        # An affected source is computed twice, on the old graph and the new one
+        if 2 * len(affected) >= len(old_sources | self._sources):
+            self._recompute_betweenness()
+            return
+        for source in affected:
+            if source in old_sources and source in self._baseline:
+                self._add_dependencies(self._baseline, source, -1)
+            if source in self._sources:
+                self._add_dependencies(self.graph, source, 1)
+        for node in removed:
+            self._dependency_sum.pop(node, None)
+        for node in added:
+            self._dependency_sum.setdefault(node, 0.0)
+
+    def _affected_sources(self) -> Set[int]:
+        # A source whose shortest paths avoid every changed edge, in the old graph and in the new one, has the same
+        # shortest-path DAG in both, so its dependencies are unchanged. Edge (u, v) of weight w lies on a shortest
+        # path from s exactly when d(s, u) + w == d(s, v), and d(s, u) = d(u, s) in an undirected graph.
+        affected = set()
+        for edge in self._changed_edges:
+            u, v = tuple(edge)
+            for graph in (self._baseline, self.graph):
+                if not graph.has_edge(u, v):
+                    continue
+                weight = graph[u][v].get('weight', 1)
+                from_u = nx.single_source_dijkstra_path_length(graph, u, weight='weight')
+                from_v = nx.single_source_dijkstra_path_length(graph, v, weight='weight')
+                for source, distance_u in from_u.items():
+                    distance_v = from_v[source]
+                    slack = SHORTEST_PATH_TOLERANCE * max(1.0, distance_u, distance_v)
+                    if distance_u + weight <= distance_v + slack or distance_v + weight <= distance_u + slack:
+                        affected.add(source)
+        return affected
+
+    def _update_communities(self) -> None:
+        # Communities that hold or border a dirty node are merged and re-partitioned; the rest are kept as they were
+        region = {node for node in self.dirty_nodes if node in self.graph}
+        region.update(neighbor for node in list(region) for neighbor in self.graph.neighbors(node))
+        kept = []
+        for community in self._communities:
+            if community & region or community & self.dirty_nodes:
+                region.update(node for node in community if node in self.graph)
+            else:
+                kept.append(community)
+        if region:
+            kept.extend(nx.community.louvain_communities(self.graph.subgraph(region), weight='weight',
+                                                         resolution=CLUSTERING_RESOLUTION, seed=CLUSTERING_SEED))
+        self._communities = kept
+
+    def _invalidate_cascades(self) -> None:
+        # Influence only flows out of active risks, so a cascade in which neither end of any changed edge was
+        # active runs identically on the edited network
+        touched = {node for edge in self._changed_edges for node in edge}
+        self._cascades = {seed: activated for seed, activated in self._cascades.items()
+                          if seed in self.graph and seed not in touched and touched.isdisjoint(activated)}
+
+    def _add_dependencies(self, graph: nx.Graph, source: int, sign: int) -> None:
+        for node, dependency in source_dependencies(graph, source).items():
+            self._dependency_sum[node] = self._dependency_sum.get(node, 0.0) + sign * dependency
+
+    def save(self, path: str) -> None:
+        # Plain JSON rather than networkx's node-link format, whose keyword arguments differ across networkx releases
+        self.refresh()
+        snapshot = {
+            "topology_version": self.topology_version,
+            "nodes": list(self.graph.nodes()),
+            "edges": [[u, v, data['weight'], data.get('type')] for u, v, data in self.graph.edges(data=True)],
+            "betweenness_samples": self.betweenness_samples,
+            "seed": self.seed,
+            "sampled": self._sampled,
+            "sources": sorted(self._sources),
+            "dependency_sum": list(self._dependency_sum.items()),
+            "communities": [sorted(community) for community in self._communities],
+            "spectral": {measure: list(values.items()) for measure, values in self._spectral.items()},
+            "cascade_parameters": [CASCADE_THRESHOLD, CASCADE_MAX_STEPS],
+            "cascades": list(self._cascades.items())
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(snapshot, f)
+
+    @classmethod
+    def load(cls, path: str, betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES,
+             seed: int = CENTRALITY_SEED) -> "RiskNetworkStore":
+        with open(path) as f:
+            snapshot = json.load(f)
+        graph = nx.Graph()
+        graph.add_nodes_from(snapshot["nodes"])
+        graph.add_edges_from((u, v, {'weight': weight, 'type': interaction_type}) for u, v, weight, interaction_type in snapshot["edges"])
+        store = cls(graph, betweenness_samples, seed)
+        store.topology_version = store._metrics_version = snapshot["topology_version"]
+        store.dirty_nodes = set()
+        store._baseline = graph.copy()
+        store._communities = [set(community) for community in snapshot["communities"]]
+        store._spectral = {measure: {node: value for node, value in values} for measure, values in snapshot["spectral"].items()}
+        if snapshot.get("cascade_parameters") == [CASCADE_THRESHOLD, CASCADE_MAX_STEPS]:
+            store._cascades = {seed: activated for seed, activated in snapshot["cascades"]}
+        if (snapshot["betweenness_samples"], snapshot["seed"]) == (betweenness_samples, seed):
+            store._sampled = snapshot["sampled"]
+            store._sources = set(snapshot["sources"])
+            store._dependency_sum = {node: value for node, value in snapshot["dependency_sum"]}
+        else:
+            # Saved with other sampling settings: betweenness, and with it every metric, is recomputed on first use
+            store.topology_version += 1
+        return store
+
+    def _mark_dirty(self, nodes: List[int]) -> None:
+        self.dirty_nodes.update(nodes)
+        self.topology_version += 1
+
+def load_risk_network_store(path: Optional[str], risks: List[Risk], interactions: List[RiskInteraction],
+                            betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES) -> RiskNetworkStore:
+    # Starts warm from a saved snapshot when one exists, applying only what changed since it was written
+    if path and os.path.exists(path):
+        store = RiskNetworkStore.load(path, betweenness_samples)
+        store.sync(risks, interactions)
+        return store
+    return RiskNetworkStore.build(risks, interactions, betweenness_samples)
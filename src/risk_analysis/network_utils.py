@@ -0,0 +1,33 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+import hashlib
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+def graph_adjacency(G: nx.Graph, nodelist: Optional[List[Hashable]] = None, weight: str = 'weight') -> Tuple[sparse.csr_matrix, List[Hashable]]:
+    # CSR adjacency with A[i, j] = weight of the edge i -> j (symmetric for undirected graphs), plus the node order used
+    nodelist = list(G.nodes()) if nodelist is None else list(nodelist)
+    if not nodelist:
+        return sparse.csr_matrix((0, 0)), nodelist
+    adjacency = sparse.csr_matrix(nx.to_scipy_sparse_array(G, nodelist=nodelist, weight=weight, dtype=float, format='csr'))
+    return adjacency, nodelist
+
+def node_index(nodelist: List[Hashable]) -> Dict[Hashable, int]:
+    return {node: i for i, node in enumerate(nodelist)}
+
+def seed_mask(seed_sets: List[List[Hashable]], nodelist: List[Hashable]) -> np.ndarray:
+    # Boolean (len(seed_sets), n) matrix; seeds that are not in the graph are ignored
+    index = node_index(nodelist)
+    mask = np.zeros((len(seed_sets), len(nodelist)), dtype=bool)
+    for row, seeds in enumerate(seed_sets):
+        mask[row, [index[seed] for seed in seeds if seed in index]] = True
+    return mask
+
+def graph_fingerprint(G: nx.Graph, weight: str = 'weight') -> str:
+    # Stable hash of nodes and weighted edges, independent of insertion order; changes whenever an edge or weight does
+    if G.is_directed():
+        edges = sorted((repr(u), repr(v), repr(data.get(weight, 1))) for u, v, data in G.edges(data=True))
+    else:
+        edges = sorted(tuple(sorted((repr(u), repr(v)))) + (repr(data.get(weight, 1)),) for u, v, data in G.edges(data=True))
+    digest = hashlib.sha256(repr((G.is_directed(), sorted(map(repr, G.nodes())), edges)).encode())
+    return digest.hexdigest()
@@ -0,0 +1,105 @@
+from typing import Callable, List, Optional, Tuple, Union
+import numpy as np
+from scipy import sparse
+from src.config import (PROPAGATION_STEPS, PROPAGATION_STEP_SIZE, PROPAGATION_CHUNK_SIZE, PROPAGATION_WEAK_LINK_THRESHOLD,
+                        SPARSE_DENSITY_THRESHOLD, PROPAGATION_TOLERANCE, PROPAGATION_MAX_STEPS)
+
+InteractionMatrix = Union[np.ndarray, sparse.csr_matrix]
+
+def prepare_interaction_matrix(interaction_matrix: InteractionMatrix, weak_link_threshold: float = PROPAGATION_WEAK_LINK_THRESHOLD,
+                               density_threshold: float = SPARSE_DENSITY_THRESHOLD) -> InteractionMatrix:
+    # Drops weak links and picks the cheaper representation: CSR propagates in O(nnz) per step, dense BLAS wins
+    # once the matrix is reasonably full
+    matrix = sparse.csr_matrix(interaction_matrix)
+    if weak_link_threshold > 0:
+        matrix.data[np.abs(matrix.data) < weak_link_threshold] = 0
+    matrix.eliminate_zeros()
+    n_rows, n_cols = matrix.shape
+    density = matrix.nnz / (n_rows * n_cols) if n_rows and n_cols else 0.0
+    return matrix if density < density_threshold else matrix.toarray()
+
+def propagation_step(interaction_matrix: InteractionMatrix, dtype: np.dtype, step_size: float = PROPAGATION_STEP_SIZE) -> Callable[[np.ndarray], np.ndarray]:
+    # One application of clip(levels + step_size * M @ levels) to a batch of row states
+    if sparse.issparse(interaction_matrix):
+        matrix = sparse.csr_matrix(interaction_matrix, dtype=dtype)
+        influence = lambda levels: (matrix @ levels.T).T
+    else:
+        interaction_t = interaction_matrix.T.astype(dtype, copy=False)
+        influence = lambda levels: levels @ interaction_t
+    return lambda levels: np.clip(levels + step_size * influence(levels), 0, 1)
+
+def propagate_risk_levels(levels: np.ndarray, interaction_matrix: InteractionMatrix, num_steps: int = PROPAGATION_STEPS,
+                          step_size: float = PROPAGATION_STEP_SIZE) -> np.ndarray:
+    # Batched form of clip(levels + step_size * M @ levels): each row of levels is one independent state,
+    # so a whole block of simulations advances with one matrix-matrix product per step
+    levels = np.array(levels, copy=True)
+    step = propagation_step(interaction_matrix, levels.dtype, step_size)
+    for _ in range(num_steps):
+        levels = step(levels)
+    return levels
+
+def propagate_to_steady_state(levels: np.ndarray, interaction_matrix: InteractionMatrix, step_size: float = PROPAGATION_STEP_SIZE,
+                              tolerance: float = PROPAGATION_TOLERANCE, max_steps: int = PROPAGATION_MAX_STEPS,
+                              trajectory: Optional[List[np.ndarray]] = None) -> Tuple[np.ndarray, int]:
+    # Iterates the propagation map until no level in the batch moves by more than tolerance, returning the final
+    # levels and the number of map evaluations used, at most max_steps. A given trajectory list receives each iterate.
+    squeeze = np.ndim(levels) == 1
+    levels = np.atleast_2d(np.array(levels, copy=True))
+    step = propagation_step(interaction_matrix, levels.dtype, step_size)
+    iterations = 0
+    while iterations < max_steps:
+        mapped = step(levels)
+        iterations += 1
+        if trajectory is not None:
+            trajectory.append(mapped[0] if squeeze else mapped)
+        converged = np.abs(mapped - levels).max(initial=0) < tolerance
+        levels = mapped
+        if converged:
+            break
+    return (levels[0] if squeeze else levels), iterations
+
+def propagate(levels: np.ndarray, interaction_matrix: InteractionMatrix, num_steps: int = PROPAGATION_STEPS,
+              step_size: float = PROPAGATION_STEP_SIZE, tolerance: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    # Fixed num_steps iterations when tolerance is None, otherwise steady state with num_steps as the cap
+    if tolerance is None:
+        return propagate_risk_levels(levels, interaction_matrix, num_steps, step_size), num_steps
+    return propagate_to_steady_state(levels, interaction_matrix, step_size, tolerance, max_steps=num_steps)
+
+def simulate_aggregate_impacts(base_impacts: np.ndarray, interaction_matrix: InteractionMatrix, num_simulations: int,
+                               rng: np.random.Generator, dtype: np.dtype = np.float64, chunk_size: int = PROPAGATION_CHUNK_SIZE,
+                               num_steps: int = PROPAGATION_STEPS, step_size: float = PROPAGATION_STEP_SIZE,
+                               tolerance: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    # Total risk level after propagation for each simulation; rows are drawn and propagated chunk_size at a time
+    # so memory stays bounded at chunk_size x n for large registers. Also returns the most iterations any chunk used.
+    n = len(base_impacts)
+    base_impacts = np.asarray(base_impacts, dtype=dtype)
+    aggregates = np.empty(num_simulations, dtype=dtype)
+    iterations = 0
+    for start in range(0, num_simulations, chunk_size):
+        stop = min(start + chunk_size, num_simulations)
+        levels = rng.beta(2, 2, (stop - start, n)).astype(dtype, copy=False) * base_impacts
+        propagated, used = propagate(levels, interaction_matrix, num_steps, step_size, tolerance)
+        aggregates[start:stop] = propagated.sum(axis=1)
+        iterations = max(iterations, used)
+    return aggregates, iterations
+
+def sweep_risk_levels(base_impacts: np.ndarray, interaction_matrix: InteractionMatrix, risk_indices: np.ndarray, level_grid: np.ndarray,
+                      num_steps: int = PROPAGATION_STEPS, step_size: float = PROPAGATION_STEP_SIZE,
+                      chunk_size: int = PROPAGATION_CHUNK_SIZE, tolerance: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    # For each swept risk r (row of level_grid) and level k, start from base_impacts with risk r set to
+    # level_grid[r, k] and return the aggregate level after propagation. All (risk, level) starts are stacked
+    # into one batch and propagated together, risks_per_chunk risks at a time.
+    base_impacts = np.asarray(base_impacts)
+    num_levels = level_grid.shape[1]
+    aggregates = np.empty(level_grid.shape, dtype=base_impacts.dtype)
+    risks_per_chunk = max(1, chunk_size // num_levels)
+    iterations = 0
+    for start in range(0, len(risk_indices), risks_per_chunk):
+        stop = min(start + risks_per_chunk, len(risk_indices))
+        levels = np.tile(base_impacts, ((stop - start) * num_levels, 1))
+        rows = np.arange((stop - start) * num_levels)
+        levels[rows, np.repeat(risk_indices[start:stop], num_levels)] = level_grid[start:stop].ravel()
+        propagated, used = propagate(levels, interaction_matrix, num_steps, step_size, tolerance)
+        aggregates[start:stop] = propagated.sum(axis=1).reshape(stop - start, num_levels)
+        iterations = max(iterations, used)
+    return aggregates, iterations
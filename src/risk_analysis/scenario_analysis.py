@@ -1,13 +1,15 @@
-from typing import List, Dict, Tuple
-from src.models import Risk, ExternalData, Scenario, SimulationResult
-from src.config import NUM_SIMULATIONS, LLM_MODEL, LLM_API_KEY, COMPANY_INFO
-from src.prompts import RISK_ASSESSMENT_PROMPT
-import openai
+from typing import List, Dict, Tuple, Optional, Union
+from src.models import Risk, ExternalData, Scenario, SimulationResult, SimulationSummary
+from src.config import NUM_SIMULATIONS, MONTE_CARLO_CHUNK_SIZE, MONTE_CARLO_SHARD_SIZE, COMPANY_INFO
+from src.prompts import RISK_ASSESSMENT_PROMPT, PROMPT_TEMPLATE_VERSIONS
+from src.sensitivity_analysis.monte_carlo import plan_simulation_shards, spawn_shard_seeds, run_simulation_shards, collect_simulation_shards
+from src.sensitivity_analysis.simulation_store import SimulationStore
+from src.sensitivity_analysis.streaming_stats import summarize_simulation_shards, sample_upper_tail, result_upper_tail, result_var_cvar
+from src.llm_client import LLMRequest, get_llm_client, response_or_default
 import numpy as np
+from functools import partial
 from scipy.stats import norm
 
-openai.api_key = LLM_API_KEY
-
 def simulate_scenario_impact(risks: List[Risk], external_data: Dict[str, ExternalData], scenario: Scenario) -> List[Tuple[Risk, float]]:
     impacts = []
     for risk in risks:
@@ -15,65 +17,105 @@ def simulate_scenario_impact(risks: List[Risk], external_data: Dict[str, Externa
         impacts.append((risk, impact))
     return impacts
 
-def monte_carlo_simulation(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario]) -> Dict[str, Dict[int, SimulationResult]]:
-    results = {}
-    for scenario_name, scenario in scenarios.items():
-        scenario_results = {}
-        for risk in risks:
-            impact_distribution = []
-            likelihood_distribution = []
-            for _ in range(NUM_SIMULATIONS):
-                perturbed_scenario = perturb_scenario(scenario)
-                perturbed_external_data = perturb_external_data(external_data)
-                impact = calculate_risk_impact(risk, perturbed_external_data, perturbed_scenario)
-                likelihood = calculate_risk_likelihood(risk, perturbed_external_data, perturbed_scenario)
-                impact_distribution.append(impact)
-                likelihood_distribution.append(likelihood)
-            scenario_results[risk.id] = SimulationResult(risk.id, scenario_name, impact_distribution, likelihood_distribution)
-        results[scenario_name] = scenario_results
-    return results
+def monte_carlo_simulation(risks: List[Risk], external_data: Dict[str, ExternalData], scenarios: Dict[str, Scenario],
+                           num_simulations: int = NUM_SIMULATIONS, seed: Optional[int] = None,
+                           dtype: np.dtype = np.float64, chunk_size: int = MONTE_CARLO_CHUNK_SIZE,
+                           shared_draws: bool = False, workers: Optional[int] = None,
+                           shard_size: int = MONTE_CARLO_SHARD_SIZE, streaming: bool = False,
+                           store_dir: Optional[str] = None) -> Dict[str, Dict[int, Union[SimulationResult, SimulationSummary]]]:
+    if streaming and store_dir:
+        raise ValueError("Streaming summaries keep no distributions to store; use either streaming or store_dir")
+    base_impacts = np.array([risk.impact for risk in risks], dtype=dtype)
+    base_likelihoods = np.array([risk.likelihood for risk in risks], dtype=dtype)
+    latest_data = external_data[max(external_data.keys())]
+    shards = plan_simulation_shards(num_simulations, shard_size)
+    shard_seeds = spawn_shard_seeds(seed, len(scenarios), len(shards))
+
+    tasks = [(scenario, stop - start, shard_seeds[s][k])
+             for s, scenario in enumerate(scenarios.values())
+             for k, (start, stop) in enumerate(shards)]
+    shard_fn = partial(_simulate_scenario_shard, latest_data=latest_data, base_impacts=base_impacts,
+                       base_likelihoods=base_likelihoods, dtype=dtype, chunk_size=chunk_size, shared_draws=shared_draws)
+    shard_results = run_simulation_shards(shard_fn, tasks, workers)
+    if streaming:
+        return summarize_simulation_shards(shard_results, list(scenarios), [risk.id for risk in risks], len(shards),
+                                           shared_draws=shared_draws)
+    return collect_simulation_shards(shard_results, list(scenarios), [risk.id for risk in risks], shards,
+                                     num_simulations, dtype, store=SimulationStore(store_dir) if store_dir else None,
+                                     shared_draws=shared_draws)
+
+def _simulate_scenario_shard(scenario: Scenario, num_simulations: int, seed_sequence: np.random.SeedSequence,
+                             latest_data: ExternalData, base_impacts: np.ndarray, base_likelihoods: np.ndarray,
+                             dtype: np.dtype, chunk_size: int, shared_draws: bool) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed_sequence)
+    impacts = np.empty((len(base_impacts), num_simulations), dtype=dtype)
+    likelihoods = np.empty((len(base_impacts), num_simulations), dtype=dtype)
+    if shared_draws:
+        # Common random numbers: one perturbed world-state per simulation, broadcast over every risk
+        perturbed_scenario = perturb_scenario_array(scenario, (num_simulations, 1), rng, dtype=dtype)
+        perturbed_external_data = perturb_external_data_array(latest_data, (num_simulations, 1), rng, dtype=dtype)
+    for start in range(0, len(base_impacts), chunk_size):
+        stop = min(start + chunk_size, len(base_impacts))
+        if not shared_draws:
+            shape = (num_simulations, stop - start)
+            perturbed_scenario = perturb_scenario_array(scenario, shape, rng, dtype=dtype)
+            perturbed_external_data = perturb_external_data_array(latest_data, shape, rng, dtype=dtype)
+        impacts[start:stop] = calculate_risk_impact_array(base_impacts[start:stop], perturbed_external_data, perturbed_scenario).T
+        likelihoods[start:stop] = calculate_risk_likelihood_array(base_likelihoods[start:stop], perturbed_external_data, perturbed_scenario).T
+    return impacts, likelihoods
 
 def calculate_risk_impact(risk: Risk, external_data: Dict[str, ExternalData], scenario: Scenario) -> float:
-    base_impact = risk.impact
+    # Consider external data
+    latest_year = max(external_data.keys())
+    gdp_growth = external_data[latest_year].gdp_growth
+    impact = risk.impact * calculate_impact_multiplier(scenario, gdp_growth)
+    return min(1.0, max(0.0, impact))  # Ensure impact is between 0 and 1
+
+def calculate_risk_likelihood(risk: Risk, external_data: Dict[str, ExternalData], scenario: Scenario) -> float:
+    # Consider external data
+    latest_year = max(external_data.keys())
+    population = external_data[latest_year].population
+    likelihood = risk.likelihood * calculate_likelihood_multiplier(scenario, population)
+    return min(1.0, max(0.0, likelihood))  # Ensure likelihood is between 0 and 1
+
+def calculate_risk_impact_array(base_impacts: np.ndarray, external_data: Dict[str, np.ndarray], scenario: Scenario) -> np.ndarray:
+    # Scenario fields and external factors are (n_simulations x n_risks) arrays; base impacts broadcast along the risk axis
+    multiplier = calculate_impact_multiplier(scenario, external_data['gdp_growth'])
+    return np.clip(base_impacts * multiplier, 0.0, 1.0)
+
+def calculate_risk_likelihood_array(base_likelihoods: np.ndarray, external_data: Dict[str, np.ndarray], scenario: Scenario) -> np.ndarray:
+    multiplier = calculate_likelihood_multiplier(scenario, external_data['population'])
+    return np.clip(base_likelihoods * multiplier, 0.0, 1.0)
+
+def calculate_impact_multiplier(scenario: Scenario, gdp_growth: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    # Works on scalar scenarios as well as scenarios whose fields hold numpy arrays
     temp_factor = 1 + (scenario.temp_increase - 1.5) * 0.1  # 10% increase per degree above 1.5°C
     carbon_price_factor = 1 + (scenario.carbon_price / 100) * 0.05  # 5% increase per $100 carbon price
     renewable_factor = 1 - scenario.renewable_energy * 0.2  # 20% decrease at 100% renewable energy
     biodiversity_factor = 1 + scenario.biodiversity_loss * 0.15  # 15% increase for complete biodiversity loss
     ecosystem_factor = 1 + scenario.ecosystem_degradation * 0.25  # 25% increase for complete ecosystem degradation
-    
-    # Consider external data
-    latest_year = max(external_data.keys())
-    gdp_growth = external_data[latest_year].gdp_growth
     gdp_factor = 1 - gdp_growth * 0.1  # Higher GDP growth slightly reduces impact
-    
+
     # Company-specific factors
     company_size_factor = 1 + (0.1 if COMPANY_INFO.size == "Large" else 0 if COMPANY_INFO.size == "Medium" else -0.1)
     industry_factor = 1 + (0.2 if COMPANY_INFO.industry in ["Energy", "Manufacturing"] else 0.1 if COMPANY_INFO.industry in ["Technology", "Finance"] else 0)
-    
-    impact = (base_impact * temp_factor * carbon_price_factor * renewable_factor * 
-              biodiversity_factor * ecosystem_factor * gdp_factor *
-              company_size_factor * industry_factor)
-    return min(1.0, max(0.0, impact))  # Ensure impact is between 0 and 1
 
-def calculate_risk_likelihood(risk: Risk, external_data: Dict[str, ExternalData], scenario: Scenario) -> float:
-    base_likelihood = risk.likelihood
+    return (temp_factor * carbon_price_factor * renewable_factor *
+            biodiversity_factor * ecosystem_factor * gdp_factor *
+            company_size_factor * industry_factor)
+
+def calculate_likelihood_multiplier(scenario: Scenario, population: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
     policy_factor = 1 - scenario.policy_stringency * 0.3  # Stricter policies reduce likelihood
     ecosystem_factor = 1 + scenario.ecosystem_degradation * 0.4  # Ecosystem degradation increases likelihood
     financial_stability_factor = 1 - scenario.financial_stability * 0.2  # Higher financial stability reduces likelihood
     supply_chain_factor = 1 + scenario.supply_chain_disruption * 0.3  # Supply chain disruption increases likelihood
-    
-    # Consider external data
-    latest_year = max(external_data.keys())
-    population = external_data[latest_year].population
     population_factor = 1 + (population / 1e10) * 0.1  # Population growth slightly increases likelihood
-    
+
     # Company-specific factors
     region_factor = 1 + (0.1 if COMPANY_INFO.region == "Global" else 0)
 
-    likelihood = (base_likelihood * policy_factor * ecosystem_factor * 
-              financial_stability_factor * supply_chain_factor * population_factor *
-              region_factor)
-    return min(1.0, max(0.0, likelihood))  # Ensure likelihood is between 0 and 1
+    return (policy_factor * ecosystem_factor * financial_stability_factor *
+            supply_chain_factor * population_factor * region_factor)
 
 def perturb_scenario(scenario: Scenario, perturbation_scale: float = 0.1) -> Scenario:
     perturbed_values = {}
@@ -92,6 +134,26 @@ def perturb_external_data(external_data: Dict[str, ExternalData], perturbation_s
         perturbed_data[year] = ExternalData(**perturbed_values)
     return perturbed_data
 
+def perturb_scenario_array(scenario: Scenario, shape: Tuple[int, ...], rng: np.random.Generator,
+                           perturbation_scale: float = 0.1, dtype: np.dtype = np.float64) -> Scenario:
+    # Same perturbation as perturb_scenario, drawn for a whole block of simulations at once
+    perturbed_values = {}
+    for attr in scenario._fields:
+        value = getattr(scenario, attr)
+        if attr != 'name' and isinstance(value, (int, float)):
+            noise = rng.standard_normal(shape, dtype=dtype)
+            perturbed_values[attr] = np.maximum(0, value * (1 + perturbation_scale * noise))
+    return scenario._replace(**perturbed_values)
+
+def perturb_external_data_array(data: ExternalData, shape: Tuple[int, ...], rng: np.random.Generator,
+                                perturbation_scale: float = 0.05, dtype: np.dtype = np.float64) -> Dict[str, np.ndarray]:
+    # Only the latest-year drivers feed calculate_risk_impact/calculate_risk_likelihood, so only those are drawn
+    perturbed_values = {}
+    for attr in ('gdp_growth', 'population'):
+        noise = rng.standard_normal(shape, dtype=dtype)
+        perturbed_values[attr] = np.maximum(0, getattr(data, attr) * (1 + perturbation_scale * noise))
+    return perturbed_values
+
 def analyze_scenario_sensitivity(risks: List[Risk], base_scenario: Scenario, variable: str, range_pct: float) -> Dict[str, float]:
     base_impact = sum(calculate_risk_impact(risk, {}, base_scenario) for risk in risks)
     
@@ -111,20 +173,58 @@ def analyze_scenario_sensitivity(risks: List[Risk], base_scenario: Scenario, var
         "sensitivity": sensitivity
     }
 
-def calculate_var_cvar(simulation_results: Dict[str, Dict[int, SimulationResult]], confidence_level: float = 0.95) -> Dict[str, Dict[int, Dict[str, float]]]:
+def calculate_var_cvar(simulation_results: Dict[str, Dict[int, Union[SimulationResult, SimulationSummary]]], confidence_level: float = 0.95) -> Dict[str, Dict[int, Dict[str, float]]]:
     var_cvar_results = {}
     for scenario, risks in simulation_results.items():
         var_cvar_results[scenario] = {}
         for risk_id, result in risks.items():
-            impacts = np.array(result.impact_distribution)
-            var = np.percentile(impacts, (1 - confidence_level) * 100)
-            cvar = np.mean(impacts[impacts > var])
+            var, cvar = result_var_cvar(result, confidence_level)
             var_cvar_results[scenario][risk_id] = {
                 "VaR": var,
                 "CVaR": cvar
             }
     return var_cvar_results
 
+def calculate_portfolio_aggregates(simulation_results: Dict[str, Dict[int, Union[SimulationResult, SimulationSummary]]],
+                                   confidence_level: float = 0.95, min_joint_risks: int = 2) -> Dict[str, Dict[str, float]]:
+    # Needs results simulated with shared_draws=True, where simulation k is the same world-state for every risk; with
+    # independent draws the per-draw sums mix unrelated states. Every tail here is the upper (loss) tail beyond the
+    # confidence percentile, unlike the per-risk calculate_var_cvar convention.
+    portfolio_results = {}
+    for scenario, risks in simulation_results.items():
+        if not all(result.shared_draws for result in risks.values()):
+            raise ValueError(f"Portfolio aggregates for {scenario} need results simulated with shared draws")
+        if any(isinstance(result, SimulationSummary) for result in risks.values()):
+            portfolio_results[scenario] = summary_portfolio_aggregates(list(risks.values()), confidence_level, min_joint_risks)
+            continue
+        impacts = np.stack([np.asarray(result.impact_distribution) for result in risks.values()])
+        total_impacts = impacts.sum(axis=0)
+        risk_thresholds = np.percentile(impacts, confidence_level * 100, axis=1)
+        exceedances = (impacts > risk_thresholds[:, None]).sum(axis=0)
+        total_var, total_cvar = sample_upper_tail(total_impacts, confidence_level)
+        portfolio_results[scenario] = {
+            "mean_total_impact": float(np.mean(total_impacts)),
+            "std_total_impact": float(np.std(total_impacts)),
+            "total_impact_VaR": total_var,
+            "total_impact_CVaR": total_cvar,
+            "joint_tail_probability": float(np.mean(exceedances >= min_joint_risks))
+        }
+    return portfolio_results
+
+def summary_portfolio_aggregates(results: List[SimulationSummary], confidence_level: float = 0.95,
+                                 min_joint_risks: int = 2) -> Dict[str, float]:
+    # Streaming summaries keep no joint samples. Shared draws scale every risk by the same monotone world-state,
+    # so the risks are comonotonic: quantiles, tail means and standard deviations of the total are sums of the
+    # marginals, and every risk crosses its own tail threshold in the same draws.
+    tails = [result_upper_tail(result, confidence_level) for result in results]
+    return {
+        "mean_total_impact": float(sum(result.impact.mean for result in results)),
+        "std_total_impact": float(sum(np.sqrt(result.impact.variance) for result in results)),
+        "total_impact_VaR": float(sum(var for var, _ in tails)),
+        "total_impact_CVaR": float(sum(cvar for _, cvar in tails)),
+        "joint_tail_probability": float(1 - confidence_level) if len(results) >= min_joint_risks else 0.0
+    }
+
 def perform_stress_testing(risks: List[Risk], scenarios: Dict[str, Scenario], external_data: Dict[str, ExternalData]) -> Dict[str, List[Tuple[Risk, float]]]:
     stress_test_results = {}
     for scenario_name, scenario in scenarios.items():
@@ -147,7 +247,7 @@ def perform_stress_testing(risks: List[Risk], scenarios: Dict[str, Scenario], ex
     return stress_test_results
 
 def generate_scenario_narratives(scenarios: Dict[str, Scenario]) -> Dict[str, str]:
-    narratives = {}
+    requests = []
     for scenario_name, scenario in scenarios.items():
         prompt = f"""
         Generate a detailed narrative for the following climate scenario, considering the context of {COMPANY_INFO.name}, a {COMPANY_INFO.size} {COMPANY_INFO.industry} company:
@@ -170,16 +270,12 @@ def generate_scenario_narratives(scenarios: Dict[str, Scenario]) -> Dict[str, st
         Provide a compelling narrative that describes the overall state of the world in this scenario, including key challenges and opportunities for {COMPANY_INFO.name}, major societal and environmental changes, potential technological advancements or setbacks, and the general economic landscape. Consider how this scenario might specifically impact {COMPANY_INFO.name}'s operations, supply chain, and market position.
         """
 
-        response = openai.ChatCompletion.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert in climate scenario analysis and futurism."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
+        requests.append(LLMRequest(
+            prompt=prompt,
+            system_prompt="You are an expert in climate scenario analysis and futurism.",
+            max_tokens=1000,
+            template_version=PROMPT_TEMPLATE_VERSIONS["scenario_narrative"]
+        ))
 
-        narratives[scenario_name] = response.choices[0].message['content']
-    
-    return narratives
\ No newline at end of file
+    narratives = get_llm_client().complete_many(requests, return_exceptions=True)
+    return {scenario_name: response_or_default(narrative) for scenario_name, narrative in zip(scenarios.keys(), narratives)}
\ No newline at end of file
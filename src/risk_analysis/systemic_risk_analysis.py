@@ -1,13 +1,28 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import networkx as nx
 import numpy as np
 from src.models import Risk, ExternalData, SimulationResult
+from src.sensitivity_analysis.streaming_stats import describe_simulation_result
+from src.config import (CENTRALITY_BETWEENNESS_SAMPLES, FEEDBACK_LOOP_MAX_LENGTH, FEEDBACK_LOOP_MIN_WEIGHT,
+                        FEEDBACK_LOOP_MAX_LOOPS)
+from src.risk_analysis.cascade_engine import run_cascades, get_cascade_index
+from src.risk_analysis.centrality import get_centrality
+from src.risk_analysis.feedback_loops import strongest_feedback_loops
 
 # Keep existing functions
 
-def identify_trigger_points(risks: List[Risk], risk_network: nx.Graph, external_data: Dict[str, ExternalData]) -> Dict[int, Dict]:
+def identify_trigger_points(risks: List[Risk], risk_network: nx.Graph, external_data: Dict[str, ExternalData],
+                            betweenness_samples: Optional[int] = CENTRALITY_BETWEENNESS_SAMPLES,
+                            centrality: Optional[Dict[int, float]] = None,
+                            cascades: Optional[Dict[int, List[int]]] = None) -> Dict[int, Dict]:
+    # centrality and cascades (risks each seed activates, in order): precomputed, e.g. by an incrementally
+    # maintained RiskNetworkStore; otherwise taken from the shared per-network caches
     trigger_points = {}
-    centrality = nx.betweenness_centrality(risk_network, weight='weight')
+    if centrality is None:
+        centrality = get_centrality(risk_network, ["betweenness"], betweenness_samples)["betweenness"]
+    if cascades is None:
+        cascade_index = get_cascade_index(risk_network)
+        cascades = {risk.id: cascade_index.activated(risk.id) for risk in risks}
     
     for risk in risks:
         if centrality[risk.id] > np.mean(list(centrality.values())):
@@ -20,6 +35,7 @@ def identify_trigger_points(risks: List[Risk], risk_network: nx.Graph, external_
                     "centrality": centrality[risk.id],
                     "connected_risks": neighbors,
                     "total_interaction_weight": total_weight,
+                    "cascade_risks": cascades[risk.id],
                     "external_factors": identify_relevant_external_factors(risk, external_data)
                 }
     
@@ -93,34 +109,16 @@ def identify_relevant_external_factors(risk: Risk, external_data: Dict[str, Exte
 
 def calculate_scenario_resilience(impacts: List[Tuple[Risk, float]], simulation_results: Dict[int, SimulationResult]) -> float:
     total_impact = sum(impact for _, impact in impacts)
-    variance = sum(np.var(result.impact_distribution) for result in simulation_results.values())
+    variance = sum(describe_simulation_result(result)["std_impact"] ** 2 for result in simulation_results.values())
     return 1 / (total_impact * (1 + variance))  # Higher resilience for lower impact and lower variance
 
 def analyze_risk_cascades(risk_network: nx.Graph, initial_risks: List[int], threshold: float = 0.5, max_steps: int = 10) -> Dict[int, List[float]]:
-    cascade_progression = {risk: [1.0] for risk in initial_risks}
-    for _ in range(max_steps):
-        new_activations = {}
-        for node in risk_network.nodes():
-            if node not in cascade_progression:
-                neighbor_influence = sum(cascade_progression.get(neighbor, [0])[-1] * risk_network[node][neighbor]['weight']
-                                         for neighbor in risk_network.neighbors(node))
-                if neighbor_influence > threshold:
-                    new_activations[node] = neighbor_influence
-        
-        if not new_activations:
-            break
-        
-        for node, activation in new_activations.items():
-            cascade_progression[node] = [0.0] * (len(next(iter(cascade_progression.values()))) - 1) + [activation]
-        
-        for progression in cascade_progression.values():
-            progression.append(progression[-1])
-    
-    return cascade_progression
+    return run_cascades(risk_network, [initial_risks], threshold, max_steps).to_dict(0)
 
-def identify_risk_feedback_loops(risk_network: nx.Graph) -> List[List[int]]:
-    feedback_loops = list(nx.simple_cycles(risk_network))
-    return [loop for loop in feedback_loops if len(loop) > 2]
+def identify_risk_feedback_loops(risk_network: nx.Graph, max_length: int = FEEDBACK_LOOP_MAX_LENGTH, min_weight: float = FEEDBACK_LOOP_MIN_WEIGHT,
+                                 max_loops: int = FEEDBACK_LOOP_MAX_LOOPS) -> List[List[int]]:
+    # Strongest loops first by product of edge weights, bounded in length and count
+    return [loop for loop, _ in strongest_feedback_loops(risk_network, max_loops, max_length, min_weight)]
 
 def assess_network_resilience(risk_network: nx.Graph) -> Dict[str, float]:
     resilience_metrics = {
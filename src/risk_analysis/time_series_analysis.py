@@ -1,39 +1,169 @@
-from typing import List, Dict
+import os
+import json
+import time
+import hashlib
+from typing import List, Dict, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
 from src.models import Risk, ExternalData
-from src.config import TIME_SERIES_HORIZON
+from src.config import TIME_SERIES_HORIZON, ARIMA_ORDER, TIME_SERIES_ENGINE
 import numpy as np
 from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.api import VAR
+
+EXTERNAL_FACTOR_FIELDS = ("gdp_growth", "population", "energy_demand")
+
+class ArimaParameterCache:
+    # Fitted ARIMA parameters per risk, tagged with a hash of the series they were fitted on. An unchanged
+    # series reuses its parameters without optimisation; a changed one (e.g. a new year of external data)
+    # warm-starts the optimiser from them.
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def lookup(self, risk_id: int, series_hash: str) -> Tuple[Optional[np.ndarray], bool]:
+        entry = self.entries.get(str(risk_id))
+        if entry is None:
+            return None, False
+        return np.array(entry["params"]), entry["series_hash"] == series_hash
+
+    def store(self, risk_id: int, series_hash: str, params: np.ndarray) -> None:
+        self.entries[str(risk_id)] = {"series_hash": series_hash, "params": [float(p) for p in params]}
+
+    def save(self) -> None:
+        if self.path:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f)
+
+def time_series_analysis(risks: List[Risk], external_data: Dict[str, ExternalData], workers: Optional[int] = None,
+                         parameter_cache: Optional[ArimaParameterCache] = None, engine: str = TIME_SERIES_ENGINE) -> Dict[int, List[float]]:
+    if engine == "factor":
+        return factor_model_projections(risks, external_data)
+    if engine != "arima":
+        raise ValueError(f"Unknown time series engine: {engine}")
+
+    histories = calculate_historical_impact_matrix(risks, external_data)
+    series_hashes = [hash_series(history) for history in histories]
+
+    tasks = []
+    for risk, history, series_hash in zip(risks, histories, series_hashes):
+        params, exact = parameter_cache.lookup(risk.id, series_hash) if parameter_cache is not None else (None, False)
+        tasks.append((history, params, not exact))
+
+    # Fits are independent, so they are spread over a process pool when more than one worker is requested
+    if workers is not None and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fits = list(executor.map(fit_arima_projection, *zip(*tasks)))
+    else:
+        fits = [fit_arima_projection(*task) for task in tasks]
 
-def time_series_analysis(risks: List[Risk], external_data: Dict[str, ExternalData]) -> Dict[int, List[float]]:
     time_series_results = {}
-    for risk in risks:
-        projections = project_risk_impact_arima(risk, external_data)
+    for risk, series_hash, (projections, params) in zip(risks, series_hashes, fits):
         time_series_results[risk.id] = projections
+        if parameter_cache is not None:
+            parameter_cache.store(risk.id, series_hash, params)
+    if parameter_cache is not None:
+        parameter_cache.save()
     return time_series_results
 
 def project_risk_impact_arima(risk: Risk, external_data: Dict[str, ExternalData]) -> List[float]:
     # Prepare historical data
-    historical_impacts = [calculate_historical_impact(risk, data) for data in external_data.values()]
-    
-    # Fit ARIMA model
-    model = ARIMA(historical_impacts, order=(1, 1, 1))  # Example order, adjust based on your data
-    model_fit = model.fit()
+    historical_impacts = calculate_historical_impact_matrix([risk], external_data)[0]
+    projections, _ = fit_arima_projection(historical_impacts)
+    return projections
+
+def fit_arima_projection(historical_impacts: np.ndarray, start_params: Optional[np.ndarray] = None,
+                         refit: bool = True) -> Tuple[List[float], np.ndarray]:
+    model = ARIMA(historical_impacts, order=ARIMA_ORDER)
+    if start_params is not None and not refit:
+        # Parameters already fitted on this exact series: only run the Kalman filter
+        model_fit = model.filter(start_params)
+    else:
+        model_fit = model.fit(start_params=start_params)
     
     # Make future projections
     forecast = model_fit.forecast(steps=TIME_SERIES_HORIZON)
     
-    return list(forecast)
+    return list(forecast), np.asarray(model_fit.params)
+
+def forecast_external_factors(external_data: Dict[str, ExternalData], horizon: int = TIME_SERIES_HORIZON) -> np.ndarray:
+    # Every risk's history is a scaled transform of the same few external factors, so the factors are forecast
+    # once with a VAR(1) on their yearly changes and the levels are rebuilt by cumulative summation
+    factors = build_external_factor_matrix(external_data)
+    if len(factors) < 2:
+        raise ValueError("At least two years of external data are needed to forecast external factors")
+    changes = np.diff(factors, axis=0)
+    try:
+        var_fit = VAR(changes).fit(maxlags=1)
+        forecast_changes = var_fit.forecast(changes[-var_fit.k_ar:], steps=horizon)
+    except (ValueError, np.linalg.LinAlgError):
+        # Too short or degenerate (e.g. constant) histories: carry the average change forward
+        forecast_changes = np.tile(changes.mean(axis=0), (horizon, 1))
+    return factors[-1] + np.cumsum(forecast_changes, axis=0)
+
+def factor_model_projections(risks: List[Risk], external_data: Dict[str, ExternalData], horizon: int = TIME_SERIES_HORIZON) -> Dict[int, List[float]]:
+    future_factors = forecast_external_factors(external_data, horizon)
+    gdp_factor, population_factor, energy_factor = calculate_external_factors(future_factors[:, 0], future_factors[:, 1], future_factors[:, 2])
+    base_impacts = np.array([risk.impact for risk in risks], dtype=np.float64)[:, None]
+    projections = np.clip(base_impacts * gdp_factor * population_factor * energy_factor, 0.0, 1.0)
+    return {risk.id: row.tolist() for risk, row in zip(risks, projections)}
+
+def compare_forecast_engines(risks: List[Risk], external_data: Dict[str, ExternalData], holdout_years: int = 3) -> Dict[str, Dict[str, float]]:
+    # Backtest: both engines forecast the last holdout_years from the earlier history and are scored against
+    # the realised historical impacts
+    years = list(external_data.keys())
+    training_data = {year: external_data[year] for year in years[:-holdout_years]}
+    actual = calculate_historical_impact_matrix(risks, external_data)[:, -holdout_years:]
+
+    comparison = {}
+    for engine in ("arima", "factor"):
+        start = time.perf_counter()
+        if engine == "arima":
+            histories = calculate_historical_impact_matrix(risks, training_data)
+            forecasts = np.array([fit_arima_projection(history)[0][:holdout_years] for history in histories])
+        else:
+            projections = factor_model_projections(risks, training_data, horizon=holdout_years)
+            forecasts = np.array([projections[risk.id] for risk in risks])
+        elapsed = time.perf_counter() - start
+        comparison[engine] = {
+            "seconds": elapsed,
+            "mae": float(np.mean(np.abs(forecasts - actual))),
+            "rmse": float(np.sqrt(np.mean((forecasts - actual) ** 2)))
+        }
+    return comparison
+
+def hash_series(series: List[float]) -> str:
+    payload = np.asarray(series, dtype=np.float64).tobytes() + repr(ARIMA_ORDER).encode()
+    return hashlib.sha256(payload).hexdigest()
 
 def calculate_historical_impact(risk: Risk, data: ExternalData) -> float:
     # Implement logic to calculate historical impact based on risk characteristics and external data
     base_impact = risk.impact
-    gdp_factor = 1 + (data.gdp_growth - 2) * 0.05  # Assume 2% as baseline GDP growth
-    population_factor = 1 + (data.population / 1e10) * 0.1
-    energy_factor = 1 + (data.energy_demand / 1e5) * 0.05
+    gdp_factor, population_factor, energy_factor = calculate_external_factors(data.gdp_growth, data.population, data.energy_demand)
     
     historical_impact = base_impact * gdp_factor * population_factor * energy_factor
     return min(1.0, max(0.0, historical_impact))
 
+def calculate_external_factors(gdp_growth, population, energy_demand):
+    # Works on scalars or on per-year arrays
+    gdp_factor = 1 + (gdp_growth - 2) * 0.05  # Assume 2% as baseline GDP growth
+    population_factor = 1 + (population / 1e10) * 0.1
+    energy_factor = 1 + (energy_demand / 1e5) * 0.05
+    return gdp_factor, population_factor, energy_factor
+
+def build_external_factor_matrix(external_data: Dict[str, ExternalData], fields: Tuple[str, ...] = EXTERNAL_FACTOR_FIELDS) -> np.ndarray:
+    # Year x factor array in external_data order; the only per-record attribute access in the batched path
+    return np.array([[getattr(data, field) for field in fields] for data in external_data.values()], dtype=np.float64).reshape(-1, len(fields))
+
+def calculate_historical_impact_matrix(risks: List[Risk], external_data: Dict[str, ExternalData]) -> np.ndarray:
+    # Risk x year historical impacts in one broadcast, matching calculate_historical_impact element for element
+    factors = build_external_factor_matrix(external_data)
+    gdp_factor, population_factor, energy_factor = calculate_external_factors(factors[:, 0], factors[:, 1], factors[:, 2])
+    base_impacts = np.array([risk.impact for risk in risks], dtype=np.float64)[:, None]
+    return np.clip(base_impacts * gdp_factor * population_factor * energy_factor, 0.0, 1.0)
+
 def analyze_impact_trends(time_series_results: Dict[int, List[float]]) -> Dict[int, Dict[str, float]]:
     trend_analysis = {}
     for risk_id, projections in time_series_results.items():
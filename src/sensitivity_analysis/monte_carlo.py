@@ -1,46 +1,114 @@
 import numpy as np
-from typing import List, Dict
-from src.models import Risk, Scenario, SimulationResult
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Dict, Optional, Tuple, Union, Callable, Any, Iterator
+from src.models import Risk, Scenario, SimulationResult, SimulationSummary
+from src.config import MONTE_CARLO_SHARD_SIZE
+from src.sensitivity_analysis.streaming_stats import summarize_simulation_shards
+from src.sensitivity_analysis.simulation_store import SimulationStore
 
-def perform_monte_carlo_simulations(risks: List[Risk], scenarios: Dict[str, Scenario], num_simulations: int = 10000) -> Dict[str, Dict[int, SimulationResult]]:
+def perform_monte_carlo_simulations(risks: List[Risk], scenarios: Dict[str, Scenario], num_simulations: int = 10000,
+                                    seed: Optional[int] = None, shared_draws: bool = False, workers: Optional[int] = None,
+                                    shard_size: int = MONTE_CARLO_SHARD_SIZE, streaming: bool = False,
+                                    store_dir: Optional[str] = None) -> Dict[str, Dict[int, Union[SimulationResult, SimulationSummary]]]:
+    if streaming and store_dir:
+        raise ValueError("Streaming summaries keep no distributions to store; use either streaming or store_dir")
+    base_impacts = np.array([risk.impact for risk in risks])
+    base_likelihoods = np.array([risk.likelihood for risk in risks])
+    shards = plan_simulation_shards(num_simulations, shard_size)
+    shard_seeds = spawn_shard_seeds(seed, len(scenarios), len(shards))
+
+    tasks = [(scenario, stop - start, shard_seeds[s][k])
+             for s, scenario in enumerate(scenarios.values())
+             for k, (start, stop) in enumerate(shards)]
+    shard_fn = partial(_simulate_shard, base_impacts=base_impacts, base_likelihoods=base_likelihoods, shared_draws=shared_draws)
+    shard_results = run_simulation_shards(shard_fn, tasks, workers)
+    if streaming:
+        return summarize_simulation_shards(shard_results, list(scenarios), [risk.id for risk in risks], len(shards),
+                                           shared_draws=shared_draws)
+    return collect_simulation_shards(shard_results, list(scenarios), [risk.id for risk in risks], shards,
+                                     num_simulations, store=SimulationStore(store_dir) if store_dir else None,
+                                     shared_draws=shared_draws)
+
+def _simulate_shard(scenario: Scenario, num_simulations: int, seed_sequence: np.random.SeedSequence,
+                    base_impacts: np.ndarray, base_likelihoods: np.ndarray, shared_draws: bool) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed_sequence)
+    # With shared draws every risk is evaluated against the same perturbed scenario in a given iteration
+    shape = (num_simulations, 1) if shared_draws else (num_simulations, len(base_impacts))
+    perturbed_scenario = perturb_scenario(scenario, shape, rng)
+    impacts = np.clip(base_impacts * calculate_impact_multiplier(perturbed_scenario), 0.0, 1.0)
+    likelihoods = np.clip(base_likelihoods * calculate_likelihood_multiplier(perturbed_scenario), 0.0, 1.0)
+    return impacts.T, likelihoods.T
+
+def plan_simulation_shards(num_simulations: int, shard_size: int = MONTE_CARLO_SHARD_SIZE) -> List[Tuple[int, int]]:
+    if shard_size <= 0:
+        raise ValueError("shard_size must be positive")
+    return [(start, min(start + shard_size, num_simulations)) for start in range(0, num_simulations, shard_size)]
+
+def spawn_shard_seeds(seed: Optional[int], num_streams: int, num_shards: int) -> List[List[np.random.SeedSequence]]:
+    # One independent child sequence per (stream, shard); the tree depends only on the seed and the shard plan
+    root = np.random.SeedSequence(seed)
+    return [stream.spawn(num_shards) for stream in root.spawn(num_streams)]
+
+def run_simulation_shards(shard_fn: Callable[..., Any], tasks: List[Tuple], workers: Optional[int] = None) -> Iterator[Any]:
+    # Yields shard results lazily and in task order, so callers can fold them without holding every shard
+    if not tasks:
+        return
+    if workers is None or workers <= 1:
+        for task in tasks:
+            yield shard_fn(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(shard_fn, *zip(*tasks))
+
+def collect_simulation_shards(shard_results: Iterator[Tuple[np.ndarray, np.ndarray]], scenario_names: List[str],
+                              risk_ids: List[int], shards: List[Tuple[int, int]], num_simulations: int,
+                              dtype: np.dtype = np.float64, store: Optional[SimulationStore] = None,
+                              shared_draws: bool = False) -> Dict[str, Dict[int, SimulationResult]]:
     results = {}
-    for scenario_name, scenario in scenarios.items():
-        scenario_results = {}
-        for risk in risks:
-            impact_distribution = []
-            likelihood_distribution = []
-            for _ in range(num_simulations):
-                perturbed_scenario = perturb_scenario(scenario)
-                impact = calculate_risk_impact(risk, perturbed_scenario)
-                likelihood = calculate_risk_likelihood(risk, perturbed_scenario)
-                impact_distribution.append(impact)
-                likelihood_distribution.append(likelihood)
-            scenario_results[risk.id] = SimulationResult(risk.id, scenario_name, impact_distribution, likelihood_distribution)
-        results[scenario_name] = scenario_results
+    for scenario_name in scenario_names:
+        # Distributions are laid out as (risk x simulation) so each SimulationResult is a contiguous row view
+        if store is not None:
+            impacts, likelihoods = store.allocate(scenario_name, len(risk_ids), num_simulations, dtype)
+        else:
+            impacts = np.empty((len(risk_ids), num_simulations), dtype=dtype)
+            likelihoods = np.empty((len(risk_ids), num_simulations), dtype=dtype)
+        for start, stop in shards:
+            impacts[:, start:stop], likelihoods[:, start:stop] = next(shard_results)
+        if store is not None:
+            impacts, likelihoods = store.commit(scenario_name, risk_ids, impacts, likelihoods, shared_draws)
+        results[scenario_name] = {
+            risk_id: SimulationResult(risk_id, scenario_name, impacts[i], likelihoods[i], shared_draws)
+            for i, risk_id in enumerate(risk_ids)
+        }
+    if store is not None:
+        store.retain(scenario_names)
     return results
 
-def perturb_scenario(scenario: Scenario) -> Scenario:
-    perturbed_values = vars(scenario).copy()
-    for var in perturbed_values:
+def perturb_scenario(scenario: Scenario, shape: Tuple[int, ...], rng: np.random.Generator) -> Scenario:
+    perturbed_values = {}
+    for var in scenario._fields:
         if var != 'name':
-            perturbed_values[var] *= np.random.normal(1, 0.1)  # 10% standard deviation
-    return Scenario(**perturbed_values)
+            perturbed_values[var] = getattr(scenario, var) * rng.normal(1, 0.1, shape)  # 10% standard deviation
+    return scenario._replace(**perturbed_values)
 
 def calculate_risk_impact(risk: Risk, scenario: Scenario) -> float:
+    impact = risk.impact * calculate_impact_multiplier(scenario)
+    return min(1.0, max(0.0, impact))
+
+def calculate_risk_likelihood(risk: Risk, scenario: Scenario) -> float:
+    likelihood = risk.likelihood * calculate_likelihood_multiplier(scenario)
+    return min(1.0, max(0.0, likelihood))
+
+def calculate_impact_multiplier(scenario: Scenario) -> Union[float, np.ndarray]:
     # Implement a more sophisticated impact calculation
-    base_impact = risk.impact
     temp_factor = 1 + (scenario.temp_increase - 1.5) * 0.1
     carbon_price_factor = 1 + (scenario.carbon_price / 100) * 0.05
     renewable_factor = 1 - scenario.renewable_energy * 0.2
-    
-    impact = base_impact * temp_factor * carbon_price_factor * renewable_factor
-    return min(1.0, max(0.0, impact))
+    return temp_factor * carbon_price_factor * renewable_factor
 
-def calculate_risk_likelihood(risk: Risk, scenario: Scenario) -> float:
+def calculate_likelihood_multiplier(scenario: Scenario) -> Union[float, np.ndarray]:
     # Implement a more sophisticated likelihood calculation
-    base_likelihood = risk.likelihood
     policy_factor = 1 - scenario.policy_stringency * 0.3
     ecosystem_factor = 1 + scenario.ecosystem_degradation * 0.4
-    
-    likelihood = base_likelihood * policy_factor * ecosystem_factor
-    return min(1.0, max(0.0, likelihood))
\ No newline at end of file
+    return policy_factor * ecosystem_factor
@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from src.models import SimulationResult
+
+class SimulationStore:
+    # On-disk store for full simulation distributions: one (risk x simulation) .npy file per scenario and
+    # measure, opened as memory maps so consumers read per-risk rows without copying them into RAM
+    INDEX_FILE = 'index.json'
+    TEMP_SUFFIX = '.tmp'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, self.INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"scenarios": {}}
+
+    def __contains__(self, scenario_name: str) -> bool:
+        return scenario_name in self.index["scenarios"]
+
+    def allocate(self, scenario_name: str, num_risks: int, num_simulations: int,
+                 dtype: np.dtype = np.float64) -> Tuple[np.memmap, np.memmap]:
+        # Writes go to temporary files so a crashed run never touches the files the index still lists
+        return tuple(
+            np.lib.format.open_memmap(os.path.join(self.directory, self.file_name(scenario_name, measure) + self.TEMP_SUFFIX),
+                                      mode='w+', dtype=dtype, shape=(num_risks, num_simulations))
+            for measure in ('impact', 'likelihood')
+        )
+
+    def commit(self, scenario_name: str, risk_ids: List[int], impacts: np.memmap, likelihoods: np.memmap,
+               shared_draws: bool = False) -> Tuple[np.memmap, np.memmap]:
+        # Only scenarios that finished writing are listed in the index; the finished files replace the previous ones
+        # atomically and are returned reopened from their final paths
+        committed = []
+        for measure, values in (('impact', impacts), ('likelihood', likelihoods)):
+            values.flush()
+            path = os.path.join(self.directory, self.file_name(scenario_name, measure))
+            os.replace(values.filename, path)
+            # Read-only, so an in-place operation downstream cannot rewrite the stored distributions
+            committed.append(np.load(path, mmap_mode='r'))
+        self.index["scenarios"][scenario_name] = {
+            "risk_ids": [int(risk_id) for risk_id in risk_ids],
+            "num_simulations": impacts.shape[1],
+            "shared_draws": shared_draws,
+            "impact_file": self.file_name(scenario_name, 'impact'),
+            "likelihood_file": self.file_name(scenario_name, 'likelihood')
+        }
+        self._write_index()
+        return tuple(committed)
+
+    def retain(self, scenario_names: List[str]) -> None:
+        # Drops scenarios left over from earlier runs, so the index lists exactly what the last run simulated
+        stale = [name for name in self.index["scenarios"] if name not in scenario_names]
+        for scenario_name in stale:
+            entry = self.index["scenarios"].pop(scenario_name)
+            for file_key in ("impact_file", "likelihood_file"):
+                path = os.path.join(self.directory, entry[file_key])
+                if os.path.exists(path):
+                    os.remove(path)
+        if stale:
+            self._write_index()
+
+    def check_matches(self, risk_ids: Optional[List[int]] = None, scenario_names: Optional[List[str]] = None,
+                      num_simulations: Optional[int] = None, shared_draws: Optional[bool] = None) -> None:
+        # Raises ValueError when the stored distributions were simulated for another register, scenario set, run size
+        # or draw mode
+        problems = []
+        stored = self.index["scenarios"]
+        if scenario_names is not None:
+            missing = [name for name in scenario_names if name not in stored]
+            if missing:
+                problems.append(f"scenarios not stored: {', '.join(missing)}")
+        for scenario_name in (scenario_names if scenario_names is not None else list(stored)):
+            entry = stored.get(scenario_name)
+            if entry is None:
+                continue
+            if risk_ids is not None and entry["risk_ids"] != [int(risk_id) for risk_id in risk_ids]:
+                problems.append(f"{scenario_name} was simulated for other risks")
+            if num_simulations is not None and entry["num_simulations"] != num_simulations:
+                problems.append(f"{scenario_name} has {entry['num_simulations']} simulations, expected {num_simulations}")
+            if shared_draws is not None and entry.get("shared_draws", False) != shared_draws:
+                problems.append(f"{scenario_name} was simulated {'with' if entry.get('shared_draws', False) else 'without'} shared draws")
+        if problems:
+            raise ValueError(f"Simulation store {self.directory} does not match this run: {'; '.join(problems)}")
+
+    def _write_index(self) -> None:
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        with open(index_path + self.TEMP_SUFFIX, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(index_path + self.TEMP_SUFFIX, index_path)
+
+    @staticmethod
+    def file_name(scenario_name: str, measure: str) -> str:
+        # The slug keeps names readable; the digest keeps names that slug alike ("Net Zero", "net-zero") apart
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', scenario_name).strip('_').lower()
+        digest = hashlib.sha256(scenario_name.encode('utf-8')).hexdigest()[:8]
+        return f"{slug}_{digest}_{measure}.npy"
+
+    def load(self, mmap_mode: str = 'r', scenario_names: Optional[List[str]] = None) -> Dict[str, Dict[int, SimulationResult]]:
+        results = {}
+        for scenario_name, entry in self.index["scenarios"].items():
+            if scenario_names is not None and scenario_name not in scenario_names:
+                continue
+            impacts = np.load(os.path.join(self.directory, entry["impact_file"]), mmap_mode=mmap_mode)
+            likelihoods = np.load(os.path.join(self.directory, entry["likelihood_file"]), mmap_mode=mmap_mode)
+            results[scenario_name] = {
+                risk_id: SimulationResult(risk_id, scenario_name, impacts[i], likelihoods[i], entry.get("shared_draws", False))
+                for i, risk_id in enumerate(entry["risk_ids"])
+            }
+        return results
+
+def load_simulation_results(directory: str, risk_ids: Optional[List[int]] = None, scenario_names: Optional[List[str]] = None,
+                            num_simulations: Optional[int] = None, shared_draws: Optional[bool] = None) -> Dict[str, Dict[int, SimulationResult]]:
+    # Only returns distributions simulated for exactly these risks, scenarios, run size and draw mode; raises ValueError otherwise
+    if not os.path.exists(os.path.join(directory, SimulationStore.INDEX_FILE)):
+        raise FileNotFoundError(f"Simulation store not found: {directory}")
+    store = SimulationStore(directory)
+    store.check_matches(risk_ids, scenario_names, num_simulations, shared_draws)
+    return store.load(scenario_names=scenario_names)
@@ -0,0 +1,147 @@
+import numpy as np
+from typing import List, Dict, Iterator, Tuple, Union
+from src.models import SimulationResult, SimulationSummary, DistributionSummary
+from src.config import STREAMING_HISTOGRAM_BINS
+
+# Mergeable accumulator for a batch of [0, 1]-bounded series: Welford/Chan mean and variance plus a
+# fixed-bin histogram sketch. Simulated impacts and likelihoods are clipped to [0, 1], so quantiles
+# read from the histogram are accurate to one bin width.
+class StreamingDistribution:
+    def __init__(self, num_series: int, num_bins: int = STREAMING_HISTOGRAM_BINS):
+        self.num_bins = num_bins
+        self.count = 0
+        self.mean = np.zeros(num_series)
+        self.m2 = np.zeros(num_series)
+        self.histogram = np.zeros((num_series, num_bins), dtype=np.int64)
+
+    def update(self, samples: np.ndarray) -> None:
+        # samples is (num_series x batch_size)
+        samples = np.asarray(samples, dtype=np.float64)
+        batch_count = samples.shape[1]
+        if batch_count == 0:
+            return
+        batch_mean = samples.mean(axis=1)
+        batch_m2 = ((samples - batch_mean[:, None]) ** 2).sum(axis=1)
+        self._combine(batch_count, batch_mean, batch_m2)
+
+        bins = np.clip((samples * self.num_bins).astype(np.int64), 0, self.num_bins - 1)
+        flat_bins = bins + np.arange(len(samples))[:, None] * self.num_bins
+        self.histogram += np.bincount(flat_bins.ravel(), minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    def merge(self, other: 'StreamingDistribution') -> None:
+        if other.count == 0:
+            return
+        self._combine(other.count, other.mean, other.m2)
+        self.histogram += other.histogram
+
+    def _combine(self, count: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def summary(self, index: int) -> DistributionSummary:
+        variance = self.m2[index] / self.count if self.count else 0.0
+        return DistributionSummary(self.count, float(self.mean[index]), float(variance), self.histogram[index])
+
+def histogram_percentile(histogram: np.ndarray, q: float) -> float:
+    count = histogram.sum()
+    if count == 0:
+        return float('nan')
+    width = 1.0 / len(histogram)
+    cumulative = np.cumsum(histogram)
+    target = q / 100 * count
+    bin_index = min(int(np.searchsorted(cumulative, target, side='left')), len(histogram) - 1)
+    below = cumulative[bin_index] - histogram[bin_index]
+    fraction = (target - below) / histogram[bin_index] if histogram[bin_index] else 0.5
+    return float((bin_index + fraction) * width)
+
+def histogram_var_cvar(histogram: np.ndarray, confidence_level: float = 0.95) -> Tuple[float, float]:
+    # Mirrors calculate_var_cvar: VaR at the (1 - confidence) percentile, CVaR as the mean above it
+    var = histogram_percentile(histogram, (1 - confidence_level) * 100)
+    return var, histogram_mean_above(histogram, var)
+
+def histogram_upper_tail(histogram: np.ndarray, confidence_level: float = 0.95) -> Tuple[float, float]:
+    # Loss-tail convention: VaR at the confidence percentile, CVaR as the mean of the worst (1 - confidence)
+    var = histogram_percentile(histogram, confidence_level * 100)
+    return var, histogram_mean_above(histogram, var)
+
+def histogram_mean_above(histogram: np.ndarray, var: float) -> float:
+    width = 1.0 / len(histogram)
+    var_bin = min(int(var / width), len(histogram) - 1)
+    midpoints = (np.arange(len(histogram)) + 0.5) * width
+
+    upper_edge = (var_bin + 1) * width
+    partial_count = histogram[var_bin] * (upper_edge - var) / width
+    tail_count = histogram[var_bin + 1:].sum() + partial_count
+    tail_sum = (histogram[var_bin + 1:] * midpoints[var_bin + 1:]).sum() + partial_count * (var + upper_edge) / 2
+    return float(tail_sum / tail_count) if tail_count > 0 else var
+
+def sample_var_cvar(samples: np.ndarray, confidence_level: float = 0.95) -> Tuple[float, float]:
+    # Shared tail convention: VaR at the (1 - confidence) percentile, CVaR as the mean strictly above it
+    samples = np.asarray(samples)
+    var = float(np.percentile(samples, (1 - confidence_level) * 100))
+    tail = samples[samples > var]
+    return var, float(np.mean(tail)) if len(tail) else var
+
+def sample_upper_tail(samples: np.ndarray, confidence_level: float = 0.95) -> Tuple[float, float]:
+    # Loss-tail convention: VaR at the confidence percentile, CVaR as the mean of the samples at or above it
+    samples = np.asarray(samples)
+    var = float(np.percentile(samples, confidence_level * 100))
+    return var, float(np.mean(samples[samples >= var]))
+
+def result_upper_tail(result: Union[SimulationResult, SimulationSummary], confidence_level: float = 0.95) -> Tuple[float, float]:
+    if isinstance(result, SimulationSummary):
+        return histogram_upper_tail(result.impact.histogram, confidence_level)
+    return sample_upper_tail(result.impact_distribution, confidence_level)
+
+def result_var_cvar(result: Union[SimulationResult, SimulationSummary], confidence_level: float = 0.95) -> Tuple[float, float]:
+    if isinstance(result, SimulationSummary):
+        return histogram_var_cvar(result.impact.histogram, confidence_level)
+    return sample_var_cvar(result.impact_distribution, confidence_level)
+
+def summarize_simulation_shards(shard_results: Iterator[Tuple[np.ndarray, np.ndarray]], scenario_names: List[str],
+                                risk_ids: List[int], shards_per_scenario: int, num_bins: int = STREAMING_HISTOGRAM_BINS,
+                                shared_draws: bool = False) -> Dict[str, Dict[int, SimulationSummary]]:
+    # Folds (impacts, likelihoods) shard blocks into accumulators so full distributions are never materialized
+    results = {}
+    for scenario_name in scenario_names:
+        impacts = StreamingDistribution(len(risk_ids), num_bins)
+        likelihoods = StreamingDistribution(len(risk_ids), num_bins)
+        for _ in range(shards_per_scenario):
+            impact_block, likelihood_block = next(shard_results)
+            impacts.update(impact_block)
+            likelihoods.update(likelihood_block)
+        results[scenario_name] = {
+            risk_id: SimulationSummary(risk_id, scenario_name, impacts.summary(i), likelihoods.summary(i), shared_draws)
+            for i, risk_id in enumerate(risk_ids)
+        }
+    return results
+
+def describe_simulation_result(result: Union[SimulationResult, SimulationSummary], confidence_level: float = 0.95) -> Dict[str, float]:
+    var, cvar = result_var_cvar(result, confidence_level)
+    if isinstance(result, SimulationSummary):
+        return {
+            "mean_impact": result.impact.mean,
+            "std_impact": float(np.sqrt(result.impact.variance)),
+            "5th_percentile_impact": histogram_percentile(result.impact.histogram, 5),
+            "95th_percentile_impact": histogram_percentile(result.impact.histogram, 95),
+            "mean_likelihood": result.likelihood.mean,
+            "std_likelihood": float(np.sqrt(result.likelihood.variance)),
+            "VaR": var,
+            "CVaR": cvar
+        }
+
+    impacts = np.asarray(result.impact_distribution)
+    likelihoods = np.asarray(result.likelihood_distribution)
+    return {
+        "mean_impact": float(np.mean(impacts)),
+        "std_impact": float(np.std(impacts)),
+        "5th_percentile_impact": float(np.percentile(impacts, 5)),
+        "95th_percentile_impact": float(np.percentile(impacts, 95)),
+        "mean_likelihood": float(np.mean(likelihoods)),
+        "std_likelihood": float(np.std(likelihoods)),
+        "VaR": var,
+        "CVaR": cvar
+    }
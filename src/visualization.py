@@ -1,11 +1,11 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import List, Dict
+from typing import List, Dict, Union
 import pandas as pd
 import numpy as np
 import networkx as nx
 import os
-from src.models import Risk, RiskInteraction, SimulationResult
+from src.models import Risk, RiskInteraction, SimulationResult, SimulationSummary
 from src.config import OUTPUT_DIR, VIZ_DPI, HEATMAP_CMAP, TIME_SERIES_HORIZON
 
 def generate_visualizations(risks: List[Risk], risk_interactions: List[RiskInteraction], 
@@ -17,7 +17,7 @@ def generate_visualizations(risks: List[Risk], risk_interactions: List[RiskInter
                             cumulative_impact: List[float],
                             interaction_matrix: np.ndarray,
                             risk_progression: Dict[int, List[float]],
-                            aggregate_impact: Dict[str, float]):
+                            aggregate_impact: Dict[str, Union[float, np.ndarray]]):
     risk_matrix(risks)
     interaction_heatmap(risks, risk_interactions)
     interaction_network(risks, risk_interactions, risk_network, risk_clusters)
@@ -66,10 +66,9 @@ def risk_progression_plot(risks: List[Risk], risk_progression: Dict[int, List[fl
     plt.savefig(os.path.join(OUTPUT_DIR, 'risk_progression.png'), dpi=VIZ_DPI)
     plt.close()
 
-def aggregate_impact_distribution(aggregate_impact: Dict[str, float]):
+def aggregate_impact_distribution(aggregate_impact: Dict[str, Union[float, np.ndarray]]):
     plt.figure(figsize=(10, 6))
-    impact_values = list(aggregate_impact.values())
-    sns.histplot(impact_values, kde=True)
+    sns.histplot(aggregate_impact['distribution'], kde=True)
     plt.axvline(aggregate_impact['mean'], color='r', linestyle='--', label='Mean')
     plt.axvline(aggregate_impact['95th_percentile'], color='g', linestyle='--', label='95th Percentile')
     plt.xlabel('Aggregate Impact')
@@ -110,11 +109,17 @@ def interaction_network(risks: List[Risk], risk_interactions: List[RiskInteracti
     plt.savefig(os.path.join(OUTPUT_DIR, 'interaction_network.png'), dpi=VIZ_DPI)
     plt.close()
 
-def monte_carlo_results(simulation_results: Dict[str, Dict[int, SimulationResult]]):
+def monte_carlo_results(simulation_results: Dict[str, Dict[int, Union[SimulationResult, SimulationSummary]]]):
     plt.figure(figsize=(16, 12))
     for scenario, results in simulation_results.items():
         for risk_id, sim_result in results.items():
-            sns.kdeplot(sim_result.impact_distribution, label=f'Risk {risk_id} - {scenario}')
+            if isinstance(sim_result, SimulationSummary):
+                # Streaming runs keep only the histogram sketch, so plot its density directly
+                histogram = sim_result.impact.histogram
+                bin_centers = (np.arange(len(histogram)) + 0.5) / len(histogram)
+                plt.plot(bin_centers, histogram * len(histogram) / max(histogram.sum(), 1), label=f'Risk {risk_id} - {scenario}')
+            else:
+                sns.kdeplot(sim_result.impact_distribution, label=f'Risk {risk_id} - {scenario}')
     plt.xlabel('Risk Impact')
     plt.ylabel('Density')
     plt.title('Monte Carlo Simulation Results')
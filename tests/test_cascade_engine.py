@@ -0,0 +1,91 @@
+import pytest
+import networkx as nx
+import numpy as np
+from src.risk_analysis.cascade_engine import run_cascades, cascade_each_risk, build_cascade_index, get_cascade_index
+from src.risk_analysis.interaction_analysis import analyze_risk_cascades
+
+@pytest.fixture
+def cascade_graphs():
+    graphs = []
+    for seed in range(5):
+        rng = np.random.default_rng(seed)
+        G = nx.gnp_random_graph(25, 0.15, seed=seed)
+        nx.set_edge_attributes(G, {edge: float(rng.uniform(0.2, 0.9)) for edge in G.edges()}, 'weight')
+        graphs.append(nx.relabel_nodes(G, {node: node + 100 for node in G.nodes()}))
+    return graphs
+
+def legacy_cascades(G, initial_risks, threshold=0.5, max_steps=10):
+    cascade_progression = {risk: [1.0] for risk in initial_risks}
+    for _ in range(max_steps):
+        new_activations = {}
+        for node in G.nodes():
+            if node not in cascade_progression:
+                neighbor_influence = sum(cascade_progression.get(neighbor, [0])[-1] * G[node][neighbor]['weight']
+                                         for neighbor in G.neighbors(node))
+                if neighbor_influence > threshold:
+                    new_activations[node] = neighbor_influence
+        if not new_activations:
+            break
+        for node, activation in new_activations.items():
+            cascade_progression[node] = [0.0] * (len(next(iter(cascade_progression.values()))) - 1) + [activation]
+        for progression in cascade_progression.values():
+            progression.append(progression[-1])
+    return cascade_progression
+
+def assert_same_cascade(actual, expected):
+    assert list(actual) == list(expected)
+    for node, progression in expected.items():
+        assert actual[node] == pytest.approx(progression)
+
+def test_analyze_risk_cascades_matches_legacy(cascade_graphs):
+    for G in cascade_graphs:
+        for threshold in (0.3, 0.5, 0.8):
+            seeds = [101, 107, 112]
+            assert_same_cascade(analyze_risk_cascades(G, seeds, threshold), legacy_cascades(G, seeds, threshold))
+            assert_same_cascade(analyze_risk_cascades(G, seeds, threshold, max_steps=2), legacy_cascades(G, seeds, threshold, max_steps=2))
+
+def test_batched_seed_sets_match_individual_runs(cascade_graphs):
+    G = cascade_graphs[0]
+    seed_sets = [[100], [105, 110], [999, 103], [], [100, 100]]
+
+    result = run_cascades(G, seed_sets, threshold=0.4)
+
+    assert result.values.shape == (5, 25)
+    for row, seeds in enumerate(seed_sets):
+        assert_same_cascade(result.to_dict(row), legacy_cascades(G, seeds, 0.4))
+        assert result.progression(row).shape == (25, result.steps_run[row] + 1)
+
+    each = cascade_each_risk(G, [100, 104], threshold=0.4)
+    assert_same_cascade(each[104], legacy_cascades(G, [104], 0.4))
+
+def test_cascade_index_matches_single_seed_cascades(cascade_graphs):
+    G = cascade_graphs[2]
+    cascade_index = build_cascade_index(G, threshold=0.5, chunk_size=7)
+
+    for seed in G.nodes():
+        legacy = legacy_cascades(G, [seed], 0.5)
+        activated = [node for node in legacy if node != seed]
+        assert cascade_index.activated(seed) == activated
+        assert cascade_index.cascade_reach(seed) == len(activated)
+        assert cascade_index.activation_step(seed, seed) == 0
+        for target in G.nodes():
+            assert cascade_index.activates(seed, target) == (target in legacy)
+            if target in activated:
+                # A risk activated in step k has k - 1 leading zeros in its legacy progression
+                assert cascade_index.activation_step(seed, target) == legacy[target].index(legacy[target][-1]) + 1
+            elif target != seed:
+                assert cascade_index.activation_step(seed, target) == -1
+    # Only activations are stored: each seed itself plus the risks it reaches
+    assert cascade_index.activations.nnz == G.number_of_nodes() + sum(cascade_index.cascade_reach(seed) for seed in G.nodes())
+
+def test_cascade_index_cache_invalidated_by_edge_changes(cascade_graphs):
+    G = cascade_graphs[3].copy()
+
+    first = get_cascade_index(G, threshold=0.5)
+    assert get_cascade_index(G.copy(), threshold=0.5) is first
+    assert get_cascade_index(G, threshold=0.6) is not first
+
+    u, v = next(iter(G.edges()))
+    G[u][v]['weight'] += 0.1
+    assert not first.is_current(G)
+    assert get_cascade_index(G, threshold=0.5) is not first
@@ -0,0 +1,68 @@
+import pytest
+import networkx as nx
+import numpy as np
+from src.risk_analysis import centrality
+from src.risk_analysis.centrality import (eigenvector_centrality, pagerank, betweenness_centrality, betweenness_error_bound,
+                                          get_centrality, source_dependencies)
+
+@pytest.fixture
+def weighted_network():
+    def build(n, p, seed):
+        rng = np.random.default_rng(seed)
+        G = nx.connected_watts_strogatz_graph(n, 6, p, seed=seed)
+        nx.set_edge_attributes(G, {edge: float(rng.uniform(0.1, 1.0)) for edge in G.edges()}, 'weight')
+        return G
+    return build
+
+def assert_same_measure(actual, expected, tolerance):
+    assert actual.keys() == expected.keys()
+    np.testing.assert_allclose([actual[node] for node in expected], list(expected.values()), atol=tolerance)
+
+def test_solvers_match_networkx(weighted_network):
+    for n in (40, 300):  # Dense and ARPACK eigen paths
+        G = weighted_network(n, 0.2, n)
+
+        assert_same_measure(eigenvector_centrality(G), nx.eigenvector_centrality(G, weight='weight', max_iter=1000, tol=1e-10), 1e-6)
+        assert_same_measure(pagerank(G), nx.pagerank(G, weight='weight'), 1e-6)
+
+    directed = nx.gnp_random_graph(60, 0.1, seed=3, directed=True)
+    assert_same_measure(pagerank(directed), nx.pagerank(directed), 1e-6)
+
+def test_sampled_betweenness_within_error_bound(weighted_network):
+    G = weighted_network(200, 0.1, 5)
+    exact = nx.betweenness_centrality(G, weight='weight')
+
+    sampled = betweenness_centrality(G, samples=100, seed=1)
+    bound = betweenness_error_bound(G.number_of_nodes(), 100, confidence=0.95)
+
+    assert 0 < bound < 1
+    assert max(abs(sampled[node] - exact[node]) for node in G) <= bound
+    assert betweenness_centrality(G, samples=500) == exact
+    assert betweenness_error_bound(200, None) == 0.0
+    assert betweenness_error_bound(200, 400) < bound
+
+def test_source_dependencies_sum_to_betweenness(weighted_network):
+    G = weighted_network(80, 0.2, 3)
+    # Ties between equal-length paths must be counted too
+    G.add_edges_from([(0, 40, {'weight': 1.0}), (40, 41, {'weight': 1.0}), (0, 42, {'weight': 1.0}), (42, 41, {'weight': 1.0})])
+    totals = dict.fromkeys(G, 0.0)
+    for source in G:
+        for node, dependency in source_dependencies(G, source).items():
+            totals[node] += dependency / 2
+    assert_same_measure(totals, nx.betweenness_centrality(G, normalized=False, weight='weight'), 1e-9)
+
+def test_get_centrality_computes_each_measure_once_per_graph(weighted_network, monkeypatch):
+    G = weighted_network(30, 0.2, 7)
+    calls = []
+    compute = centrality.compute_centrality
+    monkeypatch.setattr(centrality, "compute_centrality", lambda G, measure, *args: calls.append(measure) or compute(G, measure, *args))
+
+    first = get_centrality(G)
+    assert get_centrality(G.copy(), ["betweenness"])["betweenness"] is first["betweenness"]
+    assert sorted(calls) == sorted(["degree", "betweenness", "eigenvector", "pagerank"])
+
+    get_centrality(G, ["betweenness"], betweenness_samples=10)
+    u, v = next(iter(G.edges()))
+    G[u][v]['weight'] *= 2
+    get_centrality(G, ["pagerank"])
+    assert calls[-2:] == ["betweenness", "pagerank"]
@@ -0,0 +1,45 @@
+import pytest
+import networkx as nx
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+from src.risk_analysis.clustering import louvain_clusters, spectral_clusters
+from src.risk_analysis.interaction_analysis import detect_risk_clusters
+
+@pytest.fixture
+def planted_network():
+    def build(groups, group_size, seed):
+        G = nx.planted_partition_graph(groups, group_size, 0.4, 0.01, seed=seed)
+        rng = np.random.default_rng(seed)
+        nx.set_edge_attributes(G, {edge: float(rng.uniform(0.3, 1.0)) for edge in G.edges()}, 'weight')
+        truth = {node: node // group_size for node in G.nodes()}
+        return G, truth
+    return build
+
+def agreement(clusters, truth):
+    nodes = list(truth)
+    return adjusted_rand_score([truth[node] for node in nodes], [clusters[node] for node in nodes])
+
+def test_louvain_and_spectral_recover_planted_clusters(planted_network):
+    for groups, group_size in ((4, 20), (6, 40)):  # Dense and ARPACK eigen paths
+        G, truth = planted_network(groups, group_size, groups)
+
+        spectral = spectral_clusters(G)
+        louvain = louvain_clusters(G)
+
+        assert len(set(spectral.values())) == groups
+        assert agreement(spectral, truth) > 0.9
+        assert agreement(louvain, truth) > 0.9
+
+def test_detect_risk_clusters_mapping(planted_network):
+    G, truth = planted_network(3, 10, 1)
+    G = nx.relabel_nodes(G, {node: node + 1 for node in G.nodes()})
+
+    clusters = detect_risk_clusters(G)
+    fixed = detect_risk_clusters(G, num_clusters=5)
+
+    assert list(clusters) == list(G.nodes())
+    assert all(isinstance(label, int) for label in clusters.values())
+    assert len(set(fixed.values())) == 5
+    assert detect_risk_clusters(G, method="spectral") == spectral_clusters(G)
+    with pytest.raises(ValueError):
+        detect_risk_clusters(G, method="kmeans")
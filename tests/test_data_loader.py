@@ -1,5 +1,6 @@
+import logging
 import pytest
-from src.data_loader import load_risk_data, load_external_data
+from src.data_loader import load_risk_data, load_external_data, load_risk_table, load_external_data_table
 from src.models import Risk, ExternalData
 
 def test_load_risk_data():
@@ -27,4 +28,75 @@ def test_load_risk_data_file_not_found():
 
 def test_load_external_data_file_not_found():
     with pytest.raises(FileNotFoundError):
-        load_external_data('nonexistent_file.csv')
\ No newline at end of file
+        load_external_data('nonexistent_file.csv')
+
+@pytest.fixture
+def risk_csv(tmp_path):
+    path = tmp_path / "risks.csv"
+    path.write_text(
+        "id,description,category,likelihood,impact,industry_specific\n"
+        "1,Flooding,Physical Risk,0.8,0.9,true\n"
+        "2,Carbon tax,Transition Risk,1.4,0.5,false\n"
+        "3,Drought,Physical Risk,0.3,high,no\n"
+        "4,,Physical Risk,0.2,0.1,yes\n"
+        "5,Litigation,Transition Risk,0.4,0.6,maybe\n"
+        "6,Heat stress,Physical Risk,0.5,0.7,\n"
+    )
+    return str(path)
+
+def test_load_risk_table_collects_row_errors(risk_csv):
+    table, report = load_risk_table(risk_csv)
+
+    assert report.rows_read == 6
+    assert report.rows_rejected == 4
+    assert [(error.row, error.field, error.message) for error in report.errors] == [
+        (1, 'likelihood', 'must be between 0 and 1'),
+        (2, 'impact', 'not a number'),
+        (3, 'description', 'missing value'),
+        (4, 'industry_specific', 'not a boolean')
+    ]
+    assert "4 of 6 rows rejected" in report.summary()
+    assert list(table.id) == [1, 6]
+    assert [risk.industry_specific for risk in table] == [True, False]
+
+def test_risk_table_builds_risks_lazily(risk_csv):
+    table, _ = load_risk_table(risk_csv)
+
+    assert table._risks == [None, None]
+    risk = table[1]
+    assert table[1] is risk
+    assert table._risks[0] is None
+    assert isinstance(risk, Risk)
+    assert (risk.id, risk.description, risk.likelihood, risk.subcategory) == (6, "Heat stress", 0.5, "")
+    assert type(risk.id) is int and type(risk.impact) is float
+    assert load_risk_data(risk_csv)[0].dict() == table[0].dict()
+
+def test_load_risk_data_logs_rejected_rows(risk_csv, caplog):
+    with caplog.at_level(logging.WARNING, logger="src.data_loader"):
+        risks = load_risk_data(risk_csv)
+    assert [risk.id for risk in risks] == [1, 6]
+    assert f"Errors loading {risk_csv}" in caplog.text and "4 of 6 rows rejected" in caplog.text
+
+def test_missing_required_column_raises(tmp_path):
+    path = tmp_path / "risks.csv"
+    path.write_text("id,description,likelihood\n1,Flooding,0.5\n")
+    with pytest.raises(ValueError, match="category, impact"):
+        load_risk_table(str(path))
+
+def test_load_external_data_table_defaults_optional_columns(tmp_path):
+    path = tmp_path / "external.csv"
+    path.write_text(
+        "year,gdp_growth,population,energy_demand,carbon_price\n"
+        "2020,2.3,7794798739,173340,30\n"
+        "2021.5,2.1,7900000000,175000,\n"
+        "2022,1.9,8000000000,176000,\n"
+    )
+    table, report = load_external_data_table(str(path))
+
+    assert [(error.row, error.field) for error in report.errors] == [(1, 'year')]
+    external_data = table.to_dict()
+    assert list(external_data) == ['2020', '2022']
+    assert external_data['2020'].population == 7794798739
+    assert external_data['2020'].carbon_price == 30.0
+    assert external_data['2022'].carbon_price == 0.0
+    assert external_data['2022'].deforestation_rate == 0.0
@@ -0,0 +1,75 @@
+import time
+import logging
+import tracemalloc
+import pytest
+import networkx as nx
+import numpy as np
+from src.risk_analysis.feedback_loops import iter_feedback_loops, strongest_feedback_loops
+from src.risk_analysis.systemic_risk_analysis import identify_risk_feedback_loops
+
+@pytest.fixture
+def loop_network():
+    def build(n, p, seed, directed=False):
+        rng = np.random.default_rng(seed)
+        G = nx.gnp_random_graph(n, p, seed=seed, directed=directed)
+        nx.set_edge_attributes(G, {edge: float(rng.uniform(0.1, 1.0)) for edge in G.edges()}, 'weight')
+        return G
+    return build
+
+def exhaustive_loops(G, max_length, min_weight=0.0):
+    H = G.edge_subgraph([(u, v) for u, v, w in G.edges(data='weight') if w >= min_weight])
+    products = [np.prod([G[u][v]['weight'] for u, v in zip(loop, loop[1:] + loop[:1])])
+                for loop in nx.simple_cycles(H, length_bound=max_length) if len(loop) > 2]
+    return sorted(products, reverse=True)
+
+def test_enumerates_every_bounded_loop_strongest_first(loop_network):
+    for directed in (False, True):
+        G = loop_network(12, 0.35, 3, directed)
+
+        loops = list(iter_feedback_loops(G, max_length=5, min_weight=0.2))
+
+        products = [product for _, product in loops]
+        assert products == sorted(products, reverse=True)
+        np.testing.assert_allclose(products, exhaustive_loops(G, 5, min_weight=0.2))
+        for loop, product in loops:
+            assert 3 <= len(loop) <= 5 and len(set(loop)) == len(loop)
+            assert np.prod([G[u][v]['weight'] for u, v in zip(loop, loop[1:] + loop[:1])]) == pytest.approx(product)
+
+def test_top_k_returns_quickly_on_dense_graph(loop_network):
+    G = loop_network(60, 0.5, 7)
+
+    start = time.perf_counter()
+    strongest = strongest_feedback_loops(G, top_k=10, max_length=8)
+    assert time.perf_counter() - start < 10
+
+    assert len(strongest) == 10
+    assert [loop for loop, _ in strongest] == identify_risk_feedback_loops(G, max_length=8, max_loops=10)
+
+def test_memory_and_time_stay_bounded_on_complete_graph():
+    # The network an unpruned interaction analysis produces: every pair linked with the same weak score
+    G = nx.complete_graph(300)
+    nx.set_edge_attributes(G, 0.1, 'weight')
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        strongest = strongest_feedback_loops(G, top_k=100, max_length=6)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(strongest) == 100
+    assert all(product == pytest.approx(1e-3) for _, product in strongest)
+    assert elapsed < 10
+    assert peak < 100 * 2 ** 20
+
+def test_exhausted_budget_logs_warning(loop_network, caplog):
+    G = loop_network(30, 0.5, 2)
+
+    with caplog.at_level(logging.WARNING, logger="src.risk_analysis.feedback_loops"):
+        assert list(iter_feedback_loops(G, max_expansions=0)) == []
+        assert len(list(iter_feedback_loops(G, max_length=4, max_expansions=10 ** 6))) > 0
+    assert len(caplog.records) == 1
+    assert "stopped after 0 expansions" in caplog.records[0].getMessage()
+
@@ -0,0 +1,47 @@
+import pytest
+import numpy as np
+from src.risk_analysis.interaction_candidates import compute_risk_similarity, select_candidate_pairs, candidate_recall_report
+from src.models import Risk, RiskInteraction
+
+@pytest.fixture
+def sample_risks():
+    def risk(id, description, category, subcategory):
+        return Risk(id=id, description=description, category=category, subcategory=subcategory, tertiary_category="",
+                    likelihood=0.5, impact=0.5, time_horizon="", industry_specific=False, sasb_category="")
+    return [
+        risk(1, "Coastal flooding damages production facilities", "Physical", "Acute"),
+        risk(2, "River flooding disrupts production and logistics", "Physical", "Acute"),
+        risk(3, "Carbon tax increases operating costs", "Transition", "Policy"),
+        risk(4, "Stricter carbon pricing regulation raises costs", "Transition", "Policy"),
+        risk(5, "Chronic heat stress reduces worker productivity", "Physical", "Chronic"),
+    ]
+
+def test_similarity_prefers_related_risks(sample_risks):
+    similarity = compute_risk_similarity(sample_risks)
+
+    assert similarity.shape == (5, 5)
+    assert np.all(np.isneginf(np.diag(similarity)))
+    assert np.argmax(similarity[0]) == 1
+    assert np.argmax(similarity[2]) == 3
+
+def test_select_candidate_pairs_respects_budget(sample_risks):
+    assert len(select_candidate_pairs(sample_risks, None)) == 10
+    assert len(select_candidate_pairs(sample_risks, 4)) == 10
+
+    candidates = select_candidate_pairs(sample_risks, 1)
+    assert (0, 1) in candidates and (2, 3) in candidates
+    assert all(i < j for i, j in candidates)
+    assert len(candidates) <= 5
+
+def test_candidate_recall_report(sample_risks):
+    scores = {(0, 1): 0.9, (2, 3): 0.8, (0, 4): 0.75, (1, 2): 0.5}
+    exhaustive = [RiskInteraction(sample_risks[i].id, sample_risks[j].id, scores.get((i, j), 0.2), "")
+                  for i in range(5) for j in range(i+1, 5)]
+
+    report = candidate_recall_report(sample_risks, exhaustive, {(0, 1), (2, 3)}, default_score=0.0)
+
+    assert report["total_pairs"] == 10
+    assert report["pruned_fraction"] == pytest.approx(0.8)
+    assert report["strong_interactions"] == 3
+    assert report["strong_recall"] == pytest.approx(2 / 3)
+    assert report["pruned_mean_abs_error"] == pytest.approx((0.75 + 0.5 + 0.2 * 6) / 8)
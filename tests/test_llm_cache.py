@@ -0,0 +1,82 @@
+import time
+import pytest
+from src.llm_cache import LLMCache
+from src.llm_client import LLMClient, LLMRequest
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm_cache.sqlite"), max_entries=3, max_age_days=1)
+    yield cache
+    cache.connection.close()
+
+def test_cache_key_depends_on_every_field():
+    base = LLMRequest(prompt="p", system_prompt="s", max_tokens=10, template_version="1")
+    variants = [
+        LLMRequest(prompt="p2", system_prompt="s", max_tokens=10, template_version="1"),
+        LLMRequest(prompt="p", system_prompt="s", max_tokens=11, template_version="1"),
+        LLMRequest(prompt="p", system_prompt="s", max_tokens=10, temperature=0.2, template_version="1"),
+        LLMRequest(prompt="p", system_prompt="s", max_tokens=10, template_version="2"),
+        LLMRequest(prompt="p", system_prompt="s", max_tokens=10, model="other", template_version="1"),
+        LLMRequest(prompt="p", system_prompt="s", max_tokens=10, template_version="1", response_format="json_object"),
+    ]
+    assert base.cache_key() == LLMRequest(prompt="p", system_prompt="s", max_tokens=10, template_version="1").cache_key()
+    assert len({base.cache_key()} | {variant.cache_key() for variant in variants}) == 7
+
+def test_cache_hits_misses_and_persistence(cache, tmp_path):
+    assert cache.get("a") is None
+    cache.put("a", "response")
+    assert cache.get("a") == "response"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    reopened = LLMCache(str(tmp_path / "llm_cache.sqlite"))
+    assert reopened.get("a") == "response"
+    reopened.close()
+
+def test_cache_evicts_by_size_and_age(cache):
+    for key in ["a", "b", "c"]:
+        cache.put(key, key)
+        time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    # Going over the size limit evicts the least recently used entry right away
+    cache.put("d", "d")
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    cache.put("d", "updated")
+    assert len(cache) == 3 and cache.get("c") == "c"
+
+    cache.connection.execute("UPDATE responses SET created_at = ? WHERE key = 'c'", (time.time() - 2 * 86400,))
+    assert cache.get("c") is None
+    assert cache.evict() == 1
+    assert len(cache) == 2
+
+def test_client_serves_repeated_requests_from_cache(cache):
+    calls = []
+
+    async def transport(request):
+        calls.append(request.prompt)
+        return f"response to {request.prompt}"
+
+    client = LLMClient(transport, requests_per_minute=10000, tokens_per_minute=10**7, cache=cache)
+    requests = [LLMRequest(prompt=f"prompt {i}", system_prompt="system", max_tokens=10) for i in range(3)]
+
+    first = client.complete_many(requests)
+    second = client.complete_many(requests[:2] + [LLMRequest(prompt="prompt 3", system_prompt="system", max_tokens=10)])
+
+    assert second[:2] == first[:2]
+    assert calls == ["prompt 0", "prompt 1", "prompt 2", "prompt 3"]
+
+def test_client_deduplicates_identical_requests_in_a_batch(cache):
+    calls = []
+
+    async def transport(request):
+        calls.append(request.prompt)
+        return f"response to {request.prompt}"
+
+    client = LLMClient(transport, requests_per_minute=10000, tokens_per_minute=10**7, cache=cache)
+    requests = [LLMRequest(prompt=f"prompt {i % 2}", system_prompt="system", max_tokens=10) for i in range(6)]
+
+    assert client.complete_many(requests) == [f"response to prompt {i % 2}" for i in range(6)]
+    assert calls == ["prompt 0", "prompt 1"]
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+import openai
+from src.llm_client import LLMClient, LLMRequest, RateLimiter
+
+class FakeTransport:
+    def __init__(self, failures: int = 0, delay: float = 0.01):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: LLMRequest) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures > 0:
+                self.failures -= 1
+                raise openai.error.RateLimitError("rate limited")
+            return f"response to {request.prompt}"
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def requests():
+    return [LLMRequest(prompt=f"prompt {i}", system_prompt="system", max_tokens=10) for i in range(20)]
+
+def test_complete_many_preserves_order_and_bounds_concurrency(requests):
+    transport = FakeTransport()
+    client = LLMClient(transport, max_concurrency=4, requests_per_minute=10000, tokens_per_minute=10**7)
+
+    results = client.complete_many(requests)
+
+    assert results == [f"response to prompt {i}" for i in range(20)]
+    assert transport.max_in_flight == 4
+
+def test_complete_retries_retryable_errors():
+    transport = FakeTransport(failures=2)
+    client = LLMClient(transport, requests_per_minute=10000, tokens_per_minute=10**7, max_retries=3, retry_base_delay=0.001)
+
+    assert client.complete(LLMRequest(prompt="x", system_prompt="system", max_tokens=10)) == "response to x"
+    assert transport.calls == 3
+
+def test_complete_raises_after_max_retries():
+    transport = FakeTransport(failures=5)
+    client = LLMClient(transport, requests_per_minute=10000, tokens_per_minute=10**7, max_retries=1, retry_base_delay=0.001)
+
+    with pytest.raises(openai.error.RateLimitError):
+        client.complete(LLMRequest(prompt="x", system_prompt="system", max_tokens=10))
+    assert transport.calls == 2
+
+def test_rate_limiter_delays_once_budget_is_spent():
+    now = [0.0]
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000, clock=lambda: now[0])
+
+    delays = [limiter.reserve(10) for _ in range(62)]
+
+    assert delays[:60] == [0.0] * 60
+    assert delays[60] == pytest.approx(1.0)
+    assert delays[61] == pytest.approx(2.0)
+    now[0] = 5.0
+    assert limiter.reserve(10) == 0.0
+
+def test_complete_many_returns_per_request_errors(requests):
+    async def transport(request: LLMRequest) -> str:
+        if request.prompt == "prompt 3":
+            raise openai.error.RateLimitError("rate limited")
+        return f"response to {request.prompt}"
+    client = LLMClient(transport, requests_per_minute=10000, tokens_per_minute=10**7, max_retries=1, retry_base_delay=0.001)
+
+    results = client.complete_many(requests, return_exceptions=True)
+
+    assert isinstance(results[3], openai.error.RateLimitError)
+    assert results[:3] + results[4:] == [f"response to prompt {i}" for i in range(20) if i != 3]
+    with pytest.raises(openai.error.RateLimitError):
+        client.complete_many(requests)
+
+def test_complete_many_inside_running_event_loop(requests):
+    client = LLMClient(FakeTransport(), requests_per_minute=10000, tokens_per_minute=10**7)
+
+    async def caller():
+        return client.complete_many(requests[:3])
+
+    assert asyncio.run(caller()) == [f"response to prompt {i}" for i in range(3)]
+
@@ -0,0 +1,59 @@
+import json
+import pytest
+from src.llm_parsing import parse_json_response, parse_interaction_response, parse_risk_assessment, parse_sections
+
+@pytest.fixture
+def risk_assessment_json():
+    return json.dumps({
+        "likelihood_and_impact_changes": "Both rise under this scenario.",
+        "financial_implications": "Costs increase by 5% of revenue.",
+        "mitigation_strategies": ["Hedge carbon exposure", "Relocate suppliers"],
+        "impact_score": 0.8,
+        "likelihood_score": 0.6,
+        "adaptability_score": 0.3
+    })
+
+def test_parse_json_response_handles_fences_and_surrounding_text():
+    assert parse_json_response('{"a": 1}') == {"a": 1}
+    assert parse_json_response('```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json_response('Here is the result:\n{"a": {"b": 2}}\nThanks.') == {"a": {"b": 2}}
+    assert parse_json_response("no json here") is None
+
+def test_parse_interaction_response_json_and_legacy_text():
+    structured = parse_interaction_response('{"interaction_explanation": "Linked via suppliers", "interaction_score": {"score": 0.72, "justification": "2 shared suppliers"}}')
+    assert structured.score == pytest.approx(0.72)
+    assert structured.explanation == "Linked via suppliers"
+
+    legacy = parse_interaction_response("These risks compound each other in 2 ways.\nSuggested interaction score: 0.65")
+    assert legacy.score == pytest.approx(0.65)
+
+def test_parse_risk_assessment_json(risk_assessment_json):
+    assessment = parse_risk_assessment(risk_assessment_json)
+
+    assert (assessment.impact, assessment.likelihood, assessment.adaptability) == (0.8, 0.6, 0.3)
+    assert assessment.sections["financial_implications"] == "Costs increase by 5% of revenue."
+    assert json.loads(assessment.sections["mitigation_strategies"]) == ["Hedge carbon exposure", "Relocate suppliers"]
+    assert "impact_score" not in assessment.sections
+
+def test_parse_risk_assessment_legacy_text():
+    content = ("Overview of the risk in 2030\n\nImpact: 0.7 under this scenario\n\n"
+               "Likelihood: rises to 0.4\n\nAdaptability is limited\n\nCosts of 12 million")
+    assessment = parse_risk_assessment(content)
+
+    assert assessment.impact == pytest.approx(0.7)
+    assert assessment.likelihood == pytest.approx(0.4)
+    assert assessment.adaptability == 0.5  # Numbers on later lines are not attributed to the label
+    assert parse_sections(content)["impact"] == "0.7 under this scenario"
+    assert parse_sections("Plain text without headings") == {"": "Plain text without headings"}
+
+def test_out_of_range_scores_fall_back_to_default():
+    # Valid JSON with a bad score never falls back to numbers in the text
+    assert parse_interaction_response('{"interaction_explanation": "x", "interaction_score": 7}').score == 0.5
+    assert parse_interaction_response("Score 0.6, based on 2023 data").score == pytest.approx(0.6)
+    assert parse_interaction_response("Based on 2023 data the link is strong").score == 0.5
+    assert parse_risk_assessment("Impact: 7/10").impact == 0.5
+
+    partial = parse_risk_assessment('{"impact_score": 0.9, "likelihood_score": 4, "summary": "Likelihood: 0.2"}')
+    assert (partial.impact, partial.likelihood, partial.adaptability) == (0.9, 0.5, 0.5)
+    assert partial.sections == {"summary": "Likelihood: 0.2"}
+
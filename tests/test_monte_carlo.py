@@ -0,0 +1,132 @@
+import pytest
+import numpy as np
+from src.sensitivity_analysis.monte_carlo import perform_monte_carlo_simulations, calculate_risk_impact
+from src.sensitivity_analysis.simulation_store import SimulationStore, load_simulation_results
+from src.models import Risk, Scenario, SimulationResult
+
+@pytest.fixture
+def sample_risks():
+    return [
+        Risk(id=1, description="Physical Risk 1", category="Physical", likelihood=0.7, impact=0.8, subcategory="Acute", tertiary_category="", time_horizon="Short-term", industry_specific=False, sasb_category=""),
+        Risk(id=2, description="Transition Risk 1", category="Transition", likelihood=0.6, impact=0.5, subcategory="Policy", tertiary_category="", time_horizon="Medium-term", industry_specific=True, sasb_category="Energy"),
+        Risk(id=3, description="Market Risk 1", category="Market", likelihood=0.5, impact=0.3, subcategory="Demand", tertiary_category="", time_horizon="Long-term", industry_specific=False, sasb_category=""),
+    ]
+
+@pytest.fixture
+def sample_scenarios():
+    return {
+        "Net Zero 2050": Scenario(name="Net Zero 2050", temp_increase=1.5, carbon_price=250, renewable_energy=0.75, policy_stringency=0.9, biodiversity_loss=0.1, ecosystem_degradation=0.2, financial_stability=0.8, supply_chain_disruption=0.3),
+        "Delayed Transition": Scenario(name="Delayed Transition", temp_increase=2.5, carbon_price=125, renewable_energy=0.55, policy_stringency=0.6, biodiversity_loss=0.3, ecosystem_degradation=0.4, financial_stability=0.6, supply_chain_disruption=0.5),
+    }
+
+def test_perform_monte_carlo_simulations(sample_risks, sample_scenarios):
+    results = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=2000, seed=1)
+    
+    assert set(results) == set(sample_scenarios)
+    for scenario_name, scenario_results in results.items():
+        for risk in sample_risks:
+            sim_result = scenario_results[risk.id]
+            assert isinstance(sim_result, SimulationResult)
+            assert len(sim_result.impact_distribution) == 2000
+            assert np.all((sim_result.impact_distribution >= 0) & (sim_result.impact_distribution <= 1))
+            expected_impact = calculate_risk_impact(risk, sample_scenarios[scenario_name])
+            np.testing.assert_allclose(np.mean(sim_result.impact_distribution), expected_impact, rtol=0.1)
+
+def test_perform_monte_carlo_simulations_shared_draws(sample_risks, sample_scenarios):
+    independent = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=2000, seed=1)
+    shared = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=2000, seed=1, shared_draws=True)
+    
+    # Shared draws keep the marginals but make the risks move together
+    for scenario_name in sample_scenarios:
+        for risk in sample_risks:
+            np.testing.assert_allclose(np.mean(shared[scenario_name][risk.id].impact_distribution),
+                                       np.mean(independent[scenario_name][risk.id].impact_distribution), rtol=0.05)
+        shared_corr = np.corrcoef(shared[scenario_name][2].impact_distribution, shared[scenario_name][3].impact_distribution)[0, 1]
+        independent_corr = np.corrcoef(independent[scenario_name][2].impact_distribution, independent[scenario_name][3].impact_distribution)[0, 1]
+        assert shared_corr > 0.99
+        assert abs(independent_corr) < 0.1
+
+def test_perform_monte_carlo_simulations_worker_count_invariant(sample_risks, sample_scenarios):
+    serial = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=2500, seed=11, shard_size=1000)
+    parallel = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=2500, seed=11, shard_size=1000, workers=2)
+    
+    for scenario_name in sample_scenarios:
+        for risk in sample_risks:
+            np.testing.assert_array_equal(serial[scenario_name][risk.id].impact_distribution,
+                                          parallel[scenario_name][risk.id].impact_distribution)
+            np.testing.assert_array_equal(serial[scenario_name][risk.id].likelihood_distribution,
+                                          parallel[scenario_name][risk.id].likelihood_distribution)
+
+def test_perform_monte_carlo_simulations_memory_mapped_store(sample_risks, sample_scenarios, tmp_path):
+    in_memory = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=1500, seed=4)
+    stored = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=1500, seed=4, store_dir=str(tmp_path))
+    reloaded = load_simulation_results(str(tmp_path))
+    
+    assert set(reloaded) == set(sample_scenarios)
+    for scenario_name in sample_scenarios:
+        for risk in sample_risks:
+            distribution = reloaded[scenario_name][risk.id].impact_distribution
+            assert isinstance(stored[scenario_name][risk.id].impact_distribution, np.memmap)
+            assert isinstance(distribution, np.memmap)
+            np.testing.assert_array_equal(distribution, in_memory[scenario_name][risk.id].impact_distribution)
+            np.testing.assert_array_equal(reloaded[scenario_name][risk.id].likelihood_distribution,
+                                          in_memory[scenario_name][risk.id].likelihood_distribution)
+
+def test_load_simulation_results_missing_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_simulation_results(str(tmp_path / "missing"))
+
+def test_simulation_store_keeps_committed_data_until_next_commit(tmp_path):
+    store = SimulationStore(str(tmp_path))
+    for scenario_name, value in (("Net Zero", 0.1), ("net-zero", 0.2)):
+        impacts, likelihoods = store.allocate(scenario_name, 2, 4)
+        impacts[:], likelihoods[:] = value, value
+        store.commit(scenario_name, [1, 2], impacts, likelihoods)
+
+    # An interrupted rewrite leaves the committed distributions untouched
+    impacts, likelihoods = SimulationStore(str(tmp_path)).allocate("Net Zero", 2, 4)
+    impacts[:] = 0.9
+    del impacts, likelihoods
+
+    reloaded = load_simulation_results(str(tmp_path))
+    np.testing.assert_array_equal(reloaded["Net Zero"][1].impact_distribution, 0.1)
+    np.testing.assert_array_equal(reloaded["net-zero"][2].impact_distribution, 0.2)
+
+def test_streaming_rejects_simulation_store(sample_risks, sample_scenarios, tmp_path):
+    with pytest.raises(ValueError):
+        perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=100, streaming=True, store_dir=str(tmp_path))
+
+
+def test_committed_distributions_are_read_only(tmp_path):
+    store = SimulationStore(str(tmp_path))
+    impacts, likelihoods = store.allocate("Net Zero", 2, 4)
+    impacts[:], likelihoods[:] = 0.1, 0.2
+    impacts, _ = store.commit("Net Zero", [1, 2], impacts, likelihoods)
+    with pytest.raises(ValueError):
+        impacts[0] *= 2
+    np.testing.assert_array_equal(load_simulation_results(str(tmp_path))["Net Zero"][1].impact_distribution, 0.1)
+
+def test_load_simulation_results_rejects_stale_store(sample_risks, sample_scenarios, tmp_path):
+    stale = {"Old scenario": sample_scenarios[next(iter(sample_scenarios))]}
+    perform_monte_carlo_simulations(sample_risks, stale, num_simulations=100, seed=1, store_dir=str(tmp_path))
+    perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=100, seed=1, store_dir=str(tmp_path))
+    risk_ids = [risk.id for risk in sample_risks]
+
+    # Scenarios from the earlier run are dropped when the store is rewritten
+    assert set(load_simulation_results(str(tmp_path))) == set(sample_scenarios)
+    assert set(load_simulation_results(str(tmp_path), risk_ids, list(sample_scenarios), 100)) == set(sample_scenarios)
+    with pytest.raises(ValueError, match="other risks"):
+        load_simulation_results(str(tmp_path), risk_ids + [99], list(sample_scenarios), 100)
+    with pytest.raises(ValueError, match="expected 200"):
+        load_simulation_results(str(tmp_path), risk_ids, list(sample_scenarios), 200)
+    with pytest.raises(ValueError, match="not stored: New scenario"):
+        load_simulation_results(str(tmp_path), risk_ids, list(sample_scenarios) + ["New scenario"], 100)
+    with pytest.raises(ValueError, match="without shared draws"):
+        load_simulation_results(str(tmp_path), risk_ids, list(sample_scenarios), 100, shared_draws=True)
+
+def test_shared_draws_recorded_on_results_and_store(sample_risks, sample_scenarios, tmp_path):
+    stored = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=100, seed=1, shared_draws=True, store_dir=str(tmp_path))
+    streamed = perform_monte_carlo_simulations(sample_risks, sample_scenarios, num_simulations=100, seed=1, shared_draws=True, streaming=True)
+    reloaded = load_simulation_results(str(tmp_path), shared_draws=True)
+    for results in (stored, streamed, reloaded):
+        assert all(result.shared_draws for scenario in results.values() for result in scenario.values())
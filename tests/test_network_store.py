@@ -0,0 +1,158 @@
+import pytest
+import networkx as nx
+import numpy as np
+from src.models import Risk, RiskInteraction, NetworkDelta, ExternalData
+from src.risk_analysis import network_store
+from src.risk_analysis.network_store import RiskNetworkStore, load_risk_network_store
+from src.risk_analysis.interaction_analysis import build_risk_network
+from src.risk_analysis.cascade_engine import get_cascade_index
+from src.risk_analysis.systemic_risk_analysis import identify_trigger_points
+
+@pytest.fixture
+def store_register():
+    rng = np.random.default_rng(0)
+    risks = [Risk(id=i, description=f"Risk {i}", category="Physical" if i % 2 else "Transition", subcategory="", tertiary_category="",
+                  likelihood=0.5, impact=0.5, time_horizon="Medium", industry_specific=False, sasb_category="") for i in range(1, 31)]
+    # Three loosely coupled groups bridged into one component, plus an isolated risk
+    interactions = [RiskInteraction(i, j, float(rng.uniform(0.2, 1.0)), "compound")
+                    for i in range(1, 30) for j in range(i + 1, 30) if (i - 1) // 10 == (j - 1) // 10 and rng.random() < 0.4]
+    interactions += [RiskInteraction(5, 15, 0.3, "compound"), RiskInteraction(15, 25, 0.3, "compound")]
+    return risks, interactions
+
+def assert_matches_full_rebuild(store, risks, interactions):
+    G = build_risk_network(risks, interactions)
+    centrality = store.centrality()
+    expected = nx.betweenness_centrality(G, weight='weight')
+    np.testing.assert_allclose([centrality["betweenness"][node] for node in G], [expected[node] for node in G], atol=1e-12)
+    np.testing.assert_allclose([centrality["pagerank"][node] for node in G], [nx.pagerank(G)[node] for node in G], atol=1e-6)
+    assert set(store.clusters()) == set(G.nodes())
+
+def count_recomputed_sources(monkeypatch):
+    recomputed = []
+    dependencies = network_store.source_dependencies
+    monkeypatch.setattr(network_store, "source_dependencies", lambda G, source: recomputed.append(source) or dependencies(G, source))
+    return recomputed
+
+def test_deltas_recompute_only_affected_sources(store_register, monkeypatch):
+    risks, interactions = store_register
+    store = RiskNetworkStore.build(risks, interactions)
+    assert_matches_full_rebuild(store, risks, interactions)
+    assert all(not data for _, data in store.graph.nodes(data=True))
+    version = store.topology_version
+
+    store.upsert_risk(risks[0].copy(update={"description": "Edited"}))
+    assert store.topology_version == version and not store.dirty_nodes
+
+    # A long edge inside one component lies on no shortest path, so no source is recomputed
+    recomputed = count_recomputed_sources(monkeypatch)
+    detour = RiskInteraction(21, 29, 10.0, "compound")
+    store.apply_delta(NetworkDelta(upserted_interactions=[detour]))
+    assert store.dirty_nodes == {21, 29}
+    store.refresh()
+    assert recomputed == []
+    assert_matches_full_rebuild(store, risks, interactions + [detour])
+
+    shortcut = RiskInteraction(1, 29, 0.05, "compound")
+    store.apply_delta(NetworkDelta(upserted_interactions=[shortcut]))
+    store.refresh()
+    assert 0 < len(recomputed) < 2 * len(risks)
+    assert_matches_full_rebuild(store, risks, interactions + [detour, shortcut])
+
+    store.remove_risk(15)
+    remaining = [risk for risk in risks if risk.id != 15]
+    kept = [i for i in interactions + [detour, shortcut] if 15 not in (i.risk1_id, i.risk2_id)]
+    assert_matches_full_rebuild(store, remaining, kept)
+
+def test_random_deltas_match_full_rebuild(store_register):
+    risks, interactions = store_register
+    rng = np.random.default_rng(1)
+    store = RiskNetworkStore.build(risks, interactions)
+    store.refresh()
+    current = {frozenset((i.risk1_id, i.risk2_id)): i for i in interactions}
+    for _ in range(10):
+        u, v = (int(node) for node in rng.choice(np.arange(1, 31), size=2, replace=False))
+        key = frozenset((u, v))
+        if key in current and rng.random() < 0.5:
+            del current[key]
+            store.remove_interaction(u, v)
+        else:
+            current[key] = RiskInteraction(u, v, float(rng.uniform(0.1, 1.0)), "compound")
+            store.upsert_interaction(current[key])
+        assert_matches_full_rebuild(store, risks, list(current.values()))
+
+def test_communities_away_from_edits_are_kept(store_register):
+    risks, interactions = store_register
+    store = RiskNetworkStore.build(risks, interactions)
+    store.refresh()
+    before = [set(community) for community in store._communities]
+    store.upsert_interaction(RiskInteraction(21, 29, 0.9, "compound"))
+    store.refresh()
+    untouched = [community for community in before if not community & ({21, 29} | set(store.graph[21]) | set(store.graph[29]))]
+    assert untouched and all(community in store._communities for community in untouched)
+
+def test_sampled_betweenness_updates_the_same_pivots(store_register):
+    risks, interactions = store_register
+    store = RiskNetworkStore.build(risks, interactions, betweenness_samples=8)
+    store.refresh()
+    pivots = set(store._sources)
+    assert len(pivots) == 8 and store.betweenness_error_bound() > 0
+    store.upsert_interaction(RiskInteraction(1, 29, 0.05, "compound"))
+
+    G = store.graph
+    n = G.number_of_nodes()
+    # k-pivot estimate: dependencies summed over the pivots, scaled by n/k
+    expected = nx.betweenness_centrality_subset(G, sources=list(pivots), targets=list(G), normalized=False, weight='weight')
+    centrality = store.centrality()["betweenness"]
+    assert store._sources == pivots
+    np.testing.assert_allclose([centrality[node] for node in G], [2 * expected[node] * n / 8 / ((n - 1) * (n - 2)) for node in G],
+                               atol=1e-12)
+
+def test_cascades_recomputed_only_where_edits_reach(store_register, monkeypatch, tmp_path):
+    risks, interactions = store_register
+    store = RiskNetworkStore.build(risks, interactions)
+    seeds = [risk.id for risk in risks]
+    before = store.cascades(seeds)
+
+    simulated = []
+    run_cascades = network_store.run_cascades
+    monkeypatch.setattr(network_store, "run_cascades", lambda G, seed_sets, *args: simulated.extend(seed_sets) or run_cascades(G, seed_sets, *args))
+    assert store.cascades(seeds) == before and simulated == []
+
+    store.upsert_interaction(RiskInteraction(21, 29, 0.9, "compound"))
+    after = store.cascades(seeds)
+    # Cascades that never activated 21 or 29 are reused as they were
+    reused = [seed for seed in seeds if seed not in (21, 29) and not {21, 29} & set(before[seed])]
+    assert reused and sorted(seed for [seed] in simulated) == sorted(set(seeds) - set(reused))
+    expected = get_cascade_index(store.graph)
+    assert after == {seed: expected.activated(seed) for seed in seeds}
+    external_data = {"2020": ExternalData(year=2020, gdp_growth=2.0, population=8 * 10**9, energy_demand=1.0, carbon_price=50.0,
+                                          renewable_energy_share=0.3, biodiversity_index=0.8, deforestation_rate=0.1)}
+    assert store.trigger_points(risks, external_data) == identify_trigger_points(risks, store.graph, external_data,
+                                                                                 centrality=store.centrality()["betweenness"])
+
+    # Cached cascades travel with the snapshot
+    path = str(tmp_path / "network.json")
+    store.save(path)
+    simulated.clear()
+    assert load_risk_network_store(path, risks, interactions + [RiskInteraction(21, 29, 0.9, "compound")]).cascades(seeds) == after
+    assert simulated == []
+
+def test_snapshot_starts_warm_and_syncs_changes(store_register, tmp_path, monkeypatch):
+    risks, interactions = store_register
+    path = str(tmp_path / "network.json")
+    RiskNetworkStore.build(risks, interactions).save(path)
+
+    warm = load_risk_network_store(path, risks, interactions)
+    assert not warm.dirty_nodes
+    assert warm.clusters() == RiskNetworkStore.build(risks, interactions).clusters()
+
+    changed = interactions[1:] + [RiskInteraction(1, 30, 0.8, "compound")]
+    synced = load_risk_network_store(path, risks, changed)
+    first = interactions[0]
+    assert synced.dirty_nodes == {first.risk1_id, first.risk2_id, 1, 30}
+    assert_matches_full_rebuild(synced, risks, changed)
+
+    # A snapshot written with other sampling settings is recomputed rather than trusted
+    recomputed = count_recomputed_sources(monkeypatch)
+    resampled = load_risk_network_store(path, risks, interactions, betweenness_samples=8)
+    assert resampled.betweenness_error_bound() > 0 and len(recomputed) == 8
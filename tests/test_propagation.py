@@ -0,0 +1,92 @@
+import pytest
+import numpy as np
+from scipy import sparse
+from src.risk_analysis.propagation import (propagate_risk_levels, propagate_to_steady_state, simulate_aggregate_impacts,
+                                           prepare_interaction_matrix)
+
+@pytest.fixture
+def interaction_matrix():
+    rng = np.random.default_rng(1)
+    matrix = rng.random((6, 6)) * 0.3
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+def legacy_propagation(risk_levels, interaction_matrix):
+    for _ in range(10):
+        influence = interaction_matrix @ risk_levels
+        risk_levels = np.clip(risk_levels + 0.1 * influence, 0, 1)
+    return risk_levels
+
+def test_propagate_risk_levels_matches_legacy_loop(interaction_matrix):
+    levels = np.random.default_rng(2).random((50, 6))
+
+    propagated = propagate_risk_levels(levels, interaction_matrix)
+
+    expected = np.array([legacy_propagation(row, interaction_matrix) for row in levels])
+    np.testing.assert_allclose(propagated, expected, rtol=1e-12)
+
+def test_simulate_aggregate_impacts_chunking_and_dtype(interaction_matrix):
+    base_impacts = np.linspace(0.2, 0.9, 6)
+
+    whole, iterations = simulate_aggregate_impacts(base_impacts, interaction_matrix, 1000, np.random.default_rng(3), chunk_size=1000)
+    chunked, _ = simulate_aggregate_impacts(base_impacts, interaction_matrix, 1000, np.random.default_rng(3), chunk_size=64)
+    single, _ = simulate_aggregate_impacts(base_impacts, interaction_matrix, 1000, np.random.default_rng(3), dtype=np.float32)
+
+    assert whole.shape == (1000,)
+    assert iterations == 10
+    assert np.all((whole >= 0) & (whole <= 6))
+    assert single.dtype == np.float32
+    np.testing.assert_allclose(single, whole, rtol=1e-4)
+    # Chunks consume the generator in order, so chunking does not change the draws
+    np.testing.assert_allclose(chunked, whole)
+
+
+def test_sparse_propagation_matches_dense(interaction_matrix):
+    levels = np.random.default_rng(4).random((20, 6))
+    pruned = np.where(interaction_matrix < 0.15, 0, interaction_matrix)
+
+    np.testing.assert_allclose(propagate_risk_levels(levels, sparse.csr_matrix(pruned)),
+                               propagate_risk_levels(levels, pruned), rtol=1e-12)
+    single, _ = simulate_aggregate_impacts(np.full(6, 0.5), sparse.csr_matrix(pruned), 100, np.random.default_rng(5), dtype=np.float32)
+    assert single.dtype == np.float32
+
+def test_prepare_interaction_matrix_selects_representation(interaction_matrix):
+    assert isinstance(prepare_interaction_matrix(interaction_matrix), np.ndarray)
+
+    chain = np.diag(np.full(19, 0.5), k=1)
+    prepared = prepare_interaction_matrix(chain)
+    assert sparse.issparse(prepared) and prepared.nnz == 19
+
+    # Dropping weak links can push a dense matrix below the density threshold
+    thresholded = prepare_interaction_matrix(interaction_matrix, weak_link_threshold=0.29)
+    assert sparse.issparse(thresholded)
+    assert np.all(np.abs(thresholded.data) >= 0.29)
+
+def test_steady_state_stops_within_tolerance(interaction_matrix):
+    levels = np.random.default_rng(6).random((20, 6)) * 0.3
+    damped = 0.3 * interaction_matrix - 0.8 * np.eye(6)
+
+    for matrix in (interaction_matrix, damped):
+        steady, iterations = propagate_to_steady_state(levels, matrix, tolerance=1e-8)
+        np.testing.assert_allclose(steady, propagate_risk_levels(levels, matrix, num_steps=iterations))
+        # One more step moves no level by more than the tolerance
+        assert np.abs(propagate_risk_levels(steady, matrix, num_steps=1) - steady).max() < 1e-7
+
+    # Growing networks saturate; decaying ones die out
+    np.testing.assert_allclose(propagate_to_steady_state(levels, interaction_matrix)[0], 1.0)
+    np.testing.assert_allclose(propagate_to_steady_state(levels, damped, tolerance=1e-10)[0], 0.0, atol=1e-8)
+
+def test_steady_state_reports_iterations_and_respects_cap(interaction_matrix):
+    level, iterations = propagate_to_steady_state(np.full(6, 0.2), interaction_matrix, max_steps=5)
+    assert level.shape == (6,)
+    assert iterations == 5
+
+    _, converged = propagate_to_steady_state(np.zeros(6), interaction_matrix)
+    assert converged == 1
+
+def test_steady_state_trajectory_records_each_step(interaction_matrix):
+    trajectory = []
+    final, iterations = propagate_to_steady_state(np.full(6, 0.2), interaction_matrix, max_steps=7, trajectory=trajectory)
+    assert len(trajectory) == iterations == 7
+    np.testing.assert_array_equal(trajectory[-1], final)
+    np.testing.assert_allclose(trajectory[2], propagate_risk_levels(np.full(6, 0.2), interaction_matrix, num_steps=3))
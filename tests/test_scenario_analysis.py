@@ -2,9 +2,11 @@ import pytest
 import numpy as np
 from src.risk_analysis.scenario_analysis import (
     simulate_scenario_impact, monte_carlo_simulation, analyze_scenario_sensitivity,
-    calculate_var_cvar, perform_stress_testing, generate_scenario_narratives
+    calculate_var_cvar, perform_stress_testing, generate_scenario_narratives,
+    calculate_risk_impact, calculate_portfolio_aggregates
 )
-from src.models import Risk, ExternalData, Scenario, SimulationResult
+from src.models import Risk, ExternalData, Scenario, SimulationResult, SimulationSummary
+from src.llm_client import LLMClient, set_llm_client
 
 @pytest.fixture
 def sample_risks():
@@ -59,6 +61,92 @@ def test_monte_carlo_simulation(sample_risks, sample_external_data, sample_scena
     delayed_transition_impacts = np.mean([np.mean(sim.impact_distribution) for sim in results["Delayed Transition"].values()])
     assert net_zero_impacts < delayed_transition_impacts
 
+def test_monte_carlo_simulation_vectorized(sample_risks, sample_external_data, sample_scenarios):
+    results = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=500, seed=42, dtype=np.float32)
+    
+    for scenario_name, scenario_results in results.items():
+        for risk in sample_risks:
+            impacts = scenario_results[risk.id].impact_distribution
+            assert isinstance(impacts, np.ndarray)
+            assert impacts.dtype == np.float32
+            assert impacts.shape == (500,)
+            assert np.all((impacts >= 0) & (impacts <= 1))
+            
+            # The perturbation is centred on the scenario, so the mean should track the unperturbed impact
+            expected_impact = calculate_risk_impact(risk, sample_external_data, sample_scenarios[scenario_name])
+            np.testing.assert_allclose(np.mean(impacts), expected_impact, rtol=0.1)
+    
+    # Same seed reproduces the same draws
+    repeated = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=500, seed=42, dtype=np.float32)
+    for scenario_name in sample_scenarios:
+        for risk in sample_risks:
+            np.testing.assert_array_equal(results[scenario_name][risk.id].impact_distribution,
+                                          repeated[scenario_name][risk.id].impact_distribution)
+
+def test_monte_carlo_simulation_shared_draws(sample_risks, sample_external_data, sample_scenarios):
+    results = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=500, seed=7, shared_draws=True)
+    
+    # Every risk sees the same world-state per simulation, so the risk multipliers coincide draw for draw
+    for scenario_results in results.values():
+        ratios = [scenario_results[risk.id].impact_distribution / risk.impact for risk in sample_risks]
+        for ratio in ratios[1:]:
+            np.testing.assert_allclose(ratio, ratios[0])
+    
+    portfolio = calculate_portfolio_aggregates(results)
+    for scenario_name, aggregates in portfolio.items():
+        total_impact = sum(np.mean(result.impact_distribution) for result in results[scenario_name].values())
+        assert aggregates["mean_total_impact"] == pytest.approx(total_impact)
+        assert aggregates["total_impact_CVaR"] >= aggregates["total_impact_VaR"]
+        # Perfectly correlated risks breach their tails together
+        assert aggregates["joint_tail_probability"] == pytest.approx(0.05, abs=0.01)
+
+def test_portfolio_aggregates_use_upper_tail_and_accept_summaries(sample_risks, sample_external_data, sample_scenarios):
+    full = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=2000, seed=9, shared_draws=True)
+    streamed = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=2000, seed=9, shared_draws=True, streaming=True)
+
+    full_portfolio = calculate_portfolio_aggregates(full)
+    streamed_portfolio = calculate_portfolio_aggregates(streamed)
+    for scenario_name, aggregates in full_portfolio.items():
+        # VaR and CVaR sit in the same upper 5% tail as the joint-tail metric
+        total = sum(result.impact_distribution for result in full[scenario_name].values())
+        assert aggregates["total_impact_VaR"] == pytest.approx(np.percentile(total, 95))
+        assert aggregates["total_impact_CVaR"] == pytest.approx(np.mean(total[total >= np.percentile(total, 95)]))
+        assert aggregates["total_impact_CVaR"] >= aggregates["total_impact_VaR"] >= aggregates["mean_total_impact"]
+        for key, value in aggregates.items():
+            assert streamed_portfolio[scenario_name][key] == pytest.approx(value, abs=1e-2)
+
+def test_portfolio_aggregates_reject_independent_draws(sample_risks, sample_external_data, sample_scenarios):
+    for streaming in (False, True):
+        results = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=200, seed=9, streaming=streaming)
+        with pytest.raises(ValueError, match="shared draws"):
+            calculate_portfolio_aggregates(results)
+
+def test_monte_carlo_simulation_parallel_is_reproducible(sample_risks, sample_external_data, sample_scenarios):
+    serial = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=300, seed=3, shard_size=128)
+    parallel = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=300, seed=3, shard_size=128, workers=3)
+    
+    for scenario_name in sample_scenarios:
+        for risk in sample_risks:
+            np.testing.assert_array_equal(serial[scenario_name][risk.id].impact_distribution,
+                                          parallel[scenario_name][risk.id].impact_distribution)
+
+def test_monte_carlo_simulation_streaming(sample_risks, sample_external_data, sample_scenarios):
+    full = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=2000, seed=5)
+    streamed = monte_carlo_simulation(sample_risks, sample_external_data, sample_scenarios, num_simulations=2000, seed=5, streaming=True)
+    
+    full_var_cvar = calculate_var_cvar(full)
+    streamed_var_cvar = calculate_var_cvar(streamed)
+    for scenario_name in sample_scenarios:
+        for risk in sample_risks:
+            summary = streamed[scenario_name][risk.id]
+            assert isinstance(summary, SimulationSummary)
+            assert summary.impact.count == 2000
+            # Same seed and shard plan, so the streamed samples are exactly the materialized ones
+            assert summary.impact.mean == pytest.approx(np.mean(full[scenario_name][risk.id].impact_distribution))
+            assert summary.likelihood.variance == pytest.approx(np.var(full[scenario_name][risk.id].likelihood_distribution))
+            for key in ("VaR", "CVaR"):
+                assert streamed_var_cvar[scenario_name][risk.id][key] == pytest.approx(full_var_cvar[scenario_name][risk.id][key], abs=2e-3)
+
 def test_analyze_scenario_sensitivity(sample_risks, sample_scenarios):
     scenario = sample_scenarios["Net Zero 2050"]
     sensitivity_result = analyze_scenario_sensitivity(sample_risks, scenario, "carbon_price", 0.2)
@@ -113,7 +201,17 @@ def test_perform_stress_testing(sample_risks, sample_external_data, sample_scena
         for risk_id in original_impacts:
             assert stressed_impacts_dict[risk_id] > original_impacts[risk_id]
 
-def test_generate_scenario_narratives(sample_scenarios):
+@pytest.fixture
+def echo_llm_client():
+    # Offline transport: the "narrative" is the prompt itself, which names the scenario and its parameters
+    async def transport(request):
+        return request.prompt
+
+    set_llm_client(LLMClient(transport, requests_per_minute=10000, tokens_per_minute=10**7))
+    yield
+    set_llm_client(None)
+
+def test_generate_scenario_narratives(sample_scenarios, echo_llm_client):
     narratives = generate_scenario_narratives(sample_scenarios)
     
     assert len(narratives) == len(sample_scenarios)
@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+from src.sensitivity_analysis.streaming_stats import (
+    StreamingDistribution, histogram_percentile, histogram_var_cvar, describe_simulation_result
+)
+from src.models import SimulationResult, SimulationSummary
+
+@pytest.fixture
+def sample_distributions():
+    rng = np.random.default_rng(0)
+    return np.clip(np.stack([rng.normal(0.5, 0.1, 5000), rng.beta(2, 5, 5000)]), 0, 1)
+
+def test_streaming_distribution_matches_exact_statistics(sample_distributions):
+    accumulator = StreamingDistribution(2, num_bins=1000)
+    for block in np.array_split(sample_distributions, 7, axis=1):
+        accumulator.update(block)
+    
+    assert accumulator.count == 5000
+    np.testing.assert_allclose(accumulator.mean, sample_distributions.mean(axis=1))
+    np.testing.assert_allclose(accumulator.m2 / accumulator.count, sample_distributions.var(axis=1))
+    for i, samples in enumerate(sample_distributions):
+        histogram = accumulator.summary(i).histogram
+        for q in (5, 50, 95):
+            assert histogram_percentile(histogram, q) == pytest.approx(np.percentile(samples, q), abs=2e-3)
+        var, cvar = histogram_var_cvar(histogram, 0.95)
+        exact_var = np.percentile(samples, 5)
+        assert var == pytest.approx(exact_var, abs=2e-3)
+        assert cvar == pytest.approx(np.mean(samples[samples > exact_var]), abs=2e-3)
+
+def test_streaming_distribution_merge(sample_distributions):
+    whole = StreamingDistribution(2)
+    whole.update(sample_distributions)
+    left, right = StreamingDistribution(2), StreamingDistribution(2)
+    left.update(sample_distributions[:, :1234])
+    right.update(sample_distributions[:, 1234:])
+    left.merge(right)
+    
+    np.testing.assert_allclose(left.mean, whole.mean)
+    np.testing.assert_allclose(left.m2, whole.m2)
+    np.testing.assert_array_equal(left.histogram, whole.histogram)
+
+def test_describe_simulation_result(sample_distributions):
+    full = SimulationResult(1, "Scenario1", sample_distributions[0], sample_distributions[1])
+    accumulator_impact, accumulator_likelihood = StreamingDistribution(1), StreamingDistribution(1)
+    accumulator_impact.update(sample_distributions[:1])
+    accumulator_likelihood.update(sample_distributions[1:])
+    summary = SimulationSummary(1, "Scenario1", accumulator_impact.summary(0), accumulator_likelihood.summary(0))
+    
+    exact = describe_simulation_result(full)
+    streamed = describe_simulation_result(summary)
+    assert set(exact) == set(streamed)
+    for key in exact:
+        assert streamed[key] == pytest.approx(exact[key], abs=2e-3)
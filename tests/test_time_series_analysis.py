@@ -2,7 +2,9 @@ import pytest
 import numpy as np
 from src.risk_analysis.time_series_analysis import (
     time_series_analysis, project_risk_impact_arima, analyze_impact_trends,
-    identify_critical_periods, forecast_cumulative_impact
+    identify_critical_periods, forecast_cumulative_impact, ArimaParameterCache,
+    calculate_historical_impact, calculate_historical_impact_matrix, build_external_factor_matrix,
+    factor_model_projections, compare_forecast_engines
 )
 from src.models import Risk, ExternalData
 
@@ -98,6 +100,60 @@ def test_forecast_cumulative_impact():
     # Test that cumulative impact is always increasing
     assert all(cumulative_impact[i] <= cumulative_impact[i+1] for i in range(len(cumulative_impact)-1))
 
+def test_time_series_analysis_parallel_matches_serial(sample_risks, sample_external_data):
+    serial = time_series_analysis(sample_risks, sample_external_data)
+    parallel = time_series_analysis(sample_risks, sample_external_data, workers=2)
+    
+    for risk_id in serial:
+        np.testing.assert_allclose(parallel[risk_id], serial[risk_id])
+
+def test_time_series_analysis_parameter_cache(sample_risks, sample_external_data, tmp_path):
+    cache_path = str(tmp_path / "arima_cache.json")
+    first = time_series_analysis(sample_risks, sample_external_data, parameter_cache=ArimaParameterCache(cache_path))
+    
+    # An unchanged series reuses the cached parameters and reproduces the fitted forecast
+    cache = ArimaParameterCache(cache_path)
+    assert set(cache.entries) == {"1", "2"}
+    cached = time_series_analysis(sample_risks, sample_external_data, parameter_cache=cache)
+    for risk_id in first:
+        np.testing.assert_allclose(cached[risk_id], first[risk_id])
+    
+    # A new year of data changes the series hash, so the fit is re-run from the previous parameters
+    extended_data = dict(sample_external_data)
+    extended_data["2021"] = sample_external_data["2020"].copy(update={"year": 2021})
+    previous_hash = cache.entries["1"]["series_hash"]
+    extended = time_series_analysis(sample_risks, extended_data, parameter_cache=cache)
+    assert cache.entries["1"]["series_hash"] != previous_hash
+    assert len(extended[1]) == 10
+
+def test_calculate_historical_impact_matrix_matches_scalar(sample_risks, sample_external_data):
+    factors = build_external_factor_matrix(sample_external_data)
+    assert factors.shape == (len(sample_external_data), 3)
+    
+    matrix = calculate_historical_impact_matrix(sample_risks, sample_external_data)
+    expected = [[calculate_historical_impact(risk, data) for data in sample_external_data.values()] for risk in sample_risks]
+    np.testing.assert_array_equal(matrix, expected)
+
+def test_factor_engine_projections(sample_risks, sample_external_data):
+    results = time_series_analysis(sample_risks, sample_external_data, engine="factor")
+    
+    assert results == factor_model_projections(sample_risks, sample_external_data)
+    assert len(results) == len(sample_risks)
+    for risk_id, projections in results.items():
+        assert len(projections) == 10
+        assert all(0 <= impact <= 1 for impact in projections)
+    
+    with pytest.raises(ValueError):
+        time_series_analysis(sample_risks, sample_external_data, engine="unknown")
+
+def test_compare_forecast_engines(sample_risks, sample_external_data):
+    comparison = compare_forecast_engines(sample_risks, sample_external_data, holdout_years=3)
+    
+    assert set(comparison) == {"arima", "factor"}
+    for metrics in comparison.values():
+        assert metrics["seconds"] >= 0
+        assert 0 <= metrics["mae"] <= metrics["rmse"] <= 1
+
 # Add edge case tests
 def test_time_series_analysis_edge_cases(sample_risks):
     # Test with no external data